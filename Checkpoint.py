@@ -0,0 +1,286 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# Checkpoint
+
+from array import array
+from collections import deque
+from datetime import date, datetime, timedelta
+import hashlib
+import inspect
+import json
+import pickle
+import re
+import struct
+import zlib
+
+import numpy as np
+
+from WindowAnalytics import Scale, Slope, LineDiff
+
+CHECKPOINT_MAGIC = b'USLC'
+CHECKPOINT_VERSION = 1
+
+# magic, version, flags (reserved), config digest, last data time (us since epoch), payload size, payload crc32
+_HEADER = struct.Struct('<4sHH8sqII')
+_EPOCH = datetime(1970, 1, 1)
+
+# attribute values copied as is, everything else is a window, an indicator, a nested analytics object or skipped
+_PLAIN = (int, float, str, bool, type(None), datetime, date, timedelta, np.generic)
+
+
+class IndicatorCheckpoints:
+    """
+    Persistent per-symbol indicator state, so a later backtest can skip the one year warm-up
+    At the end of the run save_all() writes one binary checkpoint per ready symbol holding the
+    CoarseSymbolData and BetaSymbolData state, keyed by indicator config hash, symbol and last data time:
+
+        <prefix>/<config hash>/<symbol id>/<yyyymmdd>.ckpt
+
+    A backtest that adds the symbol later restores the newest checkpoint that is not after the algorithm
+    time and still inside the history lookback, then only applies the newer bars with AddToData().
+    The config hash covers the window sizes, EMA periods and CoarseSymbolData.__init__ source, so a change
+    to the indicator setup starts a new key space instead of restoring incompatible state.
+
+    .NET indicators cannot be serialized: RollingWindows are stored as their values, EMAs as their current
+    value (re-seeded on restore, exact to within rounding) and the Ichimoku windows are rebuilt by replaying
+    CoarseSymbolData.ichimoku_bars.
+    """
+
+    def __init__(self, algorithm, enabled=False, store=None, prefix='proust/checkpoints'):
+        '''
+        param: algorithm -- reference to the algorithm, used for Time and the log meter
+        param: enabled -- restore and save checkpoints, off by default
+        param: store -- algorithm.ObjectStore or LocalObjectStore (a local directory), defaults to algorithm.ObjectStore
+        param: prefix -- ObjectStore key prefix for the checkpoints
+        '''
+        self.algorithm = algorithm
+        self.enabled = enabled
+        self.store = store if store is not None else algorithm.ObjectStore
+        self.prefix = prefix
+        self.digest = None          # config hash, set from the first symbol data seen
+        self.index = None           # symbol key -> sorted checkpoint stamps, loaded on first use
+        self.restored = 0
+        self.saved = 0
+        self.saved_bytes = 0
+        self.rejected = 0           # checkpoints found but unusable (corrupt, other config, outside the lookback)
+
+    # keys
+    @staticmethod
+    def symbol_key(symbol):
+        # SecurityIdentifier string, unique across ticker changes
+        return re.sub(r'[^A-Za-z0-9._-]', '_', str(symbol.ID))
+
+    def _root(self):
+        return f'{self.prefix}/{self.digest.hex()}'
+
+    def _key(self, symbol_key, stamp):
+        return f'{self._root()}/{symbol_key}/{stamp}.ckpt'
+
+    def config_hash(self, symbol_data, beta_data):
+        if self.digest is None:
+            try:
+                source = inspect.getsource(type(symbol_data).__init__)
+            except (OSError, TypeError):
+                source = ''
+            schema = (CHECKPOINT_VERSION, _schema(symbol_data), _schema(beta_data), source)
+            self.digest = hashlib.sha256(repr(schema).encode('utf-8')).digest()[:8]
+        return self.digest
+
+    def _load_index(self):
+        if self.index is None:
+            key = f'{self._root()}/index.json'
+            self.index = dict()
+            if self.store.ContainsKey(key):
+                try:
+                    self.index = json.loads(self.store.Read(key))
+                except (ValueError, OSError):
+                    pass
+        return self.index
+
+    # restore
+    def restore(self, symbol, symbol_data, beta_data, history_start):
+        """
+        Load the newest usable checkpoint into freshly constructed symbol data
+        :param history_start: start of the history the caller applies with AddToData(), older checkpoints
+            would leave a gap
+        :return: True when restored, False when the caller has to warm up
+        """
+        if not self.enabled:
+            return False
+        self.config_hash(symbol_data, beta_data)
+        stamps = self._load_index().get(self.symbol_key(symbol), [])
+        today = f'{self.algorithm.Time:%Y%m%d}'
+        candidates = [stamp for stamp in stamps if stamp <= today]
+        if len(candidates) == 0:
+            return False
+
+        key = self._key(self.symbol_key(symbol), candidates[-1])
+        try:
+            decoded = decode(bytes(self.store.ReadBytes(key)), self.digest)
+        except (OSError, KeyError):
+            decoded = None
+        if decoded is None:
+            self.rejected += 1
+            return False
+        last_data_time, state = decoded
+        if not (history_start <= last_data_time <= self.algorithm.Time):
+            self.rejected += 1
+            return False
+
+        _apply(symbol_data, state['coarse'], last_data_time)
+        _apply(beta_data, state['beta'], last_data_time)
+        symbol_data.replay_ichimoku()
+        self.restored += 1
+        return True
+
+    # save
+    def save(self, symbol, symbol_data, beta_data):
+        """
+        Write the checkpoint of one symbol, only symbols with ready indicators are saved
+        :return: checkpoint key, None when skipped
+        """
+        if not self.enabled or not symbol_data.isReady or symbol_data.last_data_time is None:
+            return None
+        coarse = _capture(symbol_data)
+        if coarse is None:
+            return None
+        self.config_hash(symbol_data, beta_data)
+        last_data_time = symbol_data.last_data_time
+        data = encode(self.digest, last_data_time, {'coarse': coarse, 'beta': _capture(beta_data)})
+
+        symbol_key = self.symbol_key(symbol)
+        stamp = f'{last_data_time:%Y%m%d}'
+        key = self._key(symbol_key, stamp)
+        self.store.SaveBytes(key, bytearray(data))
+        self.saved += 1
+        self.saved_bytes += len(data)
+        stamps = self._load_index().setdefault(symbol_key, [])
+        if stamp not in stamps:
+            stamps.append(stamp)
+            stamps.sort()
+        return key
+
+    def save_all(self, dataBySymbol, betaDataBySymbol):
+        # checkpoint every tracked symbol, then write the index
+        if not self.enabled:
+            return
+        for symbol, symbol_data in dataBySymbol.items():
+            beta_data = betaDataBySymbol.get(symbol)
+            if beta_data is not None:
+                self.save(symbol, symbol_data, beta_data)
+        if self.digest is not None:
+            self.store.Save(f'{self._root()}/index.json', json.dumps(self._load_index()))
+        self.algorithm.log_meter.log('checkpoint',
+                                     f'* checkpoints: {self.saved} saved ({self.saved_bytes / 1024:.1f} KB), '
+                                     f'{self.restored} restored, {self.rejected} rejected')
+
+
+def encode(digest, last_data_time, state):
+    """
+    :param digest: 8 byte config hash
+    :param last_data_time: time of the last bar folded into the state
+    :param state: dict of captured state, plain Python values only
+    :return: checkpoint bytes, header followed by the zlib compressed pickle
+    """
+    payload = zlib.compress(pickle.dumps(state, protocol=4), 6)
+    microseconds = (last_data_time - _EPOCH) // timedelta(microseconds=1)
+    header = _HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, 0, digest, microseconds,
+                          len(payload), zlib.crc32(payload))
+    return header + payload
+
+
+def decode(data, digest):
+    """
+    :return: (last data time, state), None for another version, another config or a corrupt checkpoint
+    """
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, _, stored_digest, microseconds, size, crc = _HEADER.unpack_from(data)
+    payload = data[_HEADER.size:]
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION or stored_digest != digest:
+        return None
+    if len(payload) != size or zlib.crc32(payload) != crc:
+        return None
+    try:
+        state = pickle.loads(zlib.decompress(payload))
+    except (zlib.error, pickle.UnpicklingError, EOFError):
+        return None
+    return _EPOCH + timedelta(microseconds=microseconds), state
+
+
+def _kind(value, nested):
+    # how an attribute is checkpointed, None to skip (algorithm, symbol, parent handles, Ichimoku)
+    if isinstance(value, _PLAIN):
+        return 'plain'
+    if isinstance(value, deque):
+        return None if nested else 'tail'
+    if hasattr(value, 'Size') and hasattr(value, 'Add'):
+        return 'window'
+    if nested:
+        return None
+    if isinstance(value, (Scale, Slope, LineDiff)):
+        return 'object'
+    if hasattr(value, 'Period') and hasattr(value, 'Current'):
+        return 'ema'
+    return None
+
+
+def _schema(obj, nested=False):
+    # window sizes, EMA periods and nested objects, the part of the indicator config that shapes the state
+    # plain values are left out, some are only set once the indicators are ready
+    schema = []
+    for name, value in sorted(vars(obj).items()):
+        kind = _kind(value, nested)
+        if kind == 'window':
+            schema.append((name, kind, int(value.Size)))
+        elif kind == 'ema':
+            schema.append((name, kind, int(value.Period)))
+        elif kind == 'tail':
+            schema.append((name, kind, value.maxlen))
+        elif kind == 'object':
+            schema.append((name, type(value).__name__, _schema(value, nested=True)))
+    return tuple(schema)
+
+
+def _capture(obj, nested=False):
+    """
+    :return: dict of attribute name -> (kind, payload), None if an EMA is not ready yet (it could not be re-seeded)
+    """
+    state = dict()
+    for name, value in vars(obj).items():
+        kind = _kind(value, nested)
+        if kind == 'plain':
+            state[name] = (kind, value)
+        elif kind == 'window':
+            # oldest first, so restoring is a sequence of Add()
+            state[name] = (kind, array('d', reversed(list(value))))
+        elif kind == 'tail':
+            state[name] = (kind, list(value))
+        elif kind == 'object':
+            state[name] = (kind, _capture(value, nested=True))
+        elif kind == 'ema':
+            if value.Samples < value.Period:
+                return None
+            state[name] = (kind, float(value.Current.Value))
+    return state
+
+
+def _apply(obj, state, time):
+    # restore captured state into a freshly constructed object
+    for name, (kind, payload) in state.items():
+        if kind == 'plain':
+            setattr(obj, name, payload)
+            continue
+        current = getattr(obj, name)
+        if kind == 'window':
+            for value in payload:
+                current.Add(value)
+        elif kind == 'tail':
+            current.extend(payload)
+        elif kind == 'object':
+            _apply(current, payload, time)
+        elif kind == 'ema':
+            # an EMA fed its own value stays at that value, Period samples make it ready
+            for _ in range(int(current.Period)):
+                current.Update(time, payload)
@@ -3,26 +3,29 @@ from AlgorithmImports import *
 #endregion
 # CoarseSelection
 
-from typing import List, Any
+from typing import List, Any, FrozenSet
 from datetime import timedelta, datetime, date
-from time import perf_counter
 from QuantConnect import *
 from QuantConnect.Data.Market import TradeBar
 from QuantConnect.Data.UniverseSelection import Universe
 from QuantConnect.Algorithm import *
 from QuantConnect.Indicators import *
+from QuantConnect.Data.Consolidators import TradeBarConsolidator
 from collections import deque
 import statistics
 
-from Utils import printSymbolList
+from Utils import printSymbolList, SelectionTracker
+from SymbolTable import SymbolStore
 from WindowAnalytics import *
 
 
 class CoarseSelection:
-    exclude: List[Any]
+    handpicked: FrozenSet[str]
+    exclude: FrozenSet[str]
     coarse_symbols: List[Any]
 
-    def __init__(self, algorithm, max_coarse_count, price_threshold, max_price_limit, dollar_volume_threshold):
+    def __init__(self, algorithm, max_coarse_count, price_threshold, max_price_limit, dollar_volume_threshold,
+                 streaming=False, unchanged_short_circuit=False):
         self.algorithm = algorithm
         self.max_coarse_count = max_coarse_count
         self.price_threshold = price_threshold
@@ -34,30 +37,44 @@ class CoarseSelection:
 
         self.market_symbol = None
 
-        # state variables
-        self.phase1dataBySymbol = dict()
-        self.dataBySymbol = dict()
+        # state variables, per-symbol stores are indexed by the algorithm symbol_table ids
+        self.symbol_table = self.algorithm.symbol_table
+        self.metrics = self.algorithm.metrics   # timing spans for the selection phases
+        self.checkpoints = self.algorithm.checkpoints   # persisted indicator state, replaces the warm-up when found
+        self.phase1dataBySymbol = SymbolStore(self.symbol_table)
+        self.dataBySymbol = SymbolStore(self.symbol_table)
         self.algorithm.coarseDataBySymbol = self.dataBySymbol  # make indicator data available globally
-        self.betaDataBySymbol = dict()
+        self.betaDataBySymbol = SymbolStore(self.symbol_table)
         self.coarse_symbols = []
 
-        # get special lists
-        handpicked_spreadsheet = self.algorithm.Download(
+        # membership diff against the previous selection
+        # returning Universe.Unchanged from coarse also skips FineSelectionFunction (fine ranking and
+        # portfolio tracking), so the short circuit is opt in
+        self.selection_tracker = SelectionTracker()
+        self.unchanged_short_circuit = unchanged_short_circuit
+
+        # optional streaming mode -- subscribed tracked symbols are updated daily by consolidators
+        self.streamer = CoarseDataStreamer(self.algorithm, self) if streaming else None
+
+        # get special lists, cached locally so startup does not wait on the network
+        # both are fetched when startup is joined (on the algorithm thread) and set in load_lists()
+        self.handpicked = frozenset()
+        self.exclude = frozenset()
+        startup = self.algorithm.startup
+        lists = self.algorithm.list_provider
+        startup.submit('handpicked_list', lists.get, 'handpicked',
             "https://docs.google.com/spreadsheets/d/1gmDknrJZCjeX6xUhecq58sdLK9ss5ystDvtT-ywfktA/gviz/tq?tqx=out:csv")
-        exclude_spreadsheet = self.algorithm.Download(
+        startup.submit('exclude_list', lists.get, 'exclude',
             "https://docs.google.com/spreadsheets/d/1UJQwddVoe2MneP1Bbs-v406MtYO5iQVu_gV5ItE0RPY/gviz/tq?tqx=out:csv")
+        startup.on_join.append(self.load_lists)
 
-        self.handpicked = []
-        for row in handpicked_spreadsheet.split('\n'):
-            if len(row) > 0:
-                self.handpicked.append(row.replace('\"', ''))
-        self.algorithm.Log(f'*** handpicked list: {self.handpicked}')
-
-        self.exclude = []
-        for row in exclude_spreadsheet.split('\n'):
-            if len(row) > 0:
-                self.exclude.append(row.replace('\"', ''))
-        self.algorithm.Log(f'*** exclude list: {self.exclude}\n')
+    def load_lists(self):
+        startup = self.algorithm.startup
+        lists = self.algorithm.list_provider
+        self.handpicked = startup.result('handpicked_list')
+        self.algorithm.Log(f'*** handpicked list ({lists.sources["handpicked"]}): {sorted(self.handpicked)}')
+        self.exclude = startup.result('exclude_list')
+        self.algorithm.Log(f'*** exclude list ({lists.sources["exclude"]}): {sorted(self.exclude)}\n')
 
     def CoarseSelectionFunction(self, coarse):
         """
@@ -70,50 +87,70 @@ class CoarseSelection:
         :param coarse: QC provided list of all stocks
         :return: list of coarse selected stocks
         """
+        # wait for the startup downloads and history (only blocks on the first call)
+        self.algorithm.startup.join()
 
         #Makes selection only run once a month
         if self.algorithm.Time < self.selection_time:
             return []
         self.selection_time = self.algorithm.Time + timedelta(30)
+        self.algorithm.interop.begin_pass()
+        coarse = self.algorithm.interop.wrap_all(coarse, 'coarse')
         # phase 1 processed daily
         phase1_period = 9  # days to smooth
         # create a list of new phase1 symbols for every day
-        phase1_list = list()
-        for cf in coarse:
-            if (((cf.HasFundamentalData and
-                    self.price_threshold <= cf.Price <= self.max_price_limit and
-                    cf.DollarVolume >= self.daily_dollar_volume_threshold and
-                    cf.Symbol.Value not in self.exclude) or
-                    cf.Symbol.Value in self.handpicked) and
-                    cf.Symbol not in self.phase1dataBySymbol):
-                phase1_list.append(cf.Symbol)
-            # special handling for market symbol
-            if (cf.Symbol.Value == self.algorithm.market_ticker and
-                    cf.Symbol not in self.phase1dataBySymbol):
-                self.algorithm.market_symbol = cf.Symbol
-                self.market_symbol = cf.Symbol
-                phase1_list.append(cf.Symbol)
-
-        self.algorithm.Log("AMOUNT OF COARSE STOCKS IN UNIVERSE: {}".format(len(phase1_list)))
+        # each coarse Symbol is interned once, later checks use its id and cached ticker
+        # the daily pass refreshes the cached ticker, so the list checks see a renamed ticker
+        table = self.symbol_table
+        metrics = self.metrics
+        with metrics.span('coarse.phase1_ingest', symbols=len(coarse)) as span:
+            phase1_list = list()
+            phase1_ids = set()
+            coarse_ids = list()
+            for cf in coarse:
+                sid = table.intern(cf.Symbol, refresh=True)
+                coarse_ids.append(sid)
+                ticker = table.tickers[sid]
+                known = self.phase1dataBySymbol.has_id(sid)
+                if (((cf.HasFundamentalData and
+                        self.price_threshold <= cf.Price <= self.max_price_limit and
+                        cf.DollarVolume >= self.daily_dollar_volume_threshold and
+                        ticker not in self.exclude) or
+                        ticker in self.handpicked) and
+                        not known):
+                    phase1_list.append(table.symbols[sid])
+                    phase1_ids.add(sid)
+                # special handling for market symbol
+                if (ticker == self.algorithm.market_ticker and
+                        not known):
+                    self.algorithm.market_symbol = table.symbols[sid]
+                    self.market_symbol = table.symbols[sid]
+                    phase1_list.append(table.symbols[sid])
+                    phase1_ids.add(sid)
+            span.add('new', len(phase1_list))
+
+        self.algorithm.log_meter.log('coarse', "AMOUNT OF COARSE STOCKS IN UNIVERSE: {}".format(len(phase1_list)))
 
         # backfill all new phase 1 data (phase1_list)
-        histories = self.algorithm.History(phase1_list, phase1_period, Resolution.Daily)
+        with metrics.span('coarse.phase1_history', symbols=len(phase1_list)) as span:
+            histories = self.algorithm.History(phase1_list, phase1_period, Resolution.Daily)
+            span.add('bars', len(histories))
         # update existing phase1 data and create data for new phase1 symbols
-        for cf in coarse:
-            # update data for all known phase1 symbols
-            # TODO: may need to rotate symbols out to manage memory?
-            # TODO: prune any that no longer meet the dollar_volume threshold
-            if cf.Symbol in self.phase1dataBySymbol:
-                data = self.phase1dataBySymbol[cf.Symbol]
-                data.update(cf.EndTime, cf.AdjustedPrice, cf.Volume)
-
-            # process new phase1 symbols
-            if cf.Symbol in phase1_list:
-                if cf.Symbol not in self.phase1dataBySymbol:
-                    self.phase1dataBySymbol[cf.Symbol] = \
-                        Phase1SelectionData(self.algorithm, cf, phase1_period)
-                    data = self.phase1dataBySymbol[cf.Symbol]
-                    data.backfill(histories.loc[cf.Symbol])
+        with metrics.span('coarse.phase1_update') as span:
+            for cf, sid in zip(coarse, coarse_ids):
+                # update data for all known phase1 symbols
+                # TODO: may need to rotate symbols out to manage memory?
+                # TODO: prune any that no longer meet the dollar_volume threshold
+                if self.phase1dataBySymbol.has_id(sid):
+                    data = self.phase1dataBySymbol.get_id(sid)
+                    data.update(cf.EndTime, cf.AdjustedPrice, cf.Volume)
+
+                # process new phase1 symbols
+                elif sid in phase1_ids:
+                    data = Phase1SelectionData(self.algorithm, cf, phase1_period)
+                    self.phase1dataBySymbol.set_id(sid, data)
+                    data.backfill(histories.loc[table.symbols[sid]])
+            span.add('symbols', len(self.phase1dataBySymbol))
 
         # ----------------------------------------------------------------------
         # check if need to rebalance
@@ -123,11 +160,15 @@ class CoarseSelection:
         # self.algorithm.Log(f'*start rebalance. phase1data size:{len(self.phase1dataBySymbol)}')
         # filter to reduce the size of the initial population
         filtered = []
-        for symbol, data in self.phase1dataBySymbol.items():
-            if (data.average_dollar_volume > self.average_dollar_volume_threshold or
-                    symbol.Value in self.handpicked or
-                    symbol == self.market_symbol):
-                filtered.append(data.cf)
+        market_id = table.id_of(self.market_symbol)
+        with metrics.span('coarse.phase1_filter', symbols=len(self.phase1dataBySymbol)) as span:
+            for sid in self.phase1dataBySymbol.ids():
+                data = self.phase1dataBySymbol.get_id(sid)
+                if (data.average_dollar_volume > self.average_dollar_volume_threshold or
+                        table.tickers[sid] in self.handpicked or
+                        sid == market_id):
+                    filtered.append(data.cf)
+            span.add('passed', len(filtered))
 
         # phase 3 -- compute detailed indicators for all filtered symbols
         filtered_symbols = [x.Symbol for x in filtered]
@@ -135,38 +176,55 @@ class CoarseSelection:
         phase1_symbols = list(self.phase1dataBySymbol.keys())
         # produce a deduped combined list
         need_history = list(dict.fromkeys(filtered_symbols + existing_symbols))
+        if self.streamer is not None:
+            # streamed symbols are already current
+            need_history = [symbol for symbol in need_history if symbol not in self.streamer.consolidators]
         history_start = self.algorithm.Time - self.history_lookback
         history_end = self.algorithm.Time
-        histories = self.algorithm.History(need_history,
-                                        history_start, history_end, Resolution.Daily)
+        with metrics.span('coarse.history', symbols=len(need_history)) as span:
+            histories = self.algorithm.History(need_history,
+                                            history_start, history_end, Resolution.Daily)
+            span.add('bars', len(histories))
 
         # reset phase1 data for next rebalance
         self.phase1dataBySymbol.clear()
 
         # get full or add to existing history
-        for symbol in need_history:
-            if symbol not in self.dataBySymbol:
-                new_symbol_data = CoarseSymbolData(self.algorithm, symbol)
-                self.dataBySymbol[symbol] = new_symbol_data
-                new_symbol_data.WarmUpIndicators(histories.loc[symbol])
-
-                new_beta_data = BetaSymbolData(self.algorithm, symbol)
-                self.betaDataBySymbol[symbol] = new_beta_data
-                new_beta_data.WarmUpData(histories.loc[symbol])
-            else:
-                try:
-                    # update existing data with new history
-                    existing_symbol_data = self.dataBySymbol[symbol]
-                    existing_symbol_data.AddToData(histories.loc[symbol])
-                except KeyError:
-                    self.algorithm.Log(f'* CoarseSelection KeyError {symbol.Value} ({symbol}) not found in dataBySymbol')
-                    continue
-                try:
-                    existing_beta_data = self.betaDataBySymbol[symbol]
-                    existing_beta_data.AddToData(histories.loc[symbol])
-                except KeyError:
-                    self.algorithm.Log(f'* CoarseSelection KeyError {symbol.Value} ({symbol}) not found in betaDataBySymbol')
-                    continue
+        with metrics.span('coarse.warmup', bars=len(histories)) as span:
+            for symbol in need_history:
+                if symbol not in self.dataBySymbol:
+                    new_symbol_data = CoarseSymbolData(self.algorithm, symbol)
+                    self.dataBySymbol[symbol] = new_symbol_data
+                    new_beta_data = BetaSymbolData(self.algorithm, symbol)
+                    self.betaDataBySymbol[symbol] = new_beta_data
+
+                    if self.checkpoints.restore(symbol, new_symbol_data, new_beta_data, history_start):
+                        # only the bars after the checkpoint are applied
+                        new_symbol_data.AddToData(histories.loc[symbol])
+                        new_beta_data.AddToData(histories.loc[symbol])
+                        span.add('restored')
+                    else:
+                        new_symbol_data.WarmUpIndicators(histories.loc[symbol])
+                        new_beta_data.WarmUpData(histories.loc[symbol])
+                    span.add('new')
+                else:
+                    try:
+                        # update existing data with new history
+                        existing_symbol_data = self.dataBySymbol[symbol]
+                        existing_symbol_data.AddToData(histories.loc[symbol])
+                    except KeyError:
+                        self.algorithm.log_meter.log('coarse', f'* CoarseSelection KeyError {symbol.Value} ({symbol}) not found in dataBySymbol')
+                        continue
+                    try:
+                        existing_beta_data = self.betaDataBySymbol[symbol]
+                        existing_beta_data.AddToData(histories.loc[symbol])
+                    except KeyError:
+                        self.algorithm.log_meter.log('coarse', f'* CoarseSelection KeyError {symbol.Value} ({symbol}) not found in betaDataBySymbol')
+                        continue
+                    span.add('updated')
+
+        if self.streamer is not None:
+            self.streamer.rebalanced(need_history)
 
         # symbol data summary
         data_symbols_list = list(self.dataBySymbol.keys())
@@ -174,85 +232,85 @@ class CoarseSelection:
         net_new_list = list(net_new_set)
         # printSymbolList(self.algorithm, "* Coarse all phase1 symbols", phase1_symbols)
         # printSymbolList(self.algorithm, "* Coarse all data symbols", data_symbols_list)
-        printSymbolList(self.algorithm, "* Coarse new candidates", net_new_list)
+        printSymbolList(self.algorithm, "* Coarse new candidates", net_new_list, component='coarse')
 
         price_benchmark = self.dataBySymbol[self.market_symbol].price_slow_absolute_slope
         volume_benchmark = self.dataBySymbol[self.market_symbol].average_dollar_volume_slope
         baseline = self.dataBySymbol[self.market_symbol].baseline_slope
-        phase3_time = perf_counter()
-
-        for symbol, x in self.dataBySymbol.items():
-            # if symbol data not ready then skip further processing
-            if not x.isReady:
-                continue
-
-            if x.price >= x.fast_signal:
-                x.price_above_fast_signal = True
-            else:
-                x.price_above_fast_signal = False
-
-            if x.price_slow_absolute_slope >= 0:
-                x.price_above_zero = True
-            else:
-                x.price_above_zero = False
-
-            # price slope is greater than SPY
-            if x.price_slow_absolute_slope >= price_benchmark:
-                x.price_above_benchmark = True
-            else:
-                x.price_above_benchmark = False
-
-            # volume slope is greater than SPY
-            if x.average_dollar_volume_slope >= volume_benchmark:
-                x.volume_above_benchmark = True
-            else:
-                x.volume_above_benchmark = False
-
-            # EMA200 or similar
-            if x.baseline_slope > 0:
-                x.baseline_slope_uptrend = True
-            else:
-                x.baseline_slope_uptrend = False
-
-            # price variance above the line makes it actionable
-            if x.price_variance >= 0:
-                x.price_variance_above_line = True
-            else:
-                x.price_variance_above_line = False
-
-            # kumo is green, tenkan and kijun are above bottom of kumo
-            if x.senkouA >= x.senkouB and (x.tenkan > x.senkouB or x.kijun > x.senkouB):
-                x.tenkan_kijun_above_kumo = True
-
-            # kumo is red, tenkan and kijun are above bottom of kumo
-            elif x.senkouB > x.senkouA and (x.tenkan > x.senkouA or x.kijun > x.senkouA):
-                x.tenkan_kijun_above_kumo = True
-
-            # tenkan and kijun are not above kumo
-            else:
-                x.tenkan_kijun_above_kumo = False
-
-            if x.senkouA > x.senkouB:
-                x.kumo_is_green = True
-            else:
-                x.kumo_is_green = False
-
-            # tenkan and kijun are inside kumo
-            if (x.senkouA > x.senkouB and x.tenkan <= x.senkouA and x.kijun <= x.senkouA and x.tenkan >= x.senkouB and x.kijun >= x.senkouB) or \
-                    (x.senkouA < x.senkouB and x.tenkan >= x.senkouA and x.kijun >= x.senkouA and x.tenkan <= x.senkouB and x.kijun <= x.senkouB):
-                x.tenkan_kijun_inside_kumo = True
-            else:
-                x.tenkan_kijun_inside_kumo = False
-
+        with metrics.span('coarse.benchmark_flags', symbols=len(self.dataBySymbol)) as span:
+            for symbol, x in self.dataBySymbol.items():
+                # if symbol data not ready then skip further processing
+                if not x.isReady:
+                    continue
+                span.add('ready')
+
+                if x.price >= x.fast_signal:
+                    x.price_above_fast_signal = True
+                else:
+                    x.price_above_fast_signal = False
+
+                if x.price_slow_absolute_slope >= 0:
+                    x.price_above_zero = True
+                else:
+                    x.price_above_zero = False
+
+                # price slope is greater than SPY
+                if x.price_slow_absolute_slope >= price_benchmark:
+                    x.price_above_benchmark = True
+                else:
+                    x.price_above_benchmark = False
+
+                # volume slope is greater than SPY
+                if x.average_dollar_volume_slope >= volume_benchmark:
+                    x.volume_above_benchmark = True
+                else:
+                    x.volume_above_benchmark = False
+
+                # EMA200 or similar
+                if x.baseline_slope > 0:
+                    x.baseline_slope_uptrend = True
+                else:
+                    x.baseline_slope_uptrend = False
+
+                # price variance above the line makes it actionable
+                if x.price_variance >= 0:
+                    x.price_variance_above_line = True
+                else:
+                    x.price_variance_above_line = False
+
+                # kumo is green, tenkan and kijun are above bottom of kumo
+                if x.senkouA >= x.senkouB and (x.tenkan > x.senkouB or x.kijun > x.senkouB):
+                    x.tenkan_kijun_above_kumo = True
+
+                # kumo is red, tenkan and kijun are above bottom of kumo
+                elif x.senkouB > x.senkouA and (x.tenkan > x.senkouA or x.kijun > x.senkouA):
+                    x.tenkan_kijun_above_kumo = True
+
+                # tenkan and kijun are not above kumo
+                else:
+                    x.tenkan_kijun_above_kumo = False
+
+                if x.senkouA > x.senkouB:
+                    x.kumo_is_green = True
+                else:
+                    x.kumo_is_green = False
+
+                # tenkan and kijun are inside kumo
+                if (x.senkouA > x.senkouB and x.tenkan <= x.senkouA and x.kijun <= x.senkouA and x.tenkan >= x.senkouB and x.kijun >= x.senkouB) or \
+                        (x.senkouA < x.senkouB and x.tenkan >= x.senkouA and x.kijun >= x.senkouA and x.tenkan <= x.senkouB and x.kijun <= x.senkouB):
+                    x.tenkan_kijun_inside_kumo = True
+                else:
+                    x.tenkan_kijun_inside_kumo = False
 
         # Calculate beta and stock_sortino_ratio - save in CoarseSymbolData so it can be used as a filter
         # Setup market_return for beta calculation
         market_prices = self.betaDataBySymbol[self.market_symbol].prices
-        for symbol, data in self.betaDataBySymbol.items():
-            beta_value = data.beta(market_prices)
-            self.dataBySymbol[symbol].beta = beta_value
-            sortino_value = data.stock_sortino_ratio()
-            self.dataBySymbol[symbol].stock_sortino_ratio = sortino_value
+        with metrics.span('coarse.beta_sortino', symbols=len(self.betaDataBySymbol)):
+            for symbol, data in self.betaDataBySymbol.items():
+                beta_value = data.beta(market_prices)
+                self.dataBySymbol[symbol].beta = beta_value
+                sortino_value = data.stock_sortino_ratio()
+                self.dataBySymbol[symbol].stock_sortino_ratio = sortino_value
 
         # diagnostics
         # for x in self.dataBySymbol.values():
@@ -263,36 +321,38 @@ class CoarseSelection:
         #        self.algorithm.Log(message)
 
         # apply 2nd order filter using CoarseSymbolData indicators
-        selected = list(filter(lambda x:
-                                x.isReady and
-                                # not x.price_variance_above_line,
-                                # x.is_uptrend and
-                                x.volume_above_benchmark and 
-                                #(x.price_above_benchmark or x.volume_above_benchmark) and
-                                #x.price_above_zero and
-                                # x.fast_signal > x.baseline_signal and
-                                # x.price_diff_absolute_slope >= 0,
-                                # x.pvt_slow_absolute_slope != float('nan') and
-                                # x.price_variance >= 0 and
-                                # x.price_variance_absolute_slope >= 0 and
-                                # x.price_meta_variance_absolute_slope >= 0 and
-                                # ((x.tenkan >= x.kijun) or x.tenkan_kijun_above_kumo) and
-                                x.tenkan_kijun_inside_kumo and
-                                # x.tenkan_above_kijun_signal >= 0 and
-                                # x.beta >= 1 and
-                                # x.price >= (x.fifty_two_week_high - (x.fifty_two_week_high * 0.03)),
-                                (x.stock_sortino_ratio == float('inf') or x.stock_sortino_ratio == float('nan') or x.stock_sortino_ratio > 0),  # added logic to deal with some non-math results that come out of PortfolioMetrics
-                                list(self.dataBySymbol.values())))
-        self.algorithm.filter_criteria.append("Ichimoku")
-        selected.sort(key=lambda x: x.average_dollar_volume, reverse=True)
+        with metrics.span('coarse.filter', symbols=len(self.dataBySymbol)) as span:
+            selected = list(filter(lambda x:
+                                    x.isReady and
+                                    # not x.price_variance_above_line,
+                                    # x.is_uptrend and
+                                    x.volume_above_benchmark and 
+                                    #(x.price_above_benchmark or x.volume_above_benchmark) and
+                                    #x.price_above_zero and
+                                    # x.fast_signal > x.baseline_signal and
+                                    # x.price_diff_absolute_slope >= 0,
+                                    # x.pvt_slow_absolute_slope != float('nan') and
+                                    # x.price_variance >= 0 and
+                                    # x.price_variance_absolute_slope >= 0 and
+                                    # x.price_meta_variance_absolute_slope >= 0 and
+                                    # ((x.tenkan >= x.kijun) or x.tenkan_kijun_above_kumo) and
+                                    x.tenkan_kijun_inside_kumo and
+                                    # x.tenkan_above_kijun_signal >= 0 and
+                                    # x.beta >= 1 and
+                                    # x.price >= (x.fifty_two_week_high - (x.fifty_two_week_high * 0.03)),
+                                    (x.stock_sortino_ratio == float('inf') or x.stock_sortino_ratio == float('nan') or x.stock_sortino_ratio > 0),  # added logic to deal with some non-math results that come out of PortfolioMetrics
+                                    list(self.dataBySymbol.values())))
+            self.algorithm.filter_criteria.append("Ichimoku")
+            selected.sort(key=lambda x: x.average_dollar_volume, reverse=True)
+            span.add('selected', len(selected))
 
 
         # selected symbols logging
         if self.algorithm.log_coarse_selected:
-            self.algorithm.Log('** SELECTED SYMBOLS **')
+            self.algorithm.log_meter.log('coarse', '** SELECTED SYMBOLS **')
             message = 'Benchmark Price Slope {:.2f}  Benchmark Volume Slope {:.2f}  Baseline Slope {:.2f}' \
                 .format(price_benchmark, volume_benchmark, baseline)
-            self.algorithm.Log(message)
+            self.algorithm.log_meter.log('coarse', message)
             for x in selected[:self.max_coarse_count]:
                 message = '{}  is_uptrend: {}  52WeekHigh: {:.2f}   Beta: {:.2f}   Sortino: {:.2f}   trend: {:.2f}  trend slope: {:.2f}   ' \
                         'avg $ vol: {:.2f} ' \
@@ -307,21 +367,21 @@ class CoarseSelection:
                             x.pvt_slow_absolute_slope, x.pvt_diff_absolute_slope,
                             x.price_above_benchmark, x.volume_above_benchmark, x.baseline_slope_uptrend,
                             x.tenkan >= x.kijun, x.tenkan_kijun_above_kumo)
-                self.algorithm.Log(message)
+                self.algorithm.log_meter.log('coarse', message)
 
         # candidate symbols logging
         if self.algorithm.log_coarse_candidates:
-            self.algorithm.Log('** CANDIDATE SYMBOLS **')
+            self.algorithm.log_meter.log('coarse', '** CANDIDATE SYMBOLS **')
             message = 'Benchmark Price Slope {:.2f}  Benchmark Volume Slope {:.2f}  Baseline Slope {:.2f}' \
                 .format(price_benchmark, volume_benchmark, baseline)
-            self.algorithm.Log(message)
+            self.algorithm.log_meter.log('coarse', message)
             sorted_symbols = dict(
                 sorted(self.dataBySymbol.items(),
                     key=lambda kv: kv[1].trend_absolute_slope,
                     reverse=True))
 
             all_symbols = [x for x in sorted_symbols.keys()]
-            printSymbolList(self.algorithm, '* Coarse candidates', all_symbols)
+            printSymbolList(self.algorithm, '* Coarse candidates', all_symbols, component='coarse')
 
             for symbol, x in sorted_symbols.items():
                 if not x.isReady:
@@ -337,7 +397,7 @@ class CoarseSelection:
                             x.price_diff_pct, x.price_diff_absolute_slope, x.pvt_diff_absolute_slope,
                             x.price_above_benchmark, x.volume_above_benchmark, x.baseline_slope_uptrend,
                             x.tenkan >= x.kijun, x.tenkan_kijun_above_kumo)
-                self.algorithm.Log(message)
+                self.algorithm.log_meter.log('coarse', message)
 
         # csv diagnostic
         # sorted_symbols = dict(sorted(self.dataBySymbol.items(), key=lambda kv: (kv[1].trend_absolute_slope), reverse=True))
@@ -354,10 +414,71 @@ class CoarseSelection:
         self.coarse_symbols = [x.symbol for x in selected[:self.max_coarse_count]]
 
         # summary logging
-        printSymbolList(self.algorithm, '* Coarse selected', self.coarse_symbols)
+        printSymbolList(self.algorithm, '* Coarse selected', self.coarse_symbols, component='coarse')
+
+        changed = self.selection_tracker.update(self.coarse_symbols)
+        if not changed and self.unchanged_short_circuit:
+            self.algorithm.log_meter.log('coarse', '* Coarse selection unchanged')
+            return Universe.Unchanged
         return self.coarse_symbols
 
 
+class CoarseDataStreamer:
+    """
+    Streaming mode for CoarseSelection
+    Tracked symbols that are subscribed get a daily consolidator that feeds CoarseSymbolData.update()
+    and BetaSymbolData.update() one bar per day, so the rebalance skips History() for them and only
+    reads their current state.
+    A symbol is only streamed while its data is current: from a rebalance that brought it up to date
+    until it leaves the universe. After that History() fills the gap at the next rebalance.
+    """
+
+    def __init__(self, algorithm, coarse_selection):
+        self.algorithm = algorithm
+        self.coarse_selection = coarse_selection
+        self.consolidators = dict()  # symbol -> daily consolidator
+        self.subscribed = set()      # symbols currently in the algorithm's securities
+        self.current = set()         # tracked symbols whose data is up to date
+
+    def on_securities_changed(self, changes):
+        for security in changes.AddedSecurities:
+            self.subscribed.add(security.Symbol)
+            if security.Symbol in self.current:
+                self.register(security.Symbol)
+        for security in changes.RemovedSecurities:
+            self.subscribed.discard(security.Symbol)
+            self.current.discard(security.Symbol)
+            self.deregister(security.Symbol)
+
+    def rebalanced(self, updated_symbols):
+        # updated_symbols were brought up to date by the rebalance History() pass
+        self.current = set(updated_symbols) | set(self.consolidators.keys())
+        for symbol in self.current & self.subscribed:
+            self.register(symbol)
+
+    def register(self, symbol):
+        if symbol in self.consolidators or symbol not in self.coarse_selection.dataBySymbol:
+            return
+        consolidator = TradeBarConsolidator(timedelta(days=1))
+        consolidator.DataConsolidated += self.on_daily_bar
+        self.algorithm.SubscriptionManager.AddConsolidator(symbol, consolidator)
+        self.consolidators[symbol] = consolidator
+
+    def deregister(self, symbol):
+        consolidator = self.consolidators.pop(symbol, None)
+        if consolidator is not None:
+            consolidator.DataConsolidated -= self.on_daily_bar
+            self.algorithm.SubscriptionManager.RemoveConsolidator(symbol, consolidator)
+
+    def on_daily_bar(self, sender, bar):
+        data = self.coarse_selection.dataBySymbol.get(bar.Symbol)
+        if data is not None and (data.last_data_time is None or bar.EndTime > data.last_data_time):
+            data.update(bar.EndTime, bar.Close, bar.Open, bar.High, bar.Low, bar.Volume, bar.Close * bar.Volume)
+        beta_data = self.coarse_selection.betaDataBySymbol.get(bar.Symbol)
+        if beta_data is not None and (beta_data.last_data_time is None or bar.EndTime > beta_data.last_data_time):
+            beta_data.update(bar.EndTime, bar.Close)
+
+
 class CoarseSymbolData:
     """
     Update indicators daily by processing daily history via WarmUpIndicators() or AddToData()
@@ -561,6 +682,8 @@ class CoarseSymbolData:
         SenkouBDelay = 26
         self.ichimoku = IchimokuKinkoHyo(self.symbol, TenkanPeriod, KijunPeriod,
                                          SenkouAPeriod, SenkouBPeriod, SenkouADelay, SenkouBDelay)
+        # latest bars, enough to rebuild the Ichimoku windows when restoring from a checkpoint
+        self.ichimoku_bars = deque(maxlen=SenkouBPeriod + SenkouBDelay + 1)
 
         # keeping values of tenkan above kijun so we know that it is not just a transient blip
         tenkan_above_kijun_period = 3
@@ -588,6 +711,7 @@ class CoarseSymbolData:
         e = self.pvt_fast.Update(time, self.pvt)
         f = self.pvt_slow.Update(time, self.pvt)
 
+        self.ichimoku_bars.append((time, open, high, low, close, volume))
         tradeBar = TradeBar(time, self.symbol, open, high, low, close, volume, timedelta(days=1))
         g = self.ichimoku.Update(tradeBar)
 
@@ -734,6 +858,11 @@ class CoarseSymbolData:
 
             return
 
+    def replay_ichimoku(self):
+        # rebuild the Ichimoku windows from the retained bars, used after a checkpoint restore
+        for time, open, high, low, close, volume in self.ichimoku_bars:
+            self.ichimoku.Update(TradeBar(time, self.symbol, open, high, low, close, volume, timedelta(days=1)))
+
     def WarmUpIndicators(self, history):
         for bar in history.itertuples():
             self.update(bar.Index, bar.close, bar.open, bar.high, bar.low, bar.volume, bar.close * bar.volume)
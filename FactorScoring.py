@@ -0,0 +1,100 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# FactorScoring
+
+import numpy as np
+
+TIE_METHODS = ('ordinal', 'min', 'max', 'average', 'dense')
+
+
+def rank_descending(values, ties='ordinal'):
+    """
+    Rank a factor column highest value first (rank 0 is the largest value) using argsort, O(n log n)
+    :param values: factor column (anything np.asarray can convert to float)
+    :param ties: how equal values are ranked
+        'ordinal' -- equal values keep their input order, same as the position in sorted(..., reverse=True)
+        'min' / 'max' / 'average' -- equal values share the lowest / highest / mean of their ranks
+        'dense' -- equal values share a rank and the ranks have no gaps
+    :return: float array of ranks in input order, NaN values rank last
+    """
+    if ties not in TIE_METHODS:
+        raise ValueError(f'rank_descending() unknown ties method: {ties}')
+    keys = -np.asarray(values, dtype=float)
+    n = len(keys)
+    # stable sort keeps the input order between equal values (NaN sorts last)
+    order = np.argsort(keys, kind='stable')
+    ranks = np.empty(n, dtype=float)
+    if ties == 'ordinal' or n == 0:
+        ranks[order] = np.arange(n)
+        return ranks
+
+    # find runs of equal values in the sorted keys, NaNs are treated as one run
+    sorted_keys = keys[order]
+    new_run = np.ones(n, dtype=bool)
+    new_run[1:] = ~((sorted_keys[1:] == sorted_keys[:-1]) |
+                    (np.isnan(sorted_keys[1:]) & np.isnan(sorted_keys[:-1])))
+    run_id = np.cumsum(new_run) - 1
+    run_start = np.flatnonzero(new_run)
+    run_end = np.append(run_start[1:], n) - 1
+    if ties == 'min':
+        sorted_ranks = run_start[run_id]
+    elif ties == 'max':
+        sorted_ranks = run_end[run_id]
+    elif ties == 'average':
+        sorted_ranks = ((run_start + run_end) / 2.0)[run_id]
+    else:
+        sorted_ranks = run_id
+    ranks[order] = sorted_ranks
+    return ranks
+
+
+class RankScorer:
+    """
+    Weighted multi-factor rank scoring
+    score = sum(weight * rank) over the factors, where rank 0 is the highest factor value
+    Factors with a zero weight are dropped up front so their columns are never ranked (or even needed)
+    """
+
+    def __init__(self, weights, ties='ordinal'):
+        '''
+        param: weights -- dict of factor name -> weight
+        param: ties -- tie handling passed to rank_descending()
+        '''
+        if ties not in TIE_METHODS:
+            raise ValueError(f'RankScorer() unknown ties method: {ties}')
+        self.ties = ties
+        self.weights = {name: weight for name, weight in weights.items() if weight != 0}
+
+    @property
+    def factors(self):
+        # names of the factor columns that contribute to the score
+        return list(self.weights.keys())
+
+    def score(self, columns, size):
+        """
+        :param columns: dict of factor name -> column, only the weighted factors are read
+        :param size: number of rows, used when no factor carries a weight
+        :return: float array of scores in input order
+        """
+        scores = np.zeros(size, dtype=float)
+        for name, weight in self.weights.items():
+            scores += weight * rank_descending(columns[name], self.ties)
+        return scores
+
+    def order(self, columns, size, tiebreak=None):
+        """
+        Sort rows by score, highest score first
+        :param columns: dict of factor name -> column
+        :param size: number of rows
+        :param tiebreak: optional column, equal scores are ordered by this column highest first
+                         (otherwise equal scores keep their input order)
+        :return: (row indices in score order, scores in input order)
+        """
+        scores = self.score(columns, size)
+        if tiebreak is None:
+            base = np.arange(size)
+        else:
+            base = np.argsort(-np.asarray(tiebreak, dtype=float), kind='stable')
+        order = base[np.argsort(-scores[base], kind='stable')]
+        return order, scores
@@ -33,8 +33,11 @@ QCAlgorithmFrameworkBridge = QCAlgorithm
 
 from UniverseHistogram import *
 from Utils import *
+from FactorScoring import RankScorer
+from FundamentalColumns import FUNDAMENTAL_FIELDS, FundamentalProjection
 
 import math
+import numpy as np
 
 class FineSelection:
     def __init__(self, algorithm):
@@ -43,6 +46,36 @@ class FineSelection:
 
         self.include_invested_in_keep = True    #  include invested in keep list
 
+        # membership diff against the previous selection, Universe.Unchanged is returned when identical
+        self.selection_tracker = SelectionTracker()
+        # last recorded close of every tracked stock, carried forward when a price is missing
+        self.last_closes = dict()
+
+        # rank scoring factors, you can also change the rule of scoring here.
+        # zero weight factors are skipped by the scorer
+        # fundamental factors are read from the projected columns, coarse factors from CoarseSymbolData
+        self.coarse_factor_getters = {
+            'price_diff_pct_spot': lambda jd: jd.b.price_diff_pct_spot,
+            'price_to_high': lambda jd: jd.b.price / jd.b.fifty_two_week_high,
+        }
+        self.factor_weights = {
+            'price_diff_pct_spot': 0.0,
+            'fcf_yield': 0.0,
+            'revenue_growth_3m': 0.0,
+            'price_to_high': 1.0,
+        }
+        self.score_tiebreak = 'price_diff_pct_spot'
+        self.scorer = RankScorer(self.factor_weights, ties='ordinal')
+
+        # fundamental fields are read once per symbol per selection into columns
+        # the logging fields are only projected when log_fine_selected is on
+        selection_fields = ['ipo_date'] + [name for name in self.scorer.factors if name in FUNDAMENTAL_FIELDS]
+        log_fields = ['revenue_growth_3m', 'revenue_growth_1y', 'ev_to_ebitda', 'basic_eps_12m', 'pe_ratio',
+                      'net_income_3m', 'roic', 'long_term_debt_equity', 'fcf_per_share', 'fcf_yield',
+                      'normalized_diluted_eps_3m', 'peg_ratio', 'first_year_eps_growth']
+        self.projection = FundamentalProjection(selection_fields)
+        self.log_projection = FundamentalProjection(selection_fields + log_fields)
+
         # csv diagnostic header
         #msg = "log,_fine,symbol,price_diff_abs_slope,price_diff_slope,price_fast_slope,price_slow_slope," \
         #      "pvt_diff_abs_slope,fast_abs_slope,slow_abs_slope,trend_abs_slope"
@@ -57,6 +90,7 @@ class FineSelection:
         if self.algorithm.Time < self.selection_time:
             return Universe.Unchanged
         self.selection_time = self.algorithm.Time + timedelta(30)
+        fine_symbols = self.algorithm.interop.wrap_all(fine_symbols, 'fine')
 
         # calculate date for one year ago so we can filter out companies that IPOd since last year -- they screw up the Beta calculation
         one_year_ago = self.algorithm.Time - timedelta(days = 365)
@@ -67,75 +101,58 @@ class FineSelection:
         
         # if (x.SecurityReference.IPODate < three_months_ago) and (x.OperationRatios.RevenueGrowth.ThreeMonths > (x.OperationRatios.RevenueGrowth.OneYear/4)) and x.ValuationRatios.FCFPerShare >= 0:
         # if (x.SecurityReference.IPODate < three_months_ago) and x.ValuationRatios.PEGRatio < 3 and x.ValuationRatios.FCFYield >= 0:
-        fundamental_symbols = dict()
         #for x in fine_symbols:
         #    if (x.SecurityReference.IPODate < three_months_ago) and x.OperationRatios.RevenueGrowth.ThreeMonths > 0:
         #        fundamental_symbols[x.Symbol] = x
         
         # (x.AssetClassification.MorningstarSectorCode == MorningstarSectorCode.Technology) and \       
-        for x in fine_symbols:
-            if      (x.SecurityReference.IPODate < three_months_ago):
-                    fundamental_symbols[x.Symbol] = x
+        # project the fundamental fields into columns, then filter on the columns
+        metrics = self.algorithm.metrics
+        projection = self.log_projection if self.algorithm.log_fine_selected else self.projection
+        with metrics.span('fine.projection', symbols=len(fine_symbols)) as span:
+            fundamentals = projection.project(fine_symbols)
+            fundamentals = fundamentals.take(fundamentals.columns['ipo_date'] < np.datetime64(three_months_ago, 's'))
+            span.add('passed', len(fundamentals.symbols))
             
         #fine_symbols = dict(filter(lambda kv: ((kv[1].MarketCap > 10e9) and (kv[1].SecurityReference.IPODate < six_months_ago)), fine_symbols.items()))
 
         # setup join data structures for sorting
         join = dict()
-        for symbol, fundamental_data in fundamental_symbols.items():
+        for i, symbol in enumerate(fundamentals.symbols):
             join[symbol] = joindata(
                 # get current fundamental data
-                fundamental_data,
+                fundamentals.record(i),
                 # get current coarse data
                 self.algorithm.coarseDataBySymbol[symbol]
             )
             
                             
 
-        sortedByfactor1 = sorted(join.items(), 
-                                key=lambda kv: (
-                                                    kv[1].b.price_diff_pct_spot
-                                                ), 
-                                reverse=True)
-        sortedByfactor2 = sorted(join.items(), 
-                                key=lambda kv: (
-                                                    kv[1].a.ValuationRatios.FCFYield
-                                                ), 
-                                reverse=True)
-        sortedByfactor3 = sorted(join.items(), 
-                                key=lambda kv: ( 
-                                                    kv[1].a.OperationRatios.RevenueGrowth.ThreeMonths
-                                                ), 
-                                reverse=True)
-
-        sortedByfactor4 = sorted(join.items(), 
-                                key=lambda kv: ( 
-                                                    kv[1].b.price / kv[1].b.fifty_two_week_high
-                                                ), 
-                                reverse=True)
-        
-        
-        stock_dict = {}
-        
-        # assign a score to each stock, you can also change the rule of scoring here.
-        for i,ele in enumerate(sortedByfactor1):
-            rank1 = i
-            rank2 = sortedByfactor2.index(ele)
-            rank3 = sortedByfactor3.index(ele)
-            rank4 = sortedByfactor4.index(ele)
-            score = sum([rank1*0,rank2*0,rank3*0,rank4*1.0])
-            stock_dict[ele] = score
-        
+        # rank scoring -- only factors with a non-zero weight are ranked
+        # the final sort is tie broken on the price_diff_pct_spot ranking to keep the original ordering
+        join_items = list(join.items())
+        factors = set(self.scorer.factors)
+        factors.add(self.score_tiebreak)
+        with metrics.span('fine.scoring', symbols=len(join_items), factors=len(self.scorer.factors)):
+            columns = dict()
+            for name in factors:
+                if name in FUNDAMENTAL_FIELDS:
+                    columns[name] = fundamentals.columns[name]
+                else:
+                    columns[name] = [self.coarse_factor_getters[name](jd) for jd in join.values()]
+            order, scores = self.scorer.order(columns, len(join_items), tiebreak=columns[self.score_tiebreak])
+
         # sort the stocks by their scores
-        fine_symbols = sorted(stock_dict.items(), key=lambda d:d[1],reverse=True)
+        fine_symbols = [(join_items[i], scores[i]) for i in order]
         
         
         fine_list = [x[0][0] for x in fine_symbols]
-        printSymbolList(self.algorithm, "*** fine list", fine_list)
+        printSymbolList(self.algorithm, "*** fine list", fine_list, component='fine')
          
          
         #logging fundemental data for symbols identified by course selection
         if self.algorithm.log_fine_selected:
-            self.algorithm.Log('** FUNDAMENTAL DATA FOR SELECTED SYMBOLS **')
+            self.algorithm.log_meter.log('fine', '** FUNDAMENTAL DATA FOR SELECTED SYMBOLS **')
             for x in fine_symbols:
                 message = '{}  {}  Revenue Growth 3M: {:.2f}   Revenue Growth 1Y: {:.2f}   EVToEBITDA: {:.2f}   ' \
                           'Basic EPS 12 months: {:.2f}    PE Ratio: {:.2f}    ' \
@@ -147,17 +164,17 @@ class FineSelection:
                           'price variance: {:.3f}  price variance slope: {:.3f}   meta variance slope: {:.3f}   price_variance_above_line {}   ' \
                           'pvt diff slope: {:.2f}   pvt diff pct: {:.2%}  pvt diff spot: {:.2f}   ' \
                           'tenkan_kijun_above_kumo: {}  kumo_is_green: {}   ' \
-                    .format(x[0][0].Value, x[1], x[0][1].a.OperationRatios.RevenueGrowth.ThreeMonths, x[0][1].a.OperationRatios.RevenueGrowth.OneYear, x[0][1].a.ValuationRatios.EVToEBITDA, 
-                        x[0][1].a.EarningReports.BasicEPS.TwelveMonths, x[0][1].a.ValuationRatios.PERatio,
-                        x[0][1].a.FinancialStatements.IncomeStatement.NetIncome.ThreeMonths/1e6, x[0][1].a.OperationRatios.ROIC.Value,  x[0][1].a.OperationRatios.LongTermDebtEquityRatio.Value,
-                        x[0][1].a.ValuationRatios.FCFPerShare, x[0][1].a.ValuationRatios.FCFYield,
-                        x[0][1].a.EarningReports.NormalizedDilutedEPS.ThreeMonths, x[0][1].a.ValuationRatios.PEGRatio, x[0][1].a.ValuationRatios.FirstYearEstimatedEPSGrowth, 
+                    .format(x[0][0].Value, x[1], x[0][1].a.revenue_growth_3m, x[0][1].a.revenue_growth_1y, x[0][1].a.ev_to_ebitda, 
+                        x[0][1].a.basic_eps_12m, x[0][1].a.pe_ratio,
+                        x[0][1].a.net_income_3m/1e6, x[0][1].a.roic,  x[0][1].a.long_term_debt_equity,
+                        x[0][1].a.fcf_per_share, x[0][1].a.fcf_yield,
+                        x[0][1].a.normalized_diluted_eps_3m, x[0][1].a.peg_ratio, x[0][1].a.first_year_eps_growth, 
                         x[0][1].b.price_diff_absolute_slope, x[0][1].b.baseline_slope, x[0][1].b.price_diff_pct_spot, x[0][1].b.price_diff_pct, 
                         x[0][1].b.price_area,
                         x[0][1].b.price_variance, x[0][1].b.price_variance_absolute_slope, x[0][1].b.price_meta_variance_absolute_slope, x[0][1].b.price_variance_above_line,
                         x[0][1].b.pvt_diff_absolute_slope, x[0][1].b.pvt_diff_pct, x[0][1].b.pvt_diff_pct_spot,
                         x[0][1].b.tenkan_kijun_above_kumo, x[0][1].b.kumo_is_green)
-                self.algorithm.Log(message)
+                self.algorithm.log_meter.log('fine', message)
 
         
         # diagnostics
@@ -349,48 +366,73 @@ class FineSelection:
         result_list.sort()
 
         #Calculating price change in stock and printing it out
+        ledger = self.algorithm.ledger
         self.algorithm.selected_stocks.append(result_list)
-        self.algorithm.monthly_data.append(list())
-        self.algorithm.monthly_percent_data.append(list())
+        ledger.add_cohort()
 
         #Initialize new lines to charts
-        self.algorithm.chart.AddSeries(Series(SeriesType.Line, name="{}".format(len(self.algorithm.monthly_data))))             #Add a line to Monthly Data Chart
-        self.algorithm.percent_chart.AddSeries(Series(SeriesType.Line, name="{}".format(len(self.algorithm.monthly_data))))     #Add a line to Monthly Percent Change Chart
-
-        spy_price = self.algorithm.History(self.algorithm.spy, 1, Resolution.Daily)['close'][0]
-
-        #Plotting Spy
-        self.algorithm.Plot("Monthly Data", "SPY", spy_price) #Plot price for spy
-        self.algorithm.Plot("Monthly Percent Change", "SPY", spy_price / self.algorithm.spy_intial_price)
-        self.algorithm.spy_percent.append(spy_price / self.algorithm.spy_intial_price)
-
-        for i, port in enumerate(self.algorithm.selected_stocks):   #iterate over all stocks chosen over all months
-            tempSum = 0
-            for stock in port:  #Sum price of all stocks in each month
-                price = self.algorithm.History(stock, 1, Resolution.Daily)['close'][0]
-                tempSum += price
-
-            self.algorithm.monthly_data[i].append(tempSum)  #Add sum of each monthly portfolio to monthly data
-            
-            #Plot using monthly_data
-            self.algorithm.Plot("Monthly Data", str(i), tempSum)    #Plot monthly data
-            if self.algorithm.monthly_data[i][0] > 0:   #check for no divide by 0 errors
-                per_change = tempSum / self.algorithm.monthly_data[i][0]
-                self.algorithm.Plot("Monthly Percent Change", str(i), per_change)
-                self.algorithm.monthly_percent_data[i].append(per_change)
-            else:
-                self.algorithm.monthly_percent_data[i].append(None)
+        self.algorithm.chart.AddSeries(Series(SeriesType.Line, name="{}".format(ledger.cohort_count)))             #Add a line to Monthly Data Chart
+        self.algorithm.percent_chart.AddSeries(Series(SeriesType.Line, name="{}".format(ledger.cohort_count)))     #Add a line to Monthly Percent Change Chart
+
+        # latest close for every tracked stock and SPY in one batched request, recorded and plotted
+        with metrics.span('fine.portfolio_tracking', cohorts=ledger.cohort_count) as span:
+            tracked = [self.algorithm.spy] + [stock for port in self.algorithm.selected_stocks for stock in port]
+            span.add('symbols', len(tracked))
+            closes = self.algorithm.price_service.latest_closes(tracked)
+            missing = [stock for stock, price in closes.items() if price is None]
+            if len(missing) > 0:
+                printSymbolList(self.algorithm, "* Fine no price history", missing, component='fine')
+
+            #Sum price of all stocks in each monthly portfolio and record it in the ledger
+            # a stock without a price keeps its last recorded close, a cohort holding a stock that was
+            # never priced is NaN for the date so percent / cohort_averages skip it
+            self.last_closes.update((stock, price) for stock, price in closes.items() if price is not None)
+            # SPY falls back to the same carry forward, seeded by the initial close checked at startup
+            spy_price = self.last_closes.get(self.algorithm.spy, self.algorithm.spy_intial_price)
+            port_prices = [sum(self.last_closes.get(stock, np.nan) for stock in port)
+                           for port in self.algorithm.selected_stocks]
+            ledger.record(self.algorithm.Time, port_prices, spy_price)
+
+            #Plotting Spy
+            self.algorithm.Plot("Monthly Data", "SPY", spy_price) #Plot price for spy
+            self.algorithm.Plot("Monthly Percent Change", "SPY", ledger.spy_percent[-1])
+
+            #Plot using the latest ledger column
+            latest_prices = ledger.latest(ledger.prices)
+            latest_percent = ledger.latest(ledger.percent)
+            for i in range(ledger.cohort_count):
+                self.algorithm.Plot("Monthly Data", str(i), latest_prices[i])    #Plot monthly data
+                if not np.isnan(latest_percent[i]):   #purchase price was not positive
+                    self.algorithm.Plot("Monthly Percent Change", str(i), latest_percent[i])
 
         #Log data
-        self.algorithm.Log("Stock Price by Month:")
-        for i, port in enumerate(self.algorithm.selected_stocks):
-            printSymbolList(self.algorithm, "Stocks: ", port)
-            self.algorithm.Log(self.algorithm.monthly_data[i])
-
-        printSymbolList(self.algorithm, "* Fine result_list", result_list)
+        meter = self.algorithm.log_meter
+        if self.algorithm.portfolio_history_logging == 'full':
+            # reprint every cohort with its full price list
+            meter.log('portfolio', "Stock Price by Month:")
+            for i, port in enumerate(self.algorithm.selected_stocks):
+                printSymbolList(self.algorithm, "Stocks: ", port, component='portfolio')
+                meter.log('portfolio', str(ledger.row(ledger.prices, i).tolist()))
+        else:
+            # append only -- the new cohort and the new price of every cohort
+            # full tables are written once in OnEndOfAlgorithm
+            printSymbolList(self.algorithm, f"Stocks {ledger.cohort_count - 1}: ", result_list, component='portfolio')
+            meter.log('portfolio', f"Stock Price {self.algorithm.Time:%Y-%m-%d}: {latest_prices.tolist()}")
+
+        printSymbolList(self.algorithm, "* Fine result_list", result_list, component='fine')
+
+        # avoid subscription churn when the membership did not change
+        if not self.selection_tracker.update(result_list):
+            self.algorithm.log_meter.log('fine', '* Fine selection unchanged')
+            return Universe.Unchanged
+        printSymbolList(self.algorithm, "* Fine added", list(self.selection_tracker.added), component='fine')
+        printSymbolList(self.algorithm, "* Fine removed", list(self.selection_tracker.removed), component='fine')
+        # dropped symbols no longer need trading resolution data, released at the next market open
+        self.algorithm.subscription_policy.universe_changed(self.selection_tracker.added,
+                                                            self.selection_tracker.removed)
         return result_list
                 
 class joindata:
     def __init__(self, a, b):
-        self.a = a      # period performance metrics
+        self.a = a      # projected fundamental record (FundamentalRecord)
         self.b = b      # current coarse data metrics
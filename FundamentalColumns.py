@@ -0,0 +1,127 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# FundamentalColumns
+
+from operator import attrgetter
+import numpy as np
+
+'''
+Morningstar fundamental fields used by FineSelection
+name -> (property chain on the fine fundamental object, column dtype)
+See: https://www.quantconnect.com/docs/data-library/fundamentals#Fundamentals-Morningstar-US-Equity-Data
+'''
+FUNDAMENTAL_FIELDS = {
+    'ipo_date': ('SecurityReference.IPODate', 'datetime64[s]'),
+    'revenue_growth_3m': ('OperationRatios.RevenueGrowth.ThreeMonths', 'float64'),
+    'revenue_growth_1y': ('OperationRatios.RevenueGrowth.OneYear', 'float64'),
+    'ev_to_ebitda': ('ValuationRatios.EVToEBITDA', 'float64'),
+    'basic_eps_12m': ('EarningReports.BasicEPS.TwelveMonths', 'float64'),
+    'pe_ratio': ('ValuationRatios.PERatio', 'float64'),
+    'net_income_3m': ('FinancialStatements.IncomeStatement.NetIncome.ThreeMonths', 'float64'),
+    'roic': ('OperationRatios.ROIC.Value', 'float64'),
+    'long_term_debt_equity': ('OperationRatios.LongTermDebtEquityRatio.Value', 'float64'),
+    'fcf_per_share': ('ValuationRatios.FCFPerShare', 'float64'),
+    'fcf_yield': ('ValuationRatios.FCFYield', 'float64'),
+    'normalized_diluted_eps_3m': ('EarningReports.NormalizedDilutedEPS.ThreeMonths', 'float64'),
+    'peg_ratio': ('ValuationRatios.PEGRatio', 'float64'),
+    'first_year_eps_growth': ('ValuationRatios.FirstYearEstimatedEPSGrowth', 'float64'),
+    'market_cap': ('MarketCap', 'float64'),
+}
+
+
+class FundamentalProjection:
+    """
+    Read the requested fundamental fields once per symbol into typed NumPy columns
+    Each property chain crosses the python/.NET boundary, so it is resolved exactly once per selection
+    and everything downstream (filters, sort keys, logging) works on the columns
+    """
+
+    def __init__(self, fields):
+        '''
+        param: fields -- list of FUNDAMENTAL_FIELDS names to extract
+        '''
+        self.fields = list(dict.fromkeys(fields))
+        self._getters = [(name, attrgetter(FUNDAMENTAL_FIELDS[name][0]), FUNDAMENTAL_FIELDS[name][1])
+                         for name in self.fields]
+
+    def project(self, fine):
+        """
+        :param fine: iterable of fine fundamental objects
+        :return: FundamentalFrame with one row per object
+        """
+        symbols = []
+        values = [[] for _ in self._getters]
+        for x in fine:
+            symbols.append(x.Symbol)
+            for column, (name, getter, dtype) in zip(values, self._getters):
+                try:
+                    value = getter(x)
+                except AttributeError:
+                    value = None
+                column.append(value)
+
+        columns = dict()
+        for column, (name, getter, dtype) in zip(values, self._getters):
+            columns[name] = _to_column(column, dtype)
+        return FundamentalFrame(symbols, columns)
+
+
+def _to_column(values, dtype):
+    # missing values become NaN / NaT so the column keeps a fixed dtype
+    if dtype.startswith('datetime64'):
+        return np.array([np.datetime64(v, 's') if v is not None else np.datetime64('NaT', 's')
+                         for v in values], dtype=dtype)
+    return np.array([v if v is not None else np.nan for v in values], dtype=dtype)
+
+
+class FundamentalFrame:
+    """
+    Column store of projected fundamentals
+    symbols[i] owns row i of every column
+    """
+
+    def __init__(self, symbols, columns):
+        self.symbols = symbols
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def take(self, selector):
+        """
+        :param selector: boolean mask or integer index array
+        :return: new FundamentalFrame holding the selected rows
+        """
+        index = np.arange(len(self.symbols))[selector]
+        symbols = [self.symbols[i] for i in index]
+        columns = {name: column[index] for name, column in self.columns.items()}
+        return FundamentalFrame(symbols, columns)
+
+    def record(self, i):
+        return FundamentalRecord(self, i)
+
+
+class FundamentalRecord:
+    """
+    Compact attribute view on one row of a FundamentalFrame, e.g. record.fcf_yield
+    Holds no reference to the live fine fundamental object
+    """
+    __slots__ = ('_frame', '_index')
+
+    def __init__(self, frame, index):
+        self._frame = frame
+        self._index = index
+
+    @property
+    def symbol(self):
+        return self._frame.symbols[self._index]
+
+    def __getattr__(self, name):
+        # slots are unset before __init__ (copy, pickle), looking up _frame here would recurse
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._frame.columns[name][self._index]
+        except KeyError:
+            raise AttributeError(f'FundamentalRecord has no projected field {name}') from None
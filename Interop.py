@@ -0,0 +1,242 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# Interop
+
+from datetime import date, datetime, timedelta
+from time import perf_counter
+import sys
+
+# .NET types constructed by the selection modules, replaced by counting factories when installed
+INTEROP_TYPES = ('RollingWindow', 'ExponentialMovingAverage', 'IchimokuKinkoHyo', 'TradeBar')
+
+# values pythonnet hands back as Python objects, fundamental chains stop here
+_PLAIN = (int, float, str, bool, type(None), datetime, date, timedelta)
+
+
+class InteropCounter:
+    """
+    Opt-in counter of Python/.NET boundary crossings per call site and per rebalance pass
+    install() swaps the .NET types used by the selection modules (RollingWindow, EMA, Ichimoku, TradeBar)
+    for factories returning counting proxies, wrap_all() proxies the coarse/fine objects so fundamental
+    property chains are counted link by link (fine.SecurityReference, fine.SecurityReference.IPODate).
+    Every crossing is keyed by (access point, calling function) and timed.
+    The proxies stay on the Python side: arguments are unwrapped before a call is forwarded and the
+    Symbol of a coarse/fine object is returned unwrapped, so Symbol.Value itself is not counted.
+    Disabled, install() and wrap_all() do nothing and the algorithm runs on the real objects.
+    """
+
+    def __init__(self, algorithm, enabled=False, top=25):
+        '''
+        param: algorithm -- reference to the algorithm, used for Time and Log
+        param: enabled -- count crossings, off by default as every proxied call is timed
+        param: top -- call sites listed by report()
+        '''
+        self.algorithm = algorithm
+        self.enabled = enabled
+        self.top = top
+        self.passes = []            # (label, {(access point, caller): [calls, seconds]}) per rebalance
+        self.sites = dict()         # the current pass
+        self.label = 'startup'      # label of the current pass
+        self._installed = []        # (module, name, original)
+
+    # installation
+    def install(self, modules, names=INTEROP_TYPES):
+        """
+        Replace the named .NET types in each module with counting factories
+        Only objects constructed after install() are counted
+        """
+        if not self.enabled:
+            return
+        for module in modules:
+            for name in names:
+                original = getattr(module, name, None)
+                if original is None or isinstance(original, _CountingFactory):
+                    continue
+                self._installed.append((module, name, original))
+                setattr(module, name, _CountingFactory(self, original, name))
+
+    def uninstall(self):
+        for module, name, original in reversed(self._installed):
+            setattr(module, name, original)
+        self._installed = []
+
+    def wrap_all(self, items, site):
+        # proxy a coarse/fine list, unchanged when disabled
+        if not self.enabled:
+            return items
+        return [_ChainProxy(self, item, site) for item in items]
+
+    # recording
+    def begin_pass(self):
+        # start counting a new rebalance pass, labelled with the algorithm time
+        if not self.enabled:
+            return
+        self._close_pass()
+        self.label = f'{self.algorithm.Time:%Y-%m-%d}'
+
+    def _close_pass(self):
+        if len(self.sites) > 0:
+            self.passes.append((self.label, self.sites))
+        self.sites = dict()
+
+    def record(self, point, seconds, depth=2):
+        # depth -- frames between the caller of the proxied access and this method
+        frame = sys._getframe(depth)
+        code = frame.f_code
+        key = (point, getattr(code, 'co_qualname', code.co_name))
+        site = self.sites.get(key)
+        if site is None:
+            self.sites[key] = [1, seconds]
+        else:
+            site[0] += 1
+            site[1] += seconds
+
+    # queries
+    def all_passes(self):
+        # closed passes plus the current one
+        passes = list(self.passes)
+        if len(self.sites) > 0:
+            passes.append((self.label, self.sites))
+        return passes
+
+    def totals(self):
+        """
+        :return: dict of (access point, caller) -> [calls, seconds] over the whole run
+        """
+        totals = dict()
+        for _, sites in self.all_passes():
+            for key, (calls, seconds) in sites.items():
+                total = totals.setdefault(key, [0, 0.0])
+                total[0] += calls
+                total[1] += seconds
+        return totals
+
+    def summary(self):
+        return {
+            'passes': [{'label': label,
+                        'calls': sum(calls for calls, _ in sites.values()),
+                        'seconds': sum(seconds for _, seconds in sites.values())}
+                       for label, sites in self.all_passes()],
+            'sites': [{'point': point, 'caller': caller, 'calls': calls, 'seconds': seconds}
+                      for (point, caller), (calls, seconds)
+                      in sorted(self.totals().items(), key=lambda kv: kv[1][1], reverse=True)],
+        }
+
+    def report(self):
+        # crossings per rebalance pass, then the most expensive call sites over the run
+        if not self.enabled:
+            return
+        log = self.algorithm.Log
+        log('-------- Interop crossings by rebalance --------')
+        for label, sites in self.all_passes():
+            calls = sum(calls for calls, _ in sites.values())
+            seconds = sum(seconds for _, seconds in sites.values())
+            log(f' {label:<12s} {calls:>10d} calls {seconds:>9.3f}s')
+        log(f'-------- Interop call sites (top {self.top} by time) --------')
+        ranked = sorted(self.totals().items(), key=lambda kv: kv[1][1], reverse=True)
+        for (point, caller), (calls, seconds) in ranked[:self.top]:
+            log(f' {point:<40s} {caller:<40s} {calls:>10d} calls {seconds:>8.3f}s '
+                f'{seconds / calls * 1e6:>8.2f}us/call')
+
+
+def _unwrap(value):
+    return object.__getattribute__(value, '_target') if isinstance(value, _Proxy) else value
+
+
+class _CountingFactory:
+    # stands in for a .NET type, construction returns a counting proxy
+    # RollingWindow[float] returns a factory for the generic type
+
+    def __init__(self, counter, cls, name):
+        self.counter = counter
+        self.cls = cls
+        self.name = name
+
+    def __getitem__(self, parameter):
+        return _CountingFactory(self.counter, self.cls[parameter], self.name)
+
+    def __call__(self, *args):
+        started = perf_counter()
+        target = self.cls(*[_unwrap(arg) for arg in args])
+        self.counter.record(f'{self.name}()', perf_counter() - started)
+        return _Proxy(self.counter, target, self.name)
+
+
+class _Proxy:
+    """
+    Counting proxy of one .NET object, attribute reads and method calls are recorded as crossings
+    """
+    __slots__ = ('_counter', '_target', '_name')
+
+    def __init__(self, counter, target, name):
+        object.__setattr__(self, '_counter', counter)
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, attribute):
+        started = perf_counter()
+        value = getattr(self._target, attribute)
+        if callable(value):
+            return _CountedMethod(self._counter, value, f'{self._name}.{attribute}')
+        self._counter.record(f'{self._name}.{attribute}', perf_counter() - started)
+        return value
+
+    def __setattr__(self, attribute, value):
+        setattr(self._target, attribute, _unwrap(value))
+
+    def __getitem__(self, index):
+        started = perf_counter()
+        value = self._target[index]
+        self._counter.record(f'{self._name}[]', perf_counter() - started)
+        return value
+
+    def __iter__(self):
+        # the whole iteration is one access point
+        started = perf_counter()
+        values = list(self._target)
+        self._counter.record(f'{self._name}.__iter__', perf_counter() - started)
+        return iter(values)
+
+    def __len__(self):
+        started = perf_counter()
+        value = len(self._target)
+        self._counter.record(f'{self._name}.__len__', perf_counter() - started)
+        return value
+
+
+class _CountedMethod:
+    __slots__ = ('counter', 'method', 'point')
+
+    def __init__(self, counter, method, point):
+        self.counter = counter
+        self.method = method
+        self.point = point
+
+    def __call__(self, *args):
+        started = perf_counter()
+        value = self.method(*[_unwrap(arg) for arg in args])
+        self.counter.record(self.point, perf_counter() - started)
+        return value
+
+
+class _ChainProxy:
+    """
+    Counting proxy of a coarse/fine object, every link of a property chain is one crossing
+    Plain values and Symbols are returned as is
+    """
+    __slots__ = ('_counter', '_target', '_path')
+
+    def __init__(self, counter, target, path):
+        object.__setattr__(self, '_counter', counter)
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_path', path)
+
+    def __getattr__(self, attribute):
+        started = perf_counter()
+        value = getattr(self._target, attribute)
+        path = f'{self._path}.{attribute}'
+        self._counter.record(path, perf_counter() - started)
+        if isinstance(value, _PLAIN) or attribute == 'Symbol':
+            return value
+        return _ChainProxy(self._counter, value, path)
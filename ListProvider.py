@@ -0,0 +1,103 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# ListProvider
+
+from datetime import timedelta
+import hashlib
+import json
+import time
+
+
+class CachedListProvider:
+    """
+    Symbol lists downloaded from a CSV url (the handpicked / exclude spreadsheets)
+    Each download is cached in the ObjectStore with its fetch time and sha256 content hash.
+    A cached copy younger than ttl is used without touching the network; an older one is
+    refreshed, and kept as the fallback when the download fails or returns nothing.
+    Lists are returned as frozensets of tickers for O(1) membership checks.
+    """
+
+    def __init__(self, algorithm, store=None, ttl=timedelta(hours=12), prefix='proust/lists'):
+        '''
+        param: algorithm -- reference to the algorithm, used for Download() and Log()
+        param: store -- algorithm.ObjectStore or LocalObjectStore, defaults to algorithm.ObjectStore
+        param: ttl -- age (wall clock) after which a cached list is downloaded again
+        param: prefix -- ObjectStore key prefix for the cached lists
+        '''
+        self.algorithm = algorithm
+        self.store = store if store is not None else algorithm.ObjectStore
+        self.ttl = ttl
+        self.prefix = prefix
+        self.sources = dict()   # name -> 'cache', 'download' or 'stale cache'
+
+    def _keys(self, name):
+        return f'{self.prefix}/{name}.csv', f'{self.prefix}/{name}.json'
+
+    @staticmethod
+    def content_hash(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def parse(text):
+        # one quoted ticker per row
+        tickers = (row.replace('\"', '').strip() for row in text.split('\n'))
+        return frozenset(ticker for ticker in tickers if len(ticker) > 0)
+
+    def _read_cache(self, name, url):
+        """
+        :return: (text, meta) of the cached copy, (None, None) if missing, for another url or corrupt
+        """
+        data_key, meta_key = self._keys(name)
+        if not (self.store.ContainsKey(data_key) and self.store.ContainsKey(meta_key)):
+            return None, None
+        try:
+            meta = json.loads(self.store.Read(meta_key))
+            text = self.store.Read(data_key)
+        except (ValueError, OSError):
+            return None, None
+        if meta.get('url') != url or meta.get('sha256') != self.content_hash(text):
+            return None, None
+        return text, meta
+
+    def _write_cache(self, name, url, text, digest):
+        data_key, meta_key = self._keys(name)
+        self.store.Save(data_key, text)
+        self.store.Save(meta_key, json.dumps({'url': url, 'fetched': time.time(), 'sha256': digest}))
+
+    def _download(self, url):
+        try:
+            text = self.algorithm.Download(url)
+        except Exception as e:
+            self.algorithm.Log(f'*** CachedListProvider download failed: {url} {e}')
+            return None
+        return text if text else None
+
+    def get(self, name, url):
+        """
+        :param name: cache name of the list
+        :param url: CSV download url
+        :return: frozenset of tickers
+        """
+        text, meta = self._read_cache(name, url)
+        if text is not None and time.time() - meta.get('fetched', 0) < self.ttl.total_seconds():
+            self.sources[name] = 'cache'
+            return self.parse(text)
+
+        downloaded = self._download(url)
+        if downloaded is not None:
+            digest = self.content_hash(downloaded)
+            if meta is not None and meta['sha256'] != digest:
+                self.algorithm.Log(f'*** CachedListProvider {name} changed since the cached copy')
+            self._write_cache(name, url, downloaded, digest)
+            self.sources[name] = 'download'
+            return self.parse(downloaded)
+
+        if text is not None:
+            self.algorithm.Log(f'*** CachedListProvider {name} using stale cached copy')
+            self.sources[name] = 'stale cache'
+            return self.parse(text)
+
+        self.algorithm.Log(f'*** CachedListProvider {name} unavailable, using an empty list')
+        self.sources[name] = 'empty'
+        return frozenset()
@@ -0,0 +1,139 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# Metrics
+
+from time import perf_counter
+
+
+class Span:
+    """
+    One timed section of a selection pass, recorded in the registry when the with block exits
+    Counts (symbols processed, bars consumed, ...) can be passed up front or added inside the block
+    """
+    __slots__ = ('registry', 'name', 'counts', 'started')
+
+    def __init__(self, registry, name, counts):
+        self.registry = registry
+        self.name = name
+        self.counts = counts
+        self.started = 0.0
+
+    def add(self, name, value=1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.record(self.name, perf_counter() - self.started, self.counts)
+        return False
+
+
+class _NullSpan:
+    # returned while the registry is disabled, nothing is timed or recorded
+    __slots__ = ()
+
+    def add(self, name, value=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class SpanStats:
+    """
+    Aggregated timings of one span name plus the per call records, in call order
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.counts = dict()        # count name -> total over all calls
+        self.records = []           # (algorithm time, seconds, counts) per call
+
+    def add(self, time, seconds, counts):
+        self.calls += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        for name, value in counts.items():
+            self.counts[name] = self.counts.get(name, 0) + value
+        self.records.append((time, seconds, counts))
+
+    @property
+    def mean(self):
+        return self.total / self.calls if self.calls > 0 else 0.0
+
+
+class MetricsRegistry:
+    """
+    In-memory timing spans and counters for the rebalance pass (coarse phases, fine scoring, portfolio tracking)
+
+        with self.algorithm.metrics.span('coarse.history', symbols=len(symbols)) as span:
+            histories = self.algorithm.History(...)
+            span.add('bars', len(histories))
+
+    Spans are aggregated by name, queried with stats() / summary() and logged by report() at the end of the run.
+    When disabled span() returns a shared no-op span, so the instrumentation costs one call per section.
+    """
+
+    def __init__(self, algorithm, enabled=True):
+        '''
+        param: algorithm -- reference to the algorithm, used for Time and Log
+        param: enabled -- False turns every span and counter into a no-op
+        '''
+        self.algorithm = algorithm
+        self.enabled = enabled
+        self.spans = dict()         # span name -> SpanStats, in first use order
+        self.counters = dict()      # counter name -> value
+
+    def span(self, name, **counts):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, counts)
+
+    def count(self, name, value=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, name, seconds, counts=None):
+        stats = self.spans.get(name)
+        if stats is None:
+            stats = self.spans[name] = SpanStats()
+        stats.add(self.algorithm.Time, seconds, counts or {})
+
+    def stats(self, name):
+        # SpanStats for a span name, None if it never ran
+        return self.spans.get(name)
+
+    def summary(self):
+        """
+        :return: dict of span name -> {'calls', 'total', 'mean', 'min', 'max', 'counts'} plus 'counters'
+        """
+        summary = {name: {'calls': stats.calls, 'total': stats.total, 'mean': stats.mean,
+                          'min': stats.min, 'max': stats.max, 'counts': dict(stats.counts)}
+                   for name, stats in self.spans.items()}
+        summary['counters'] = dict(self.counters)
+        return summary
+
+    def report(self):
+        # span timings in first use order, then the counters
+        if not self.enabled:
+            return
+        self.algorithm.Log('-------- Selection timing by phase --------')
+        for name, stats in self.spans.items():
+            counts = '  '.join(f'{count}={value}' for count, value in stats.counts.items())
+            self.algorithm.Log(f' {name:<26s} {stats.calls:>5d} calls {stats.total:>9.3f}s total '
+                               f'{stats.mean:>8.4f}s mean {stats.max:>8.4f}s max  {counts}')
+        for name, value in self.counters.items():
+            self.algorithm.Log(f' {name:<26s} {value}')
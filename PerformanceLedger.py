@@ -0,0 +1,137 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# PerformanceLedger
+
+import numpy as np
+
+
+class PerformanceLedger:
+    """
+    Portfolio performance of every monthly selected cohort over the evaluation dates
+    Backed by a growable (cohort x evaluation date) NumPy array padded with NaN
+    Cohort i is priced from its start column (the evaluation it was selected on) onwards
+    """
+
+    def __init__(self, spy_initial_price, capacity=16):
+        '''
+        param: spy_initial_price -- SPY price at the start of the run, base for the SPY percent change
+        param: capacity -- initial number of cohorts / evaluation dates allocated
+        '''
+        self.spy_initial_price = spy_initial_price
+        self._prices = np.full((capacity, capacity), np.nan)
+        self._spy_prices = np.full(capacity, np.nan)
+        self._start = np.zeros(capacity, dtype=int)
+        self.dates = []             # evaluation date of each column
+        self.cohort_count = 0
+
+    @property
+    def date_count(self):
+        return len(self.dates)
+
+    def add_cohort(self):
+        """
+        Add a cohort that is priced from the next recorded evaluation
+        :return: cohort index
+        """
+        self._reserve(self.cohort_count + 1, self.date_count + 1)
+        self._start[self.cohort_count] = self.date_count
+        self.cohort_count += 1
+        return self.cohort_count - 1
+
+    def record(self, date, cohort_prices, spy_price):
+        """
+        Append one evaluation column
+        :param date: evaluation date
+        :param cohort_prices: portfolio price of every cohort, in cohort order
+        :param spy_price: SPY price for the evaluation
+        """
+        self._reserve(self.cohort_count, self.date_count + 1)
+        column = self.date_count
+        self._prices[:self.cohort_count, column] = cohort_prices
+        # cohorts only have values from their start column onwards
+        self._prices[:self.cohort_count, column][self._start[:self.cohort_count] > column] = np.nan
+        self._spy_prices[column] = spy_price
+        self.dates.append(date)
+
+    def _reserve(self, cohorts, dates):
+        # grow the backing arrays by doubling
+        rows, columns = self._prices.shape
+        if cohorts <= rows and dates <= columns:
+            return
+        new_rows = max(rows, 1)
+        while new_rows < cohorts:
+            new_rows *= 2
+        new_columns = max(columns, 1)
+        while new_columns < dates:
+            new_columns *= 2
+        prices = np.full((new_rows, new_columns), np.nan)
+        prices[:rows, :columns] = self._prices
+        self._prices = prices
+        spy_prices = np.full(new_columns, np.nan)
+        spy_prices[:columns] = self._spy_prices
+        self._spy_prices = spy_prices
+        start = np.zeros(new_rows, dtype=int)
+        start[:rows] = self._start
+        self._start = start
+
+    @property
+    def start(self):
+        # start column of every cohort
+        return self._start[:self.cohort_count]
+
+    @property
+    def prices(self):
+        # (cohort x date) portfolio prices, NaN before the cohort start
+        return self._prices[:self.cohort_count, :self.date_count]
+
+    @property
+    def spy_percent(self):
+        # SPY price relative to the initial SPY price for every evaluation date
+        return self._spy_prices[:self.date_count] / self.spy_initial_price
+
+    @property
+    def percent(self):
+        """
+        (cohort x date) portfolio price relative to the cohort purchase price
+        NaN where the purchase price is not positive
+        """
+        prices = self.prices
+        base = prices[np.arange(self.cohort_count), self.start] if self.date_count > 0 \
+            else np.full(self.cohort_count, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = prices / base[:, None]
+        percent[~(base > 0)] = np.nan
+        return percent
+
+    def relative_to_spy(self):
+        """
+        (cohort x date) cohort percent change minus the SPY percent change at the cohort start,
+        as used by the end-of-run report
+        """
+        return self.percent - self.spy_percent[self.start][:, None]
+
+    def cohort_lengths(self):
+        # number of evaluations recorded for every cohort
+        return self.date_count - self.start
+
+    def cohort_averages(self):
+        """
+        Average relative-to-SPY change per cohort
+        Undefined cells add nothing to the sum but still count in the length
+        """
+        lengths = self.cohort_lengths()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.nansum(self.relative_to_spy(), axis=1) / lengths
+
+    def row(self, table, cohort):
+        """
+        :param table: a (cohort x date) table from this ledger
+        :param cohort: cohort index
+        :return: the cohort's cells from its start column onwards
+        """
+        return table[cohort, self.start[cohort]:]
+
+    def latest(self, table):
+        # last evaluation column of a (cohort x date) table
+        return table[:, self.date_count - 1]
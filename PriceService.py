@@ -0,0 +1,60 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# PriceService
+
+from QuantConnect import *
+
+
+class PriceService:
+    """
+    Latest daily close for the tracked monthly portfolios (and SPY)
+    All symbols not yet cached for an evaluation date are fetched with one batched History() request
+    and cached by (symbol, date), so the same symbol is never fetched twice for a date
+    """
+
+    def __init__(self, algorithm, keep_dates=2):
+        '''
+        param: algorithm -- reference to the algorithm
+        param: keep_dates -- number of evaluation dates kept in the cache
+        '''
+        self.algorithm = algorithm
+        self.keep_dates = keep_dates
+        self.closes_by_date = dict()  # date -> {symbol: close or None}
+        self.history_calls = 0        # number of History() requests made
+
+    def latest_closes(self, symbols, date=None):
+        """
+        :param symbols: list of Symbols
+        :param date: evaluation date, defaults to the algorithm date
+        :return: dict of symbol -> latest daily close (None if History returned no data)
+        """
+        if date is None:
+            date = self.algorithm.Time.date()
+        closes = self.closes_by_date.get(date)
+        if closes is None:
+            closes = dict()
+            self.closes_by_date[date] = closes
+            self._evict()
+
+        missing = [symbol for symbol in dict.fromkeys(symbols) if symbol not in closes]
+        if len(missing) > 0:
+            history = self.algorithm.History(missing, 1, Resolution.Daily)
+            self.history_calls += 1
+            for symbol in missing:
+                try:
+                    closes[symbol] = history.loc[symbol]['close'].iloc[-1]
+                except (KeyError, IndexError):
+                    # cache the miss so it is not requested again for this date
+                    closes[symbol] = None
+
+        return {symbol: closes[symbol] for symbol in symbols}
+
+    def latest_close(self, symbol, date=None):
+        return self.latest_closes([symbol], date)[symbol]
+
+    def _evict(self):
+        # drop the oldest evaluation dates
+        while len(self.closes_by_date) > self.keep_dates:
+            oldest = min(self.closes_by_date.keys())
+            self.closes_by_date.pop(oldest)
@@ -0,0 +1,129 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# ReportWriter
+
+import csv
+import importlib.util
+import os
+import pandas as pd
+
+REPORT_FORMATS = ('csv', 'parquet')
+PARQUET_ENGINES = ('pyarrow', 'fastparquet')
+
+
+class LocalObjectStore:
+    """
+    Local filesystem stand-in for algorithm.ObjectStore
+    Keys map to files under root, so reports can be written and read back offline
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def GetFilePath(self, key):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        return path
+
+    def ContainsKey(self, key):
+        return os.path.isfile(os.path.join(self.root, key))
+
+    def Save(self, key, text):
+        with open(self.GetFilePath(key), 'w', encoding='utf-8') as f:
+            f.write(text)
+        return True
+
+    def SaveBytes(self, key, data):
+        with open(self.GetFilePath(key), 'wb') as f:
+            f.write(bytes(data))
+        return True
+
+    def Read(self, key):
+        with open(os.path.join(self.root, key), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def ReadBytes(self, key):
+        with open(os.path.join(self.root, key), 'rb') as f:
+            return f.read()
+
+    def Delete(self, key):
+        if not self.ContainsKey(key):
+            return False
+        os.remove(os.path.join(self.root, key))
+        return True
+
+
+class ReportSink:
+    """
+    Stream report tables to a local file or an ObjectStore key
+    csv -- all tables go to one file, each table is a title line followed by 'label,cell,cell,...' rows
+    parquet -- one file per table ('<target>_<table>.parquet'), rows NaN padded to the widest row,
+               needs pyarrow or fastparquet
+    """
+
+    def __init__(self, target, store=None, fmt='csv', buffer_size=1 << 20):
+        '''
+        param: target -- file path, or ObjectStore key when store is given
+        param: store -- algorithm.ObjectStore or LocalObjectStore, None to write target as a local path
+        param: fmt -- 'csv' or 'parquet'
+        param: buffer_size -- write buffer in bytes
+        '''
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f'ReportSink() unknown format: {fmt}')
+        if fmt == 'parquet' and not any(importlib.util.find_spec(engine) for engine in PARQUET_ENGINES):
+            raise ImportError(f'ReportSink() parquet format needs one of {", ".join(PARQUET_ENGINES)}, '
+                              f'use fmt=\'csv\' or install one')
+        self.target = target
+        self.store = store
+        self.fmt = fmt
+        self.buffer_size = buffer_size
+        self.paths = []       # files written
+        self._file = None
+        self._writer = None
+
+    def _path(self, target):
+        if self.store is not None:
+            return self.store.GetFilePath(target)
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        return target
+
+    def open(self):
+        if self.fmt == 'csv':
+            path = self._path(self.target)
+            self._file = open(path, 'w', newline='', encoding='utf-8', buffering=self.buffer_size)
+            self._writer = csv.writer(self._file)
+            self.paths.append(path)
+        return self
+
+    def write_table(self, name, labels, rows, columns=None):
+        """
+        :param name: table title
+        :param labels: row labels
+        :param rows: row cells, rows may have different lengths
+        :param columns: optional column names (parquet only)
+        """
+        if self.fmt == 'csv':
+            self._writer.writerow([name])
+            self._writer.writerows([label] + list(row) for label, row in zip(labels, rows))
+        else:
+            rows = [list(row) for row in rows]
+            width = max((len(row) for row in rows), default=0)
+            padded = [row + [float('nan')] * (width - len(row)) for row in rows]
+            frame = pd.DataFrame(padded, index=[str(label) for label in labels],
+                                 columns=[str(c) for c in (columns or range(width))])
+            path = self._path(f'{self.target}_{name}.parquet')
+            frame.to_parquet(path)
+            self.paths.append(path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,134 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# Startup
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from time import perf_counter
+import threading
+
+
+class StartupOrchestrator:
+    """
+    Collect the independent Initialize I/O steps (list downloads, SPY history) and run them once, before
+    the first selection callback, with a timing breakdown of the whole startup
+    LEAN does not document the algorithm API (History, Download, ObjectStore, Log) as safe to call off
+    the algorithm thread under pythonnet, so tasks that touch it are deferred and run on the algorithm
+    thread in join(). Only pure-Python work (no QCAlgorithm or .NET calls) may be submitted with
+    offload=True to run on a worker thread while Initialize continues.
+    Steps that run inline (AddChart, AddEquity, ...) can be timed with step() so the breakdown covers
+    the whole startup.
+    A failed task or on_join callback fails join() with a RuntimeError, and every later join() raises it
+    again, so the algorithm never continues half initialized.
+    """
+
+    def __init__(self, algorithm, max_workers=4):
+        '''
+        param: algorithm -- reference to the algorithm
+        param: max_workers -- worker threads for offloaded pure-Python tasks
+        '''
+        self.algorithm = algorithm
+        self.start = perf_counter()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='startup')
+        self.futures = dict()       # name -> Future
+        self.deferred = []          # (name, fn, args, kwargs) run on the algorithm thread in join()
+        self.timings = dict()       # name -> (start offset, seconds, 'thread' or 'main')
+        self.on_join = []           # callbacks run on the algorithm thread after all tasks finish
+        self.joined = False
+        self.failure = None         # RuntimeError raised by join() when startup failed
+        self.join_wait = 0.0        # time the algorithm thread spent in join()
+        self._lock = threading.Lock()
+
+    def _record(self, name, started, where):
+        with self._lock:
+            self.timings[name] = (started - self.start, perf_counter() - started, where)
+
+    def submit(self, name, fn, *args, offload=False, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the algorithm thread in join(), or on a worker thread with offload=True
+        (pure-Python work only)
+        :return: Future, also available by name through result()
+        """
+        if self.joined:
+            raise RuntimeError(f'StartupOrchestrator.submit() {name} after join')
+
+        if not offload:
+            self.futures[name] = Future()
+            self.deferred.append((name, fn, args, kwargs))
+            return self.futures[name]
+
+        def run():
+            started = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._record(name, started, 'thread')
+
+        self.futures[name] = self.executor.submit(run)
+        return self.futures[name]
+
+    def _run_deferred(self):
+        for name, fn, args, kwargs in self.deferred:
+            future = self.futures[name]
+            started = perf_counter()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._record(name, started, 'main')
+        self.deferred = []
+
+    @contextmanager
+    def step(self, name):
+        # time a synchronous step on the algorithm thread
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, started, 'main')
+
+    def result(self, name):
+        # wait for one task, re-raises the task exception
+        return self.futures[name].result()
+
+    def join(self):
+        """
+        Run the deferred tasks, wait for the offloaded ones, run the on_join callbacks and log the
+        timing breakdown
+        Cheap to call again once joined, raises the startup failure again if startup failed
+        """
+        if self.joined:
+            if self.failure is not None:
+                raise self.failure
+            return
+        waited = perf_counter()
+        try:
+            self._run_deferred()
+            for name, future in self.futures.items():
+                error = future.exception()
+                if error is not None:
+                    raise RuntimeError(f'startup task {name} failed: {error!r}') from error
+            for callback in self.on_join:
+                callback()
+        except RuntimeError as e:
+            self.failure = e
+            raise
+        except Exception as e:
+            self.failure = RuntimeError(f'startup failed: {e!r}')
+            raise self.failure from e
+        finally:
+            self.join_wait = perf_counter() - waited
+            self.joined = True
+            self.executor.shutdown(wait=False)
+            self.report()
+
+    def report(self):
+        wall = perf_counter() - self.start
+        serial = sum(seconds for _, seconds, _ in self.timings.values())
+        status = f'  FAILED: {self.failure}' if self.failure is not None else ''
+        self.algorithm.Log(f'*** Startup: {wall:.3f}s wall  {serial:.3f}s serial  '
+                           f'join wait {self.join_wait:.3f}s{status}')
+        for name, (offset, seconds, where) in sorted(self.timings.items(), key=lambda item: item[1][0]):
+            self.algorithm.Log(f'***   {name:<20} +{offset:.3f}s  {seconds:.3f}s  {where}')
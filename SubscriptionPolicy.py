@@ -0,0 +1,118 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# SubscriptionPolicy
+
+from QuantConnect import *
+
+
+class SubscriptionPolicy:
+    """
+    Resolution-aware universe subscriptions
+    Universe symbols are subscribed at daily resolution because selection and performance tracking
+    only read daily closes. A symbol is upgraded to minute resolution only when an alpha or execution
+    model asks to trade it via request_trading().
+    The upgrade is a manual AddSecurity() subscription, which outlives universe membership, so it is
+    released explicitly: universe_changed() queues traded symbols dropped by the selection and
+    release_pending() removes their subscription at the next market open.
+    In LEAN RemoveSecurity() liquidates the position, so a symbol is only released once it is flat;
+    an invested symbol keeps its trading subscription until the position has been closed.
+    request_trading() is the hook for the alpha / execution models, which are disabled in this
+    algorithm, so only benchmarks/subscription_check.py exercises the upgrade path today.
+    Data point counts are kept so the reduction against an all-minute universe can be reported.
+    """
+    minute_bars_per_day = 390
+
+    def __init__(self, algorithm, trading_resolution=Resolution.Minute):
+        '''
+        param: algorithm -- reference to the algorithm
+        param: trading_resolution -- resolution used for traded symbols
+        '''
+        self.algorithm = algorithm
+        self.trading_resolution = trading_resolution
+        self.traded = set()             # symbols upgraded to the trading resolution
+        self.pinned = set()             # traded symbols subscribed for the whole run (the market symbol)
+        self.pending = set()            # traded symbols dropped by the selection, released once flat
+
+        # data point accounting
+        self.data_points = 0            # bars received in OnData
+        self.symbol_days = 0            # active security days
+        self.traded_symbol_days = 0     # active security days at the trading resolution
+        self.upgrades = 0
+        self.releases = 0
+
+    def pin(self, symbol):
+        # symbol already subscribed at the trading resolution for the whole run, never released
+        self.traded.add(symbol)
+        self.pinned.add(symbol)
+
+    def request_trading(self, symbol):
+        """
+        Upgrade symbol to the trading resolution, call before an alpha or execution model trades it
+        The upgraded subscription lasts until the symbol has left the universe and is flat
+        """
+        self.pending.discard(symbol)
+        if symbol in self.traded:
+            return
+        self.traded.add(symbol)
+        self.upgrades += 1
+        self.algorithm.AddSecurity(symbol, self.trading_resolution)
+
+    def _invested(self, symbol):
+        securities = self.algorithm.Securities
+        return securities.ContainsKey(symbol) and securities[symbol].Invested
+
+    def release_trading(self, symbol):
+        """
+        Remove the manual trading resolution subscription of a symbol that has left the universe
+        :return: True when released, False for pinned or untraded symbols and open positions
+        """
+        if symbol in self.pinned or symbol not in self.traded:
+            return False
+        if self._invested(symbol):
+            # RemoveSecurity() would liquidate, keep the subscription until the position is closed
+            return False
+        self.traded.discard(symbol)
+        self.pending.discard(symbol)
+        self.releases += 1
+        self.algorithm.RemoveSecurity(symbol)
+        return True
+
+    def universe_changed(self, added, removed):
+        # called from the selection, a manual subscription keeps dropped symbols out of RemovedSecurities
+        self.pending -= set(added)
+        self.pending |= (set(removed) & self.traded) - self.pinned
+
+    def release_pending(self):
+        # release dropped symbols once the universe removal has been applied and they are flat
+        for symbol in list(self.pending):
+            self.release_trading(symbol)
+
+    def on_securities_changed(self, changes):
+        # removed despite the manual subscription (delisting), LEAN already dropped its subscriptions
+        for security in changes.RemovedSecurities:
+            symbol = security.Symbol
+            if symbol in self.traded and symbol not in self.pinned:
+                self.traded.discard(symbol)
+                self.pending.discard(symbol)
+                self.releases += 1
+
+    def on_data(self, data):
+        self.data_points += data.Bars.Count
+
+    def tally_day(self):
+        # called once per trading day at market open
+        self.release_pending()
+        self.symbol_days += self.algorithm.ActiveSecurities.Count
+        self.traded_symbol_days += len(self.traded)
+
+    def report(self):
+        # data point counts against the same universe subscribed at minute resolution
+        daily_symbol_days = self.symbol_days - self.traded_symbol_days
+        expected = daily_symbol_days + self.traded_symbol_days * self.minute_bars_per_day
+        all_minute = self.symbol_days * self.minute_bars_per_day
+        reduction = 1.0 - expected / all_minute if all_minute > 0 else 0.0
+        self.algorithm.Log(f'*** Subscriptions: {self.data_points} bars received  '
+                           f'{self.upgrades} upgraded / {self.releases} released to the trading resolution  '
+                           f'expected {expected} ({daily_symbol_days} daily + {self.traded_symbol_days} minute symbol days)  '
+                           f'all minute {all_minute}  reduction {reduction:.1%}')
@@ -0,0 +1,177 @@
+#region imports
+from AlgorithmImports import *
+#endregion
+# SymbolTable
+
+import numpy as np
+
+
+class SymbolTable:
+    """
+    Dense integer ids for Symbols, assigned the first time a symbol is seen
+    Hashing a .NET Symbol crosses the interop boundary, so hot loops intern a symbol once and
+    index per-symbol stores by id. The ticker (Symbol.Value) is cached per id, a Symbol keeps its id across
+    a ticker rename so callers that see the renamed Symbol intern it with refresh=True.
+    """
+
+    def __init__(self):
+        self._ids = dict()     # Symbol -> id
+        self.symbols = []      # id -> Symbol
+        self.tickers = []      # id -> Symbol.Value
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def intern(self, symbol, refresh=False):
+        # refresh: re-read the ticker of a known symbol, picks up a rename
+        sid = self._ids.get(symbol)
+        if sid is None:
+            sid = len(self.symbols)
+            self._ids[symbol] = sid
+            self.symbols.append(symbol)
+            self.tickers.append(symbol.Value)
+        elif refresh:
+            self.symbols[sid] = symbol
+            self.tickers[sid] = symbol.Value
+        return sid
+
+    def id_of(self, symbol):
+        # id without assigning a new one, None if never seen
+        return self._ids.get(symbol)
+
+    def symbol(self, sid):
+        return self.symbols[sid]
+
+    def ticker(self, sid):
+        return self.tickers[sid]
+
+
+class SymbolStore:
+    """
+    Per-symbol values held in a list indexed by SymbolTable id
+    Keeps the dict interface of the stores it replaces (store[symbol], in, get, items, ...) in insertion
+    order, and adds *_id methods for loops that already hold the id.
+    """
+
+    def __init__(self, symbol_table):
+        self.symbol_table = symbol_table
+        self._values = []        # id -> value
+        self._present = []       # id -> value is set
+        self._order = []         # ids in insertion order
+
+    def _reserve(self, sid):
+        if sid >= len(self._values):
+            grow = sid + 1 - len(self._values)
+            self._values.extend([None] * grow)
+            self._present.extend([False] * grow)
+
+    # id access
+    def has_id(self, sid):
+        return sid < len(self._present) and self._present[sid]
+
+    def get_id(self, sid, default=None):
+        return self._values[sid] if self.has_id(sid) else default
+
+    def set_id(self, sid, value):
+        self._reserve(sid)
+        if not self._present[sid]:
+            self._present[sid] = True
+            self._order.append(sid)
+        self._values[sid] = value
+
+    def pop_id(self, sid, *default):
+        if not self.has_id(sid):
+            if default:
+                return default[0]
+            raise KeyError(self.symbol_table.symbol(sid) if sid < len(self.symbol_table) else sid)
+        value = self._values[sid]
+        self._values[sid] = None
+        self._present[sid] = False
+        self._order.remove(sid)
+        return value
+
+    def ids(self):
+        return list(self._order)
+
+    # dict interface by Symbol
+    def __getitem__(self, symbol):
+        sid = self.symbol_table.id_of(symbol)
+        if sid is None or not self.has_id(sid):
+            raise KeyError(symbol)
+        return self._values[sid]
+
+    def __setitem__(self, symbol, value):
+        self.set_id(self.symbol_table.intern(symbol), value)
+
+    def __delitem__(self, symbol):
+        self.pop(symbol)
+
+    def __contains__(self, symbol):
+        sid = self.symbol_table.id_of(symbol)
+        return sid is not None and self.has_id(sid)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, symbol, default=None):
+        sid = self.symbol_table.id_of(symbol)
+        return default if sid is None else self.get_id(sid, default)
+
+    def pop(self, symbol, *default):
+        sid = self.symbol_table.id_of(symbol)
+        if sid is None:
+            if default:
+                return default[0]
+            raise KeyError(symbol)
+        return self.pop_id(sid, *default)
+
+    def keys(self):
+        symbols = self.symbol_table.symbols
+        return [symbols[sid] for sid in self._order]
+
+    def values(self):
+        return [self._values[sid] for sid in self._order]
+
+    def items(self):
+        symbols = self.symbol_table.symbols
+        return [(symbols[sid], self._values[sid]) for sid in self._order]
+
+    def update(self, other):
+        for symbol, value in other.items():
+            self[symbol] = value
+
+    def clear(self):
+        for sid in self._order:
+            self._values[sid] = None
+            self._present[sid] = False
+        self._order.clear()
+
+
+class SymbolArray:
+    """
+    Growable NumPy array with one numeric value per SymbolTable id
+    """
+
+    def __init__(self, fill, dtype=float, capacity=64):
+        self.fill = fill
+        self.values = np.full(capacity, fill, dtype=dtype)
+
+    def reserve(self, sid):
+        if sid >= len(self.values):
+            size = len(self.values)
+            while size <= sid:
+                size *= 2
+            values = np.full(size, self.fill, dtype=self.values.dtype)
+            values[:len(self.values)] = self.values
+            self.values = values
+
+    def __getitem__(self, sid):
+        return self.values[sid] if sid < len(self.values) else self.fill
+
+    def __setitem__(self, sid, value):
+        self.reserve(sid)
+        self.values[sid] = value
+
@@ -5,6 +5,12 @@ from AlgorithmImports import *
 
 import math
 import copy
+from datetime import timedelta
+import numpy as np
+from collections import deque
+from QuantConnect.Data.Consolidators import TradeBarConsolidator
+
+from SymbolTable import SymbolTable, SymbolArray
 
 
 def addDataIndicator(parent, indicator_name, class_name, algorithm, symbol, **kwargs):
@@ -12,11 +18,13 @@ def addDataIndicator(parent, indicator_name, class_name, algorithm, symbol, **kw
     # addDataIndicator(symbol, indicator_name, indicatorData_class, **kwargs)
     #   where kwargs are name/value of parameters required by indicatorData()
     # algorithm.Log("kwargs: " + str(kwargs))
+    # an instance with the same class and parameters for the symbol is shared through the indicator registry
+    # the registry updates it once per daily bar, consumers must not call update() on it themselves
 
-    # create data indicator instance
-    kwargs['algorithm'] = algorithm
-    kwargs['symbol'] = symbol
-    myInstance = class_name(**kwargs)
+    registry = algorithm.indicator_registry
+    myInstance = registry.acquire(indicator_name, class_name, symbol, kwargs)
+    if symbol not in registry.consolidators:
+        registry.subscribe(symbol, TradeBarConsolidator(timedelta(days=1)))
     if symbol in algorithm.IndicatorDataBySymbol:
         indicator_dictionary = algorithm.IndicatorDataBySymbol[symbol]
     else:
@@ -27,11 +35,116 @@ def addDataIndicator(parent, indicator_name, class_name, algorithm, symbol, **kw
     return myInstance
 
 
+def removeDataIndicator(parent, indicator_name, algorithm, symbol):
+    # release a Data Indicator added by addDataIndicator(), releasing an unbound name does nothing
+    # the shared instance is dropped when its last consumer releases it
+    for name in algorithm.indicator_registry.release(indicator_name, symbol):
+        indicator_dictionary = algorithm.IndicatorDataBySymbol.get(symbol)
+        if indicator_dictionary is not None:
+            indicator_dictionary.pop(name, None)
+            if len(indicator_dictionary) == 0:
+                algorithm.IndicatorDataBySymbol.pop(symbol)
+
+
+def _freeze(value):
+    # hashable form of an indicator parameter
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class IndicatorRegistry:
+    """
+    Shared data indicator instances keyed by (symbol, class, parameters), counted by the names bound to them
+    Every consumer asking for the same indicator gets the same instance, and dispatch() updates
+    each of a symbol's instances once per bar from the consolidator addDataIndicator() subscribes.
+    Shared instances are driven only by dispatch(), a consumer updating one itself would feed it
+    the same bar twice. Indicator data classes take algorithm and symbol keyword arguments and an
+    update(bar) method is used by dispatch().
+    """
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.entries = dict()        # key -> [instance, reference count]
+        self.keysBySymbol = dict()   # symbol -> keys in registration order
+        self.keyByName = dict()      # (symbol, indicator_name) -> key
+        self.consolidators = dict()  # symbol -> consolidator driving dispatch()
+
+    def acquire(self, indicator_name, class_name, symbol, kwargs):
+        key = (symbol, class_name, tuple(sorted((k, _freeze(v)) for k, v in kwargs.items())))
+        bound = self.keyByName.get((symbol, indicator_name))
+        if bound == key:
+            # every bound name holds one reference, acquiring it again does not add another
+            return self.entries[key][0]
+        if bound is not None:
+            # the name is rebound to another indicator, drop its reference to the previous one
+            self.release(indicator_name, symbol)
+        entry = self.entries.get(key)
+        if entry is None:
+            params = dict(kwargs)
+            params['algorithm'] = self.algorithm
+            params['symbol'] = symbol
+            entry = [class_name(**params), 0]
+            self.entries[key] = entry
+            self.keysBySymbol.setdefault(symbol, []).append(key)
+        entry[1] += 1
+        self.keyByName[(symbol, indicator_name)] = key
+        return entry[0]
+
+    def release(self, indicator_name, symbol):
+        """
+        Unbind indicator_name, the shared instance is dropped with its last bound name
+        :return: the released name, [] if it was not bound
+        """
+        key = self.keyByName.pop((symbol, indicator_name), None)
+        if key is None:
+            return []
+        entry = self.entries[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            # last consumer -- drop the instance
+            self.entries.pop(key)
+            keys = self.keysBySymbol[symbol]
+            keys.remove(key)
+            if len(keys) == 0:
+                self.keysBySymbol.pop(symbol)
+                self.unsubscribe(symbol)
+        return [indicator_name]
+
+    def instances(self, symbol):
+        return [self.entries[key][0] for key in self.keysBySymbol.get(symbol, [])]
+
+    def dispatch(self, symbol, bar):
+        # single bar dispatch to every indicator registered for symbol
+        for key in self.keysBySymbol.get(symbol, []):
+            self.entries[key][0].update(bar)
+
+    def subscribe(self, symbol, consolidator):
+        # drive dispatch() for symbol from one consolidator
+        if symbol in self.consolidators:
+            return
+        consolidator.DataConsolidated += self._on_bar
+        self.algorithm.SubscriptionManager.AddConsolidator(symbol, consolidator)
+        self.consolidators[symbol] = consolidator
+
+    def unsubscribe(self, symbol):
+        consolidator = self.consolidators.pop(symbol, None)
+        if consolidator is not None:
+            consolidator.DataConsolidated -= self._on_bar
+            self.algorithm.SubscriptionManager.RemoveConsolidator(symbol, consolidator)
+
+    def _on_bar(self, sender, bar):
+        self.dispatch(bar.Symbol, bar)
+
+
 def getDataIndicator(self, symbol, indicator_name):
     indicator_dictionary = self.algorithm.IndicatorDataBySymbol[symbol]
     return indicator_dictionary[indicator_name]
 
-def printSymbolList(algorithm, comment, symbols, sortlist=True):
+def printSymbolList(algorithm, comment, symbols, sortlist=True, component=None):
+    # component -- optional LogMeter component to charge the log bytes to
     symbol_list = ""
     temp_symbols = copy.copy(symbols)
     if sortlist:
@@ -40,7 +153,98 @@ def printSymbolList(algorithm, comment, symbols, sortlist=True):
         if symbol is not None:
             symbol_list += symbol.Value + ' '
     message = '{} {}: {}'.format(comment, len(symbols), symbol_list)
-    algorithm.Log(message)
+    if component is not None:
+        algorithm.log_meter.log(component, message)
+    else:
+        algorithm.Log(message)
+
+
+class LogMeter:
+    """
+    Log through algorithm.Log() and count the lines and bytes each component produces
+    Used to keep long backtests inside the LEAN per-backtest log limits
+    """
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.lines_by_component = dict()   # component -> log lines
+        self.bytes_by_component = dict()   # component -> log bytes
+
+    def log(self, component, message):
+        self.algorithm.Log(message)
+        self.lines_by_component[component] = self.lines_by_component.get(component, 0) + 1
+        self.bytes_by_component[component] = \
+            self.bytes_by_component.get(component, 0) + len(message.encode('utf-8'))
+
+    @property
+    def total_bytes(self):
+        return sum(self.bytes_by_component.values())
+
+    def report(self):
+        # log size summary, largest component first
+        self.algorithm.Log('-------- Log size by component --------')
+        for component, size in sorted(self.bytes_by_component.items(), key=lambda kv: kv[1], reverse=True):
+            self.algorithm.Log(f' {component:<10s} {self.lines_by_component[component]:>8d} lines {size:>10d} bytes')
+        self.algorithm.Log(f' {"total":<10s} {sum(self.lines_by_component.values()):>8d} lines {self.total_bytes:>10d} bytes')
+
+class EpochFlags:
+    """
+    Per-symbol feedback flags (circuit_breaker, hard_stop) cleared all at once by advancing an epoch
+    A flag counts as set only if it was raised in the current epoch, so reset() is O(1)
+    The raised epoch is kept in an array indexed by SymbolTable id
+    Keeps the dict usage of the old flags: flags[symbol] = True, flags[symbol], flags.get(symbol)
+    """
+
+    def __init__(self, symbol_table=None):
+        self.symbol_table = symbol_table if symbol_table is not None else SymbolTable()
+        self.epoch = 0
+        self._raised = SymbolArray(-1, dtype=np.int64)  # id -> epoch the flag was raised in
+
+    def reset(self):
+        # clear every flag
+        self.epoch += 1
+
+    def __setitem__(self, symbol, value):
+        self._raised[self.symbol_table.intern(symbol)] = self.epoch if value else -1
+
+    def __getitem__(self, symbol):
+        sid = self.symbol_table.id_of(symbol)
+        return sid is not None and bool(self._raised[sid] == self.epoch)
+
+    def __contains__(self, symbol):
+        return self[symbol]
+
+    def get(self, symbol, default=False):
+        # default is returned when the flag is not set
+        return True if self[symbol] else default
+
+    def raised(self):
+        # symbols flagged in the current epoch
+        symbols = self.symbol_table.symbols
+        return [symbols[sid] for sid in np.flatnonzero(self._raised.values == self.epoch)]
+
+
+class SelectionTracker:
+    """
+    Remember the previous universe selection and report what changed
+    update() returns False when the membership is identical, so the selection can return Universe.Unchanged
+    """
+
+    def __init__(self):
+        self.selected = frozenset()
+        self.added = frozenset()     # symbols new in the latest selection
+        self.removed = frozenset()   # symbols dropped by the latest selection
+        self.has_selection = False
+
+    def update(self, symbols):
+        current = frozenset(symbols)
+        self.added = current - self.selected
+        self.removed = self.selected - current
+        changed = not self.has_selection or len(self.added) > 0 or len(self.removed) > 0
+        self.selected = current
+        self.has_selection = True
+        return changed
+
 
 def direction_to_string(direction):
     enumText = "FLAT"
@@ -132,15 +336,6 @@ _up = InsightDirection.Up
 _down = InsightDirection.Down
 _flat = InsightDirection.Flat
 
-_firings = []  # maintain a list of all rules that fired
-_states = []
-_msg_buffer = []
-
-def init_firings():
-    _states.clear()
-    _firings.clear()
-    _msg_buffer.clear()
-
 class Firing:
     def __init__(self, symbolData, direction, time, price, description, \
                  confidence=0.0, magnitude=0.0, weight=0.0):
@@ -158,125 +353,222 @@ class State(Firing):
     pass
 
 
+class FiringContext:
+    """
+    Firing, state and message buffers for one rule evaluation pass
+    Give each symbol its own context to evaluate several symbols' rules concurrently
+    without the buffers interfering
+    """
+
+    def __init__(self):
+        self.firings = []  # maintain a list of all rules that fired
+        self.states = []
+        self.msg_buffer = []
+
+    def init(self):
+        # clear in place, the module level aliases of the default context share these lists
+        self.states.clear()
+        self.firings.clear()
+        self.msg_buffer.clear()
+
+    # fire() for rules that will emit an insight
+    def fire(self, symbolData, direction, _time, _price, comment, \
+             confidence=0.0, magnitude=0.0, weight=0.0):
+        self.firings.append(Firing(symbolData, direction, _time, _price, comment, confidence, magnitude, weight))
+
+    # state() for rules that record state but do not emit an insight
+    def state(self, symbolData, direction, _time, _price, comment, \
+              confidence=0.0, magnitude=0.0, weight=0.0):
+        self.states.append(State(symbolData, direction, _time, _price, comment, confidence, magnitude, weight))
+
+    def resolve(self, parent, insights):
+        # if detail logging = True then log everything for the specified interval
+        detail_logging = parent.algorithm.log_detail_insights
+        detail_start = parent.algorithm.detail_start
+        detail_end = parent.algorithm.detail_end
+        current_date = parent.algorithm.Time.strftime('%Y-%m-%d')
+    
+        # Get aggregate bullish and bearish confidence
+        final_insight = None
+        bullishConfidence = 0.0
+        bearishConfidence = 0.0
+        joined_list = self.firings + self.states
+        fire_number = 0
+        for f in joined_list:
+            if not final_insight:
+                final_insight = f  # grab 1st rule to populate final insight fields - why?
+            fire_number += 1
+            if f.direction > 0:
+                bullishConfidence += f.confidence
+            elif f.direction < 0:
+                bearishConfidence += f.confidence
+            # logging info
+            if parent.algorithm.log_insights:
+                if type(f) is Firing:
+                    ftype = "fire"
+                elif type(f) is State:
+                    ftype = "state"
+                else:
+                    ftype = "unknown"
+                # buffer final insight for output later, formatted only if output
+                parent.algorithm.logger.add(f.symbolData.symbol,
+                                            '{} #{} {.Value} {} {} c: {:.2f} m: {:.2f} w: {:.2f}',
+                                            ftype, fire_number, f.symbolData.symbol, direction_to_string(f.direction),
+                                            f.description, f.confidence, f.magnitude, f.weight)
+
+        # emit insight if had a firing
+        if len(self.firings) > 0:
+            # normalize confidence
+            if bullishConfidence >= 0.0:
+                bullishConfidence = min(bullishConfidence, 1.0)
+            else:
+                bullishConfidence = 0.0
+            if bearishConfidence >= 0.0:
+                bearishConfidence = min(bearishConfidence, 1.0)
+            else:
+                bearishConfidence = 0.0
+            if bullishConfidence > bearishConfidence:
+                final_insight.confidence = max(bullishConfidence - bearishConfidence, 0)
+                final_insight.direction = _up
+            elif bullishConfidence < bearishConfidence:
+                final_insight.confidence = max(bearishConfidence - bullishConfidence, 0)
+                final_insight.direction = _down
+            emit_insight(parent, final_insight, insights,
+                              final_insight.time, final_insight.price, final_insight.description)
+
+        # write detail log if required
+        f = final_insight
+        if detail_logging and detail_start <= current_date <= detail_end:
+            # output final insight
+            parent.algorithm.logger.add(f.symbolData.symbol, 'final_insight: {.Value} {} c: {:.2f} m: {:.2f} w: {:.2f}',
+                                        f.symbolData.symbol, direction_to_string(f.direction),
+                                        f.confidence, f.magnitude, f.weight)
+            # output cached log lines
+            parent.algorithm.logger.output(f.symbolData.symbol)
+    
+        # write log if have firings and changing direction
+        elif len(self.firings) > 0 and logit(parent, f.symbolData.symbol, final_insight.direction):
+            # output final insight
+            parent.algorithm.logger.add(f.symbolData.symbol, 'final_insight: {.Value} {} c: {:.2f} m: {:.2f} w: {:.2f}',
+                                        f.symbolData.symbol, direction_to_string(f.direction),
+                                        f.confidence, f.magnitude, f.weight)
+            if parent.algorithm.log_insights:
+                # output standard logging
+                parent.algorithm.logger.output(f.symbolData.symbol)
+
+        # clear for next time
+        self.init()
+        return
+
+
+# default context used when a rule function is not given one
+_default_context = FiringContext()
+_firings = _default_context.firings  # maintain a list of all rules that fired
+_states = _default_context.states
+_msg_buffer = _default_context.msg_buffer
+
+
+def init_firings(context=None):
+    (context or _default_context).init()
+
+
 # Handle firing logging
 class Logger:
-    def __init__(self, algorithm):
+    """
+    Buffer insight log messages per symbol until output()
+    Messages are kept as a format template and its arguments and only formatted when output,
+    most buffers are cleared without ever being printed.
+    Each symbol keeps its latest max_messages and output is limited to max_lines_per_day
+    to stay inside the LEAN log quota.
+    """
+
+    def __init__(self, algorithm, max_messages=50, max_lines_per_day=200):
         self.algorithm = algorithm
-        self.messagesBySymbol = dict()   # holds message List for given symbol
-
-    def add(self, symbol, message):
-        # if symbol doesn't exist then create it
-        if self.messagesBySymbol.get(symbol) == None:
-            self.messagesBySymbol.update({symbol:[]})
-        msg_list = self.messagesBySymbol.get(symbol, [])
-        msg_list.append(message)
+        self.max_messages = max_messages
+        self.max_lines_per_day = max_lines_per_day
+        self.symbol_table = algorithm.symbol_table
+        self.messagesBySymbol = dict()   # holds a bounded deque of (template, args) by symbol id
+        self.day = None
+        self.lines_today = 0
+        self.suppressed_today = 0
+
+    def add(self, symbol, template, *args):
+        # template is formatted with args by output(), a message without args is logged as is
+        sid = self.symbol_table.intern(symbol)
+        msg_list = self.messagesBySymbol.get(sid)
+        if msg_list is None:
+            msg_list = deque(maxlen=self.max_messages)
+            self.messagesBySymbol[sid] = msg_list
+        msg_list.append((template, args))
         return
     
     def clear(self, symbol):
-        if self.messagesBySymbol.get(symbol) != None:
-            self.messagesBySymbol.pop(symbol)
+        self.messagesBySymbol.pop(self.symbol_table.id_of(symbol), None)
         return
         
     def output(self, symbol):
-        msgs = self.messagesBySymbol.get(symbol, [])
-        for msg in msgs:
-            self.algorithm.Log(msg)
-        self.clear(symbol)
+        msgs = self.messagesBySymbol.pop(self.symbol_table.id_of(symbol), None)
+        if not msgs:
+            return
+        self._roll_day()
+        for template, args in msgs:
+            if self.lines_today >= self.max_lines_per_day:
+                self.suppressed_today += 1
+                continue
+            self.lines_today += 1
+            message = template.format(*args) if args else template
+            self.algorithm.log_meter.log('insights', message)
         return
 
-    
+    def _roll_day(self):
+        # reset the daily rate limit, report what the previous day dropped
+        day = self.algorithm.Time.date()
+        if day == self.day:
+            return
+        if self.suppressed_today > 0:
+            self.algorithm.log_meter.log('insights', f'* Logger suppressed {self.suppressed_today} lines on {self.day}')
+        self.day = day
+        self.lines_today = 0
+        self.suppressed_today = 0
+
+
 # fire() for rules that will emit an insight
 def fire(parent, symbolData, direction, _insights, _time, _price, comment, \
-         confidence=0.0, magnitude=0.0, weight=0.0):
-    x = Firing(symbolData, direction, _time, _price, comment, confidence, magnitude, weight)
-    _firings.append(x)
+         confidence=0.0, magnitude=0.0, weight=0.0, context=None):
+    (context or _default_context).fire(symbolData, direction, _time, _price, comment,
+                                       confidence, magnitude, weight)
 
 
 # state() for rules that record state but do not emit an insight
 def state(parent, symbolData, direction, _insights, _time, _price, comment, \
-          confidence=0.0, magnitude=0.0, weight=0.0):
-    x = State(symbolData, direction, _time, _price, comment, confidence, magnitude, weight)
-    _states.append(x)
-
-
-def resolve_firings(parent, insights):
-    # if detail logging = True then log everything for the specified interval
-    detail_logging = parent.algorithm.log_detail_insights
-    detail_start = parent.algorithm.detail_start
-    detail_end = parent.algorithm.detail_end
-    current_date = parent.algorithm.Time.strftime('%Y-%m-%d')
-    
-    # Get aggregate bullish and bearish confidence
-    final_insight = None
-    bullishConfidence = 0.0
-    bearishConfidence = 0.0
-    joined_list = _firings + _states
-    fire_number = 0
-    for f in joined_list:
-        if not final_insight:
-            final_insight = f  # grab 1st rule to populate final insight fields - why?
-        fire_number += 1
-        if f.direction > 0:
-            bullishConfidence += f.confidence
-        elif f.direction < 0:
-            bearishConfidence += f.confidence
-        # logging info
-        directionText = direction_to_string(f.direction)
-        if type(f) is Firing:
-            ftype = "fire"
-        elif type(f) is State:
-            ftype = "state"
-        else:
-            ftype = "unknown"
-        if parent.algorithm.log_insights:
-            # buffer final insight for output later
-            message = '{} #{} {} {} {} c: {:.2f} m: {:.2f} w: {:.2f}'. \
-                format(ftype, fire_number, f.symbolData.symbol.Value, directionText, f.description,
-                      f.confidence, f.magnitude, f.weight)
-            parent.algorithm.logger.add(f.symbolData.symbol, message)
-
-    # emit insight if had a firing
-    if len(_firings) > 0:
-        # normalize confidence
-        if bullishConfidence >= 0.0:
-            bullishConfidence = min(bullishConfidence, 1.0)
-        else:
-            bullishConfidence = 0.0
-        if bearishConfidence >= 0.0:
-            bearishConfidence = min(bearishConfidence, 1.0)
-        else:
-            bearishConfidence = 0.0
-        if bullishConfidence > bearishConfidence:
-            final_insight.confidence = max(bullishConfidence - bearishConfidence, 0)
-            final_insight.direction = _up
-        elif bullishConfidence < bearishConfidence:
-            final_insight.confidence = max(bearishConfidence - bullishConfidence, 0)
-            final_insight.direction = _down
-        emit_insight(parent, final_insight, insights,
-                          final_insight.time, final_insight.price, final_insight.description)
-
-    # write detail log if required
-    f = final_insight
-    if detail_logging and detail_start <= current_date <= detail_end:
-        # output final insight
-        enumText = direction_to_string(f.direction)
-        message = 'final_insight: {} {} c: {:.2f} m: {:.2f} w: {:.2f}'. \
-            format(f.symbolData.symbol.Value, enumText, f.confidence, f.magnitude, f.weight)
-        parent.algorithm.logger.add(f.symbolData.symbol, message)
-        # output cached log lines
-        parent.algorithm.logger.output(f.symbolData.symbol)
-    
-    # write log if have firings and changing direction
-    elif len(_firings) > 0 and logit(parent, f.symbolData.symbol, final_insight.direction):
-        # output final insight
-        enumText = direction_to_string(f.direction)
-        message = 'final_insight: {} {} c: {:.2f} m: {:.2f} w: {:.2f}'. \
-            format(f.symbolData.symbol.Value, enumText, f.confidence, f.magnitude, f.weight)
-        parent.algorithm.logger.add(f.symbolData.symbol, message)
-        if parent.algorithm.log_insights:
-            # output standard logging
-            parent.algorithm.logger.output(f.symbolData.symbol)
-
-    # clear for next time
-    init_firings()
-    return
+          confidence=0.0, magnitude=0.0, weight=0.0, context=None):
+    (context or _default_context).state(symbolData, direction, _time, _price, comment,
+                                        confidence, magnitude, weight)
+
+
+def resolve_firings(parent, insights, context=None):
+    (context or _default_context).resolve(parent, insights)
+
+
+def evaluate_symbols(parent, evaluate, symbol_data_list, insights, executor=None):
+    """
+    Evaluate and resolve the rules of several symbols, each with its own FiringContext
+    Only evaluate() runs on the executor threads, the contexts are resolved in order on the calling
+    thread because resolve() writes to the shared logger, log meter and insight list
+    :param evaluate: rule function evaluate(context, symbolData) that calls fire()/state() with context=context
+    :param symbol_data_list: symbolData objects to evaluate
+    :param insights: insight list updated by resolve
+    :param executor: optional concurrent.futures executor, symbols are evaluated in order when None
+    """
+    def run(symbolData):
+        context = FiringContext()
+        evaluate(context, symbolData)
+        return context
+
+    if executor is None:
+        contexts = [run(symbolData) for symbolData in symbol_data_list]
+    else:
+        contexts = [future.result() for future in [executor.submit(run, symbolData)
+                                                   for symbolData in symbol_data_list]]
+    for context in contexts:
+        context.resolve(parent, insights)
@@ -0,0 +1,78 @@
+# SyntheticUniverse
+'''
+Synthetic coarse/fine universes for the offline Engine (offline/BarFeed.py)
+Bars are geometric random walks on a business day calendar; each symbol's bars start at its IPO date.
+'''
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from FundamentalColumns import FUNDAMENTAL_FIELDS
+
+SYNTHETIC_DEFAULTS = {
+    'symbols': 1000,            # synthetic symbols, SPY is added on top
+    'years': 1,                 # backtest length in years
+    'history_years': 1.1,       # bars before the backtest start, CoarseSelection looks back 1 year
+    'start': '2020-01-01',
+    'liquid_fraction': 0.05,    # symbols whose dollar volume passes the coarse thresholds
+    'ipo_fraction': 0.1,        # symbols that IPO during the backtest (their bars start at the IPO)
+    'fundamental_fraction': 0.9,    # symbols with fundamental data (HasFundamentalData)
+    'seed': 0,
+}
+
+
+def synthetic_universe(config=None):
+    """
+    :param config: dict overriding SYNTHETIC_DEFAULTS
+    :return: (bars dict of ticker -> DataFrame, fundamentals DataFrame, start datetime, end datetime)
+    """
+    config = {**SYNTHETIC_DEFAULTS, **(config or {})}
+    rng = np.random.default_rng(config['seed'])
+    start = datetime.fromisoformat(config['start'])
+    end = start + timedelta(days=int(365.25 * config['years']))
+    first = start - timedelta(days=int(365.25 * config['history_years']))
+    calendar = pd.bdate_range(first, end)
+    n_days = len(calendar)
+    n = config['symbols']
+
+    tickers = ['SPY'] + [f'S{i:05d}' for i in range(n)]
+    liquid = np.concatenate([[True], rng.random(n) < config['liquid_fraction']])
+    # IPO during the backtest for ipo_fraction of the symbols, otherwise listed before the first bar
+    ipo_day = np.zeros(n + 1, dtype=int)
+    ipos = np.concatenate([[False], rng.random(n) < config['ipo_fraction']])
+    backtest_start = calendar.searchsorted(pd.Timestamp(start))
+    ipo_day[ipos] = rng.integers(backtest_start, n_days, ipos.sum())
+
+    bars = dict()
+    for i, ticker in enumerate(tickers):
+        days = n_days - ipo_day[i]
+        if days <= 0:
+            continue
+        drift, volatility = rng.normal(0.0003, 0.0004), rng.uniform(0.01, 0.04)
+        close = rng.uniform(15, 400) * np.exp(np.cumsum(rng.normal(drift, volatility, days)))
+        open = close * (1 + rng.normal(0, volatility / 4, days))
+        high = np.maximum(close, open) * (1 + np.abs(rng.normal(0, volatility / 2, days)))
+        low = np.minimum(close, open) * (1 - np.abs(rng.normal(0, volatility / 2, days)))
+        # liquid symbols trade $0.5B-$5B a day, the rest $1M-$100M
+        dollar_volume = np.exp(rng.uniform(np.log(5e8), np.log(5e9)) if liquid[i] else
+                               rng.uniform(np.log(1e6), np.log(1e8)))
+        volume = dollar_volume / close * rng.lognormal(0, 0.3, days)
+        bars[ticker] = pd.DataFrame({'open': open, 'high': high, 'low': low, 'close': close, 'volume': volume},
+                                    index=calendar[ipo_day[i]:])
+
+    has_fundamentals = rng.random(n + 1) < config['fundamental_fraction']
+    has_fundamentals[0] = False     # SPY is an ETF
+    rows = [i for i in range(n + 1) if has_fundamentals[i] and tickers[i] in bars]
+    fundamentals = {'symbol': [tickers[i] for i in rows]}
+    for name, (chain, dtype) in FUNDAMENTAL_FIELDS.items():
+        if name == 'ipo_date':
+            # listed IPO dates: the first bar, or years before it for symbols listed before the data starts
+            fundamentals[chain] = [calendar[ipo_day[i]] - pd.Timedelta(days=0 if ipos[i] else int(rng.integers(0, 7000)))
+                                   for i in rows]
+        elif name == 'market_cap':
+            fundamentals[chain] = np.exp(rng.uniform(np.log(1e8), np.log(2e12), len(rows)))
+        else:
+            fundamentals[chain] = rng.normal(0.05, 0.5, len(rows))
+    return bars, pd.DataFrame(fundamentals), start, end
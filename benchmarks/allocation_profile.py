@@ -0,0 +1,311 @@
+# allocation_profile
+'''
+tracemalloc allocation accounting for CoarseSymbolData.update and the selection hot loops
+
+    python benchmarks/allocation_profile.py [--symbols 150] [--years 0.25] [--out allocations.json]
+    python benchmarks/allocation_profile.py --check [--bars 200]
+
+Profile mode runs main:Proust on a synthetic universe (see selection_benchmark.py) with the hot
+functions wrapped, and reports for each one per call (per bar for the update functions) and per
+rebalance pass:
+    peak     -- bytes the call needed above what was allocated when it started (its temporaries)
+    retained -- bytes still allocated when it returned (including cyclic garbage the collector frees later)
+    blocks   -- net memory blocks (objects) still allocated when it returned
+Nested calls are accounted for: the peak of an inner call is folded into its caller's. The calibrated
+cost of the accounting is subtracted, small functions can show about -32 B per call of residue.
+
+Check mode is the allocation budget test: it streams steady state bars (every indicator ready)
+through CoarseSymbolData.update() and exits with status 1 when the mean per update exceeds
+UPDATE_BUDGET, so allocation regressions are caught.
+'''
+
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+from functools import wraps
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'offline'))
+import run as offline_run
+offline_run.setup_paths()
+sys.path.append(BENCH_DIR)
+
+from QuantConnect import Symbol
+import CourseSelection
+import FineSelection
+import WindowAnalytics
+from BarFeed import BarFeed
+from Engine import Engine
+from SyntheticUniverse import SYNTHETIC_DEFAULTS, synthetic_universe
+
+# mean bytes / blocks per steady state CoarseSymbolData.update(), measured with headroom
+# (measured: peak ~6.2 KB, the window_slope regressions dominate; retained ~130 B; blocks ~2.2)
+UPDATE_BUDGET = {
+    'peak': 8192,
+    'retained': 256,
+    'blocks': 4.0,
+}
+WARMUP_BARS = 300           # bars before every indicator of CoarseSymbolData is ready
+CHECK_SYMBOLS = 3
+
+# (owner, attribute, label) of the profiled functions
+# the WindowAnalytics functions are also bound in CourseSelection by its star import
+HOT_FUNCTIONS = [
+    (CourseSelection.CoarseSelection, 'CoarseSelectionFunction', 'CoarseSelectionFunction'),
+    (FineSelection.FineSelection, 'FineSelectionFunction', 'FineSelectionFunction'),
+    (CourseSelection.CoarseSymbolData, 'update', 'CoarseSymbolData.update'),
+    (CourseSelection.BetaSymbolData, 'update', 'BetaSymbolData.update'),
+    (CourseSelection.Phase1SelectionData, 'update', 'Phase1SelectionData.update'),
+    (CourseSelection, 'TradeBar', 'TradeBar()'),
+    (WindowAnalytics.Scale, 'update', 'Scale.update'),
+    (WindowAnalytics.Slope, 'update', 'Slope.update'),
+    (WindowAnalytics.LineDiff, 'update', 'LineDiff.update'),
+    (WindowAnalytics, 'window_slope', 'window_slope'),
+    (CourseSelection, 'window_slope', 'window_slope'),
+    (WindowAnalytics, 'WMA_signal', 'WMA_signal'),
+    (CourseSelection, 'WMA_signal', 'WMA_signal'),
+    (WindowAnalytics, 'SMA_signal', 'SMA_signal'),
+    (CourseSelection, 'SMA_signal', 'SMA_signal'),
+    (WindowAnalytics, 'relative_area', 'relative_area'),
+    (CourseSelection, 'relative_area', 'relative_area'),
+]
+
+
+class AllocationProfiler:
+    """
+    Per function allocation accounting with tracemalloc
+    Each wrapped call records (peak above its start, retained bytes, net blocks) into the current pass,
+    the calibrated cost of the accounting itself is subtracted in summary()
+    """
+
+    def __init__(self):
+        self.passes = []            # (label, {function: [calls, peak, retained, blocks]})
+        self.functions = dict()     # the current pass
+        self.label = 'startup'
+        self._stack = []            # [start bytes, highest bytes seen] of the open calls
+        self._installed = []        # (owner, attribute, original)
+        self.overhead = (0.0, 0.0, 0.0)     # (peak, retained, blocks) of the accounting itself per call
+
+    def calibrate(self, calls=500):
+        # allocation of the accounting itself, measured on an empty function and subtracted from every call
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        functions, self.functions = self.functions, dict()
+        probe = self._wrap(lambda: None, 'probe')
+        for _ in range(calls):
+            probe()
+        count, peak, retained, blocks = self.functions['probe']
+        self.functions = functions
+        self.overhead = (peak / count, retained / count, blocks / count)
+        if not tracing:
+            tracemalloc.stop()
+
+    def install(self, targets=HOT_FUNCTIONS):
+        for owner, attribute, label in targets:
+            original = getattr(owner, attribute)
+            self._installed.append((owner, attribute, original))
+            setattr(owner, attribute, self._wrap(original, label))
+
+    def uninstall(self):
+        for owner, attribute, original in reversed(self._installed):
+            setattr(owner, attribute, original)
+        self._installed = []
+
+    def begin_pass(self, label):
+        if len(self.functions) > 0:
+            self.passes.append((self.label, self.functions))
+        self.functions = dict()
+        self.label = label
+
+    def _wrap(self, fn, label):
+        profiler = self
+
+        @wraps(fn)
+        def profiled(*args, **kwargs):
+            if not tracemalloc.is_tracing():
+                return fn(*args, **kwargs)
+            stack = profiler._stack
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # the caller's highest point so far, before the peak is reset for this call
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            blocks = sys.getallocatedblocks()
+            frame = [current, current]
+            stack.append(frame)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                after, peak = tracemalloc.get_traced_memory()
+                stack.pop()
+                high = max(frame[1], peak)
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], high)
+                stats = profiler.functions.get(label)
+                if stats is None:
+                    stats = profiler.functions[label] = [0, 0, 0, 0]
+                stats[0] += 1
+                stats[1] += high - frame[0]
+                stats[2] += after - frame[0]
+                stats[3] += sys.getallocatedblocks() - blocks
+        return profiled
+
+    def all_passes(self):
+        passes = list(self.passes)
+        if len(self.functions) > 0:
+            passes.append((self.label, self.functions))
+        return passes
+
+    def summary(self):
+        """
+        :return: {'functions': {label: per call means}, 'passes': [{label, functions}]}
+        """
+        passes = self.all_passes()
+        return {
+            'functions': self.summary_of(passes),
+            'passes': [{'label': label, 'functions': self.summary_of([(label, functions)])}
+                       for label, functions in passes],
+        }
+
+    def summary_of(self, passes):
+        # per call means by function label over the given passes
+        def per_call(stats):
+            calls, peak, retained, blocks = stats
+            peak -= self.overhead[0] * calls
+            retained -= self.overhead[1] * calls
+            blocks -= self.overhead[2] * calls
+            return {'calls': calls, 'peak': peak / calls, 'retained': retained / calls, 'blocks': blocks / calls,
+                    'total_peak': peak, 'total_retained': retained}
+
+        totals = dict()
+        for _, functions in passes:
+            for label, stats in functions.items():
+                total = totals.setdefault(label, [0, 0, 0, 0])
+                for i, value in enumerate(stats):
+                    total[i] += value
+        return {label: per_call(stats) for label, stats in totals.items()}
+
+
+def profile_selection(config=None, algorithm='main:Proust'):
+    """
+    Run the algorithm on a synthetic universe with the hot functions profiled
+    A new pass starts whenever CoarseSelectionFunction moves its selection_time (a rebalance)
+    """
+    config = {**SYNTHETIC_DEFAULTS, **(config or {})}
+    bars, fundamentals, start, end = synthetic_universe(config)
+    feed = BarFeed(bars, fundamentals)
+    profiler = AllocationProfiler()
+    profiler.calibrate()
+    profiler.install()
+    original = CourseSelection.CoarseSelection.CoarseSelectionFunction
+
+    def coarse_selection(self, coarse):
+        before = self.selection_time
+        if self.algorithm.Time >= before:
+            profiler.begin_pass(f'{self.algorithm.Time:%Y-%m-%d}')
+        return original(self, coarse)
+    CourseSelection.CoarseSelection.CoarseSelectionFunction = coarse_selection
+
+    tracemalloc.start()
+    try:
+        engine = Engine(offline_run.load_algorithm(algorithm), feed, start=start, end=end)
+        engine.run()
+    finally:
+        tracemalloc.stop()
+        CourseSelection.CoarseSelection.CoarseSelectionFunction = original
+        profiler.uninstall()
+    return {'benchmark': 'allocations', 'config': config, **profiler.summary()}
+
+
+def steady_state_updates(bars=200, symbols=CHECK_SYMBOLS, seed=0):
+    """
+    Mean allocation per CoarseSymbolData.update() once every indicator is ready
+    :return: {'calls', 'peak', 'retained', 'blocks'}
+    """
+    class _Algorithm:
+        Time = datetime(2020, 1, 1)
+
+        @staticmethod
+        def Log(message):
+            pass
+
+    rng = np.random.default_rng(seed)
+    count = WARMUP_BARS + bars
+    times = [datetime(2019, 1, 1) + timedelta(days=i) for i in range(count)]
+    profiler = AllocationProfiler()
+    profiler.calibrate()
+    profiler.install([(CourseSelection.CoarseSymbolData, 'update', 'update')])
+    # traced from the first bar, objects allocated before tracing starts are not subtracted when freed
+    tracemalloc.start()
+    try:
+        for i in range(symbols):
+            close = (rng.uniform(15, 400) * np.exp(np.cumsum(rng.normal(0.0003, 0.02, count)))).tolist()
+            volume = rng.lognormal(13, 0.3, count).tolist()
+            data = CourseSelection.CoarseSymbolData(_Algorithm, Symbol.Create(f'ALLOC{i}'))
+            rows = list(zip(times, close, volume))
+            profiler.begin_pass('warmup')
+            for time, price, shares in rows[:WARMUP_BARS]:
+                data.update(time, price, price, price * 1.01, price * 0.99, shares, price * shares)
+            assert data.isReady, 'steady_state_updates() indicators not ready after the warm-up'
+            profiler.begin_pass('steady')
+            for time, price, shares in rows[WARMUP_BARS:]:
+                data.update(time, price, price, price * 1.01, price * 0.99, shares, price * shares)
+    finally:
+        tracemalloc.stop()
+        profiler.uninstall()
+    profiler.begin_pass('end')
+    steady = [functions['update'] for label, functions in profiler.passes if label == 'steady']
+    return profiler.summary_of([('steady', {'update': [sum(stats[i] for stats in steady) for i in range(4)]})])['update']
+
+
+def check_budget(bars=200):
+    measured = steady_state_updates(bars)
+    failures = [name for name, budget in UPDATE_BUDGET.items() if measured[name] > budget]
+    for name, budget in UPDATE_BUDGET.items():
+        print(f"{name:<9} {measured[name]:>12.1f} per update  budget {budget:>10}  "
+              f"{'FAIL' if name in failures else 'ok'}")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Allocation accounting for the selection hot loops')
+    parser.add_argument('--check', action='store_true', help='enforce the per update allocation budget')
+    parser.add_argument('--bars', type=int, default=200, help='steady state bars per symbol for --check')
+    parser.add_argument('--symbols', type=int, default=150)
+    parser.add_argument('--years', type=float, default=0.25)
+    parser.add_argument('--seed', type=int, default=SYNTHETIC_DEFAULTS['seed'])
+    parser.add_argument('--algorithm', default='main:Proust', help='module:Class to run')
+    parser.add_argument('--out', help='write the profile JSON to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.check:
+        return 1 if check_budget(args.bars) else 0
+
+    results = profile_selection({'symbols': args.symbols, 'years': args.years, 'seed': args.seed}, args.algorithm)
+    print(f"{'function':<28} {'calls':>9} {'peak B/call':>12} {'retained B/call':>16} {'blocks/call':>12}")
+    ranked = sorted(results['functions'].items(), key=lambda kv: kv[1]['total_peak'], reverse=True)
+    for label, stats in ranked:
+        print(f"{label:<28} {stats['calls']:>9} {stats['peak']:>12.0f} {stats['retained']:>16.1f} {stats['blocks']:>12.2f}")
+    for rebalance in results['passes']:
+        update = rebalance['functions'].get('CoarseSymbolData.update')
+        if update is not None:
+            print(f"pass {rebalance['label']:<12} {update['calls']:>7} bars  {update['peak']:>8.0f} B peak/bar  "
+                  f"{update['total_retained'] / 1024:>10.1f} KB retained")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
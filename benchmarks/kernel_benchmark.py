@@ -0,0 +1,235 @@
+# kernel_benchmark
+'''
+Microbenchmark and parity suite for the WindowAnalytics kernels
+
+    python benchmarks/kernel_benchmark.py [--kernels window_slope,WMA_signal] [--sizes 9,20,90]
+        [--distributions trend,nan] [--min-time 0.005] [--repeats 5] [--parity-only] [--out kernels.json]
+
+Every kernel is timed over window sizes and input distributions (including zeros, negatives and NaNs)
+and its output is compared against the frozen copy in ReferenceKernels.py. Exits with status 1 when
+any case loses parity, so faster replacements can be validated automatically.
+'''
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+from time import perf_counter
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'offline'))
+import run as offline_run
+offline_run.setup_paths()
+sys.path.append(BENCH_DIR)
+
+from QuantConnect.Indicators import RollingWindow
+import WindowAnalytics as current
+import ReferenceKernels as reference
+
+SIZES = [5, 9, 20, 50, 90, 253]
+SCALE_WINDOW = 90       # Scale's fixed min/max window
+DISTRIBUTIONS = ['trend', 'noise', 'negative', 'zeros', 'sparse_zeros', 'nan', 'tiny', 'large']
+WINDOW_KERNELS = ['SMA_signal', 'WMA_signal', 'window_slope', 'relative_area']
+STREAM_KERNELS = ['Scale', 'Scale_delta', 'LineDiff', 'Slope']
+KERNELS = WINDOW_KERNELS + STREAM_KERNELS
+
+
+def series(distribution, length, seed):
+    rng = np.random.default_rng(seed)
+    trend = 100.0 * np.exp(np.cumsum(rng.normal(0.001, 0.02, length)))
+    if distribution == 'trend':
+        return trend
+    if distribution == 'noise':
+        return rng.normal(0.0, 1.0, length)
+    if distribution == 'negative':
+        return -trend
+    if distribution == 'zeros':
+        return np.zeros(length)
+    if distribution == 'sparse_zeros':
+        return np.where(rng.random(length) < 0.2, 0.0, trend)
+    if distribution == 'nan':
+        return np.where(rng.random(length) < 0.1, np.nan, trend)
+    if distribution == 'tiny':
+        return trend * 1e-9
+    if distribution == 'large':
+        return trend * 1e12
+    raise ValueError(f'unknown distribution: {distribution}')
+
+
+def filled_window(values, size):
+    # added twice the window size so the ring buffer has wrapped
+    window = RollingWindow[float](size)
+    for value in values[-2 * size:].tolist():
+        window.Add(value)
+    return window
+
+
+class _Parent:
+    # stand-in for the CoarseSymbolData passed as parent (used for exception logging only)
+    class algorithm:
+        @staticmethod
+        def Log(message):
+            pass
+
+    class symbol:
+        Value = 'BENCH'
+
+
+def window_case(module, kernel, size, values, other):
+    """
+    :return: zero argument callable running the kernel once on prepared windows
+    """
+    window = filled_window(values, size)
+    if kernel == 'SMA_signal':
+        return lambda: module.SMA_signal(window)
+    if kernel == 'WMA_signal':
+        return lambda: module.WMA_signal(window)
+    if kernel == 'window_slope':
+        return lambda: module.window_slope(_Parent, window)
+    line2 = filled_window(other, size)
+    return lambda: module.relative_area(size, window, line2)
+
+
+def stream_case(module, kernel, values, other):
+    """
+    :return: zero argument callable feeding the whole stream through a new instance, returning the outputs
+    """
+    values = values.tolist()
+    other = other.tolist()
+
+    def run():
+        outputs = []
+        if kernel in ('Scale', 'Scale_delta'):
+            scale = module.Scale(_Parent, delta=kernel == 'Scale_delta')
+            for value in values:
+                scale.update(value)
+                outputs.append((scale.scale, scale.max, scale.min))
+        elif kernel == 'LineDiff':
+            scale = module.Scale(_Parent, delta=False)
+            line_diff = module.LineDiff(_Parent, scale)
+            for a, b in zip(values, other):
+                scale.update(a - b)
+                line_diff.update(a, b)
+                outputs.append((line_diff.magnitude, line_diff.magnitude_change, line_diff.a_above_b,
+                                line_diff.parallel, bool(line_diff.crossing), line_diff.converging,
+                                line_diff.diverging))
+        else:
+            scale = module.Scale(_Parent, delta=True)
+            slope = module.Slope(_Parent, scale)
+            for value in values:
+                scale.update(value)
+                slope.update(value)
+                outputs.append((slope.magnitude, slope.magnitude_change))
+        return outputs
+    return run
+
+
+def outcome(fn):
+    # result, or the exception type name so raising the same exception counts as parity
+    try:
+        return fn()
+    except Exception as e:
+        return type(e).__name__
+
+
+def same(a, b, rel_tol=1e-9, abs_tol=1e-12):
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(same(x, y, rel_tol, abs_tol) for x, y in zip(a, b))
+    if isinstance(a, str) or isinstance(b, str) or isinstance(a, bool) or isinstance(b, bool):
+        return a == b
+    a, b = float(a), float(b)
+    if math.isnan(a) or math.isnan(b):
+        return math.isnan(a) and math.isnan(b)
+    return a == b or math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol)
+
+
+def ns_per_call(fn, min_time, repeats, calls=1):
+    # doubles the loop count until one repeat takes min_time, returns the median over repeats
+    number = 1
+    while True:
+        started = perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number *= 2
+    times = [elapsed]
+    for _ in range(repeats - 1):
+        started = perf_counter()
+        for _ in range(number):
+            fn()
+        times.append(perf_counter() - started)
+    return statistics.median(times) / (number * calls) * 1e9
+
+
+def run_suite(kernels=KERNELS, sizes=SIZES, distributions=DISTRIBUTIONS, min_time=0.005, repeats=5,
+              timing=True):
+    cases = []
+    for kernel in kernels:
+        stream = kernel in STREAM_KERNELS
+        for size in ([SCALE_WINDOW] if stream else sizes):
+            for distribution in distributions:
+                length = 3 * size + 10
+                values = series(distribution, length, seed=size)
+                other = series(distribution, length, seed=size + 1)
+                if stream:
+                    fn, ref = stream_case(current, kernel, values, other), stream_case(reference, kernel, values, other)
+                    calls = length
+                else:
+                    fn, ref = window_case(current, kernel, size, values, other), window_case(reference, kernel, size, values, other)
+                    calls = 1
+                case = {'kernel': kernel, 'size': size, 'distribution': distribution,
+                        'parity': same(outcome(fn), outcome(ref))}
+                if timing:
+                    case['ns_per_call'] = ns_per_call(lambda: outcome(fn), min_time, repeats, calls)
+                    case['reference_ns_per_call'] = ns_per_call(lambda: outcome(ref), min_time, repeats, calls)
+                    case['speedup'] = case['reference_ns_per_call'] / case['ns_per_call']
+                cases.append(case)
+    return {
+        'benchmark': 'kernels',
+        'cases': cases,
+        'parity_failures': sum(1 for case in cases if not case['parity']),
+    }
+
+
+def parse_args(argv=None):
+    def names(text):
+        return [name for name in text.split(',') if name]
+
+    parser = argparse.ArgumentParser(description='WindowAnalytics kernel microbenchmark and parity suite')
+    parser.add_argument('--kernels', type=names, default=KERNELS)
+    parser.add_argument('--sizes', type=lambda text: [int(size) for size in names(text)], default=SIZES)
+    parser.add_argument('--distributions', type=names, default=DISTRIBUTIONS)
+    parser.add_argument('--min-time', type=float, default=0.005, help='seconds per timing repeat')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--parity-only', action='store_true', help='check parity without timing')
+    parser.add_argument('--out', help='write the results JSON to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_suite(args.kernels, args.sizes, args.distributions, args.min_time, args.repeats,
+                        timing=not args.parity_only)
+    for case in results['cases']:
+        timing = ''
+        if 'ns_per_call' in case:
+            timing = f"{case['ns_per_call']:>12.0f} ns  ref {case['reference_ns_per_call']:>12.0f} ns  " \
+                     f"x{case['speedup']:.2f}"
+        print(f"{case['kernel']:<14} {case['size']:>4} {case['distribution']:<13} "
+              f"{'ok  ' if case['parity'] else 'FAIL'} {timing}")
+    print(f"parity failures: {results['parity_failures']}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if results['parity_failures'] > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,302 @@
+# regression_gate
+'''
+Performance regression gate for the selection pipeline
+
+    python benchmarks/regression_gate.py [--baseline benchmarks/baseline.json] [--repeats 7]
+        [--threshold 0.15] [--alloc-threshold 0.10] [--metrics coarse_update,fine_scoring] [--update] [--out report.json]
+
+Measures the pipeline, compares it against the committed baseline and exits with status 1 on a regression:
+    coarse_update   -- CoarseSymbolData.update() per bar, streaming synthetic bars through new symbols
+    rebalance       -- coarse and fine rebalance latency of main:Proust on a small synthetic universe
+                       (selection_benchmark.run_benchmark)
+    fine_scoring    -- RankScorer.order() over a fine universe sized column set
+Every timing is repeated and summarized by its median and MAD (median absolute deviation). A timing
+regresses when its median is slower than the baseline median by more than the threshold AND by more than
+NOISE_MADS times the larger MAD, so run to run noise does not fail the gate. Allocations (tracemalloc
+peak of one extra pass) are deterministic and are compared against the threshold only.
+Baselines are machine specific: regenerate with --update on the machine that runs the gate.
+'''
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+from time import perf_counter
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'offline'))
+import run as offline_run
+offline_run.setup_paths()
+sys.path.append(BENCH_DIR)
+
+from QuantConnect import Symbol
+from CourseSelection import CoarseSymbolData
+from FactorScoring import RankScorer
+from selection_benchmark import run_benchmark
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+BASELINE_VERSION = 1
+NOISE_MADS = 3.0            # a timing must also move by this many MADs to count as a regression
+
+COARSE_SYMBOLS = 5          # symbols streamed per coarse_update repeat
+COARSE_BARS = 400           # bars per symbol, enough for every indicator to become ready
+REBALANCE_CONFIG = {'symbols': 150, 'years': 0.25, 'seed': 0}
+FINE_ROWS = 2000
+FINE_CALLS = 50             # RankScorer.order() calls per fine_scoring repeat
+FINE_WEIGHTS = {'price_diff_pct_spot': 0.5, 'fcf_yield': 0.25, 'revenue_growth_3m': 0.25, 'price_to_high': 1.0}
+
+
+class _Algorithm:
+    # the algorithm handle CoarseSymbolData and its analytics use for logging
+    Time = datetime(2020, 1, 1)
+
+    @staticmethod
+    def Log(message):
+        pass
+
+
+def median_mad(samples):
+    median = statistics.median(samples)
+    return median, statistics.median([abs(sample - median) for sample in samples])
+
+
+def peak_kb(fn):
+    # tracemalloc peak of one call, KB
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024.0
+    finally:
+        tracemalloc.stop()
+
+
+class Workload:
+    """
+    One benchmarked part of the pipeline
+    sample() runs it once and returns {metric: seconds}, allocations() returns {metric: KB}
+    """
+    name = ''
+    units = dict()          # metric -> unit, for the report
+
+    def prepare(self):
+        pass
+
+    def sample(self):
+        raise NotImplementedError
+
+    def allocations(self):
+        return dict()
+
+
+class CoarseUpdateWorkload(Workload):
+    name = 'coarse_update'
+    units = {'coarse_update.per_bar': 'us', 'coarse_update.peak': 'KB'}
+
+    def prepare(self):
+        rng = np.random.default_rng(0)
+        start = datetime(2019, 1, 1)
+        self.times = [start + timedelta(days=i) for i in range(COARSE_BARS)]
+        self.bars = []
+        for i in range(COARSE_SYMBOLS):
+            close = rng.uniform(15, 400) * np.exp(np.cumsum(rng.normal(0.0003, 0.02, COARSE_BARS)))
+            open = close * (1 + rng.normal(0, 0.005, COARSE_BARS))
+            high = np.maximum(close, open) * 1.01
+            low = np.minimum(close, open) * 0.99
+            volume = rng.lognormal(13, 0.3, COARSE_BARS)
+            self.bars.append([row for row in zip(close.tolist(), open.tolist(), high.tolist(), low.tolist(),
+                                                 volume.tolist(), (close * volume).tolist())])
+        self.symbols = [Symbol.Create(f'GATE{i}') for i in range(COARSE_SYMBOLS)]
+
+    def stream(self, count=COARSE_SYMBOLS):
+        for symbol, bars in zip(self.symbols[:count], self.bars[:count]):
+            data = CoarseSymbolData(_Algorithm, symbol)
+            for time, (close, open, high, low, volume, dollar_volume) in zip(self.times, bars):
+                data.update(time, close, open, high, low, volume, dollar_volume)
+
+    def sample(self):
+        started = perf_counter()
+        self.stream()
+        return {'coarse_update.per_bar': (perf_counter() - started) / (COARSE_SYMBOLS * COARSE_BARS) * 1e6}
+
+    def allocations(self):
+        # one symbol's full history, the peak includes the retained indicator state
+        return {'coarse_update.peak': peak_kb(lambda: self.stream(count=1))}
+
+
+class RebalanceWorkload(Workload):
+    name = 'rebalance'
+    units = {'rebalance.coarse': 's', 'rebalance.fine': 's', 'rebalance.peak': 'KB'}
+
+    def sample(self):
+        selection = run_benchmark(REBALANCE_CONFIG)['selection']
+        # the median rebalance of the run, the first coarse rebalance includes the warm-up of every symbol
+        return {f'rebalance.{name}': selection[name]['median']
+                for name in ('coarse', 'fine') if selection.get(name, {}).get('median') is not None}
+
+    def allocations(self):
+        return {'rebalance.peak': peak_kb(lambda: run_benchmark(REBALANCE_CONFIG))}
+
+
+class FineScoringWorkload(Workload):
+    name = 'fine_scoring'
+    units = {'fine_scoring.order': 'us', 'fine_scoring.peak': 'KB'}
+
+    def prepare(self):
+        rng = np.random.default_rng(0)
+        self.scorer = RankScorer(FINE_WEIGHTS, ties='ordinal')
+        # rounded so the columns contain ties, with a few NaNs like missing fundamentals
+        self.columns = {name: np.where(rng.random(FINE_ROWS) < 0.02, np.nan, np.round(rng.normal(0, 1, FINE_ROWS), 2))
+                        for name in FINE_WEIGHTS}
+        self.tiebreak = rng.normal(0, 1, FINE_ROWS)
+
+    def order(self):
+        return self.scorer.order(self.columns, FINE_ROWS, tiebreak=self.tiebreak)
+
+    def sample(self):
+        started = perf_counter()
+        for _ in range(FINE_CALLS):
+            self.order()
+        return {'fine_scoring.order': (perf_counter() - started) / FINE_CALLS * 1e6}
+
+    def allocations(self):
+        return {'fine_scoring.peak': peak_kb(self.order)}
+
+
+WORKLOADS = {workload.name: workload for workload in (CoarseUpdateWorkload, RebalanceWorkload, FineScoringWorkload)}
+
+
+def measure(names, repeats, allocations=True):
+    """
+    :return: dict of metric -> {'kind', 'unit', 'median', 'mad', 'samples'}
+    """
+    metrics = dict()
+    for name in names:
+        workload = WORKLOADS[name]()
+        workload.prepare()
+        workload.sample()   # warm up imports and caches
+        samples = dict()
+        for _ in range(repeats):
+            for metric, value in workload.sample().items():
+                samples.setdefault(metric, []).append(value)
+        for metric, values in samples.items():
+            median, mad = median_mad(values)
+            metrics[metric] = {'kind': 'time', 'unit': workload.units[metric], 'median': median, 'mad': mad,
+                               'samples': values}
+        if allocations:
+            for metric, value in workload.allocations().items():
+                metrics[metric] = {'kind': 'alloc', 'unit': workload.units[metric], 'median': value, 'mad': 0.0,
+                                   'samples': [value]}
+    return metrics
+
+
+def compare(metrics, baseline, threshold, alloc_threshold):
+    """
+    :param metrics: measure() result
+    :param baseline: baseline file dict, a metric may carry its own 'threshold'
+    :return: list of result dicts, status 'ok', 'improved', 'regressed' or 'new' (not in the baseline)
+    """
+    results = []
+    for metric, current in metrics.items():
+        result = {'metric': metric, 'unit': current['unit'], 'current': current['median']}
+        base = baseline.get('metrics', {}).get(metric)
+        if base is None:
+            results.append({**result, 'status': 'new'})
+            continue
+        limit = base.get('threshold', alloc_threshold if current['kind'] == 'alloc' else threshold)
+        change = current['median'] / base['median'] - 1.0 if base['median'] > 0 else 0.0
+        noise = NOISE_MADS * max(current['mad'], base.get('mad', 0.0))
+        delta = current['median'] - base['median']
+        if change > limit and delta > noise:
+            status = 'regressed'
+        elif change < -limit and -delta > noise:
+            status = 'improved'
+        else:
+            status = 'ok'
+        results.append({**result, 'baseline': base['median'], 'change': change, 'threshold': limit, 'status': status})
+    return results
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {'metrics': dict()}
+    with open(path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('version') != BASELINE_VERSION:
+        raise ValueError(f'regression_gate: {path} has baseline version {baseline.get("version")}, '
+                         f'expected {BASELINE_VERSION}, regenerate it with --update')
+    return baseline
+
+
+def save_baseline(path, metrics, previous):
+    # measured metrics replace their previous entries, per metric thresholds are kept
+    entries = dict(previous.get('metrics', {}))
+    for metric, current in metrics.items():
+        entry = {'kind': current['kind'], 'unit': current['unit'], 'median': current['median'], 'mad': current['mad']}
+        if 'threshold' in entries.get(metric, {}):
+            entry['threshold'] = entries[metric]['threshold']
+        entries[metric] = entry
+    baseline = {
+        'version': BASELINE_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'metrics': dict(sorted(entries.items())),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Selection pipeline performance regression gate')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file')
+    parser.add_argument('--repeats', type=int, default=7, help='timed runs per workload')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed timing slowdown (0.15 = 15%%)')
+    parser.add_argument('--alloc-threshold', type=float, default=0.10, help='allowed allocation growth')
+    parser.add_argument('--metrics', type=lambda text: [name for name in text.split(',') if name],
+                        default=list(WORKLOADS), help=f'workloads to run: {",".join(WORKLOADS)}')
+    parser.add_argument('--no-alloc', action='store_true', help='skip the allocation passes')
+    parser.add_argument('--update', action='store_true', help='write the measurements as the new baseline')
+    parser.add_argument('--out', help='write the comparison report JSON to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    unknown = [name for name in args.metrics if name not in WORKLOADS]
+    if unknown:
+        raise ValueError(f'regression_gate: unknown workloads {unknown}')
+    baseline = load_baseline(args.baseline)
+    metrics = measure(args.metrics, args.repeats, allocations=not args.no_alloc)
+
+    if args.update:
+        save_baseline(args.baseline, metrics, baseline)
+        for metric, current in sorted(metrics.items()):
+            print(f"{metric:<24} {current['median']:>14.3f} {current['unit']:<3} mad {current['mad']:.3f}")
+        print(f'baseline written to {args.baseline}')
+        return 0
+
+    results = compare(metrics, baseline, args.threshold, args.alloc_threshold)
+    for result in results:
+        if result['status'] == 'new':
+            print(f"{result['metric']:<24} {result['current']:>14.3f} {result['unit']:<3} (not in baseline)")
+        else:
+            print(f"{result['metric']:<24} {result['current']:>14.3f} {result['unit']:<3} "
+                  f"baseline {result['baseline']:>14.3f}  {result['change']:+7.1%}  {result['status']}")
+    regressions = [result['metric'] for result in results if result['status'] == 'regressed']
+    print(f'regressions: {", ".join(regressions) if regressions else "none"}')
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'results': results, 'metrics': metrics}, f, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
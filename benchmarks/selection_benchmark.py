@@ -0,0 +1,171 @@
+# selection_benchmark
+'''
+End-to-end benchmark of the universe selection on a synthetic universe
+
+    python benchmarks/selection_benchmark.py [--symbols 1000] [--years 1] [--liquid-fraction 0.05]
+        [--ipo-fraction 0.1] [--fundamental-fraction 0.9] [--seed 0] [--out results.json]
+
+Runs main:Proust under the offline Engine (offline/) through the whole backtest calendar and reports
+wall time per engine phase, the latency of every rebalance pass of CoarseSelectionFunction and
+FineSelectionFunction, the algorithm's per phase timing spans (Metrics.py), History() call counts and
+peak RSS, as JSON so runs can be compared.
+'''
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+from time import perf_counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'offline'))
+import run as offline_run
+offline_run.setup_paths()
+sys.path.append(BENCH_DIR)
+
+from BarFeed import BarFeed
+from Engine import Engine
+from SyntheticUniverse import SYNTHETIC_DEFAULTS, synthetic_universe
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class SelectionTimer:
+    """
+    Times every call of the wrapped selection functions
+    A call is a rebalance when it moves the selection_time of the object it is bound to
+    """
+
+    def __init__(self):
+        self.calls = dict()         # name -> number of calls
+        self.rebalances = dict()    # name -> [seconds] of every rebalance call
+
+    def wrap(self, name, fn):
+        if fn is None:
+            return None
+        owner = getattr(fn, '__self__', None)
+        self.calls[name] = 0
+        self.rebalances[name] = []
+
+        def timed(*args):
+            before = getattr(owner, 'selection_time', None)
+            started = perf_counter()
+            result = fn(*args)
+            elapsed = perf_counter() - started
+            self.calls[name] += 1
+            if getattr(owner, 'selection_time', None) != before:
+                self.rebalances[name].append(elapsed)
+            return result
+        return timed
+
+    def summary(self):
+        summary = dict()
+        for name, seconds in self.rebalances.items():
+            ordered = sorted(seconds)
+            summary[name] = {
+                'calls': self.calls[name],
+                'rebalances': len(seconds),
+                'mean': sum(seconds) / len(seconds) if seconds else None,
+                'median': ordered[len(ordered) // 2] if ordered else None,
+                'max': ordered[-1] if ordered else None,
+                'seconds': seconds,
+            }
+        return summary
+
+
+def instrumented(algorithm_class, timer):
+    # subclass that times the selection functions registered with AddUniverse
+    class Instrumented(algorithm_class):
+        def AddUniverse(self, coarse, fine=None):
+            super().AddUniverse(timer.wrap('coarse', coarse), timer.wrap('fine', fine))
+    Instrumented.__name__ = algorithm_class.__name__
+    return Instrumented
+
+
+def run_benchmark(config=None, algorithm='main:Proust'):
+    """
+    :param config: dict overriding SYNTHETIC_DEFAULTS
+    :return: results dict
+    """
+    config = {**SYNTHETIC_DEFAULTS, **(config or {})}
+    started = perf_counter()
+    bars, fundamentals, start, end = synthetic_universe(config)
+    generated = perf_counter()
+    feed = BarFeed(bars, fundamentals)
+    loaded = perf_counter()
+    rss_data = peak_rss_mb()
+
+    timer = SelectionTimer()
+    engine = Engine(instrumented(offline_run.load_algorithm(algorithm), timer), feed, start=start, end=end)
+    engine.run()
+    finished = perf_counter()
+
+    price_service = getattr(engine.algorithm, 'price_service', None)
+    metrics = getattr(engine.algorithm, 'metrics', None)
+    phases = {'generate': generated - started, 'load': loaded - generated}
+    phases.update(engine.timings)
+    return {
+        'benchmark': 'selection',
+        'config': config,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'data': {
+            'symbols': len(bars),
+            'bars': int(sum(len(frame) for frame in bars.values())),
+            'trading_days': engine.days,
+        },
+        'wall_seconds': finished - started,
+        'phases': phases,
+        'selection': timer.summary(),
+        'spans': metrics.summary() if metrics is not None else None,
+        'history': {
+            'calls': engine.history_calls,
+            'symbols': engine.history_symbols,
+            'price_service_calls': price_service.history_calls if price_service is not None else None,
+        },
+        'peak_rss_mb': {'data': rss_data, 'end': peak_rss_mb()},
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Synthetic universe selection benchmark')
+    parser.add_argument('--symbols', type=int, default=SYNTHETIC_DEFAULTS['symbols'])
+    parser.add_argument('--years', type=float, default=SYNTHETIC_DEFAULTS['years'])
+    parser.add_argument('--start', default=SYNTHETIC_DEFAULTS['start'])
+    parser.add_argument('--liquid-fraction', type=float, default=SYNTHETIC_DEFAULTS['liquid_fraction'])
+    parser.add_argument('--ipo-fraction', type=float, default=SYNTHETIC_DEFAULTS['ipo_fraction'])
+    parser.add_argument('--fundamental-fraction', type=float, default=SYNTHETIC_DEFAULTS['fundamental_fraction'])
+    parser.add_argument('--seed', type=int, default=SYNTHETIC_DEFAULTS['seed'])
+    parser.add_argument('--algorithm', default='main:Proust', help='module:Class to run')
+    parser.add_argument('--out', help='write the results JSON to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = {
+        'symbols': args.symbols,
+        'years': args.years,
+        'start': args.start,
+        'liquid_fraction': args.liquid_fraction,
+        'ipo_fraction': args.ipo_fraction,
+        'fundamental_fraction': args.fundamental_fraction,
+        'seed': args.seed,
+    }
+    results = run_benchmark(config, args.algorithm)
+    text = json.dumps(results, indent=2, default=str)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    return results
+
+
+if __name__ == '__main__':
+    main()
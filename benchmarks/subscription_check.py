@@ -0,0 +1,108 @@
+# subscription_check
+'''
+Offline check of the SubscriptionPolicy upgrade / release path on a synthetic universe
+
+    python benchmarks/subscription_check.py [--symbols 300] [--years 1] [--seed 0] [--out results.json]
+
+Runs main:Proust under the offline Engine with a stand-in alpha that calls request_trading() for every
+security the universe adds, then checks every trading day, after the market open release, that only
+symbols still in the selection (and the pinned market symbol) hold a trading resolution subscription,
+and that released symbols are no longer subscribed. Reports the upgrade / release counts and symbol days, exits 1 on a violation.
+'''
+
+import argparse
+import json
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'offline'))
+import run as offline_run
+offline_run.setup_paths()
+sys.path.append(BENCH_DIR)
+
+from BarFeed import BarFeed
+from Engine import Engine
+from SyntheticUniverse import SYNTHETIC_DEFAULTS, synthetic_universe
+from main import Proust
+
+
+class TradingProust(Proust):
+    """
+    Proust with a stand-in alpha: every added security is upgraded to the trading resolution
+    The policy invariants are checked once per trading day
+    """
+
+    def Initialize(self):
+        super().Initialize()
+        self.violations = []
+        self.max_traded = 0
+
+    def OnSecuritiesChanged(self, changes):
+        super().OnSecuritiesChanged(changes)
+        for security in changes.AddedSecurities:
+            self.subscription_policy.request_trading(security.Symbol)
+
+    def OnMarketOpen(self):
+        super().OnMarketOpen()
+        policy = self.subscription_policy
+        selected = self.fine_selection.selection_tracker.selected
+        stale = (policy.traded - policy.pinned) - selected
+        if len(stale) > 0:
+            self.violations.append(f'{self.Time:%Y-%m-%d} traded outside the selection: '
+                                   f'{sorted(symbol.Value for symbol in stale)}')
+        self.max_traded = max(self.max_traded, len(policy.traded))
+
+
+def run_check(config=None):
+    config = {**SYNTHETIC_DEFAULTS, **(config or {})}
+    bars, fundamentals, start, end = synthetic_universe(config)
+    engine = Engine(TradingProust, BarFeed(bars, fundamentals), start=start, end=end)
+    engine.run()
+    algorithm = engine.algorithm
+    policy = algorithm.subscription_policy
+
+    violations = list(algorithm.violations)
+    released = {symbol for symbol in engine.subscribed if symbol not in policy.traded and symbol not in policy.pinned}
+    if len(released) > 0:
+        violations.append(f'released symbols still subscribed: {sorted(symbol.Value for symbol in released)}')
+    if policy.upgrades == 0 or policy.releases == 0:
+        violations.append(f'upgrade / release path not exercised ({policy.upgrades} upgrades, '
+                          f'{policy.releases} releases)')
+    return {
+        'check': 'subscription',
+        'config': config,
+        'trading_days': engine.days,
+        'upgrades': policy.upgrades,
+        'releases': policy.releases,
+        'max_traded': algorithm.max_traded,
+        'symbol_days': policy.symbol_days,
+        'traded_symbol_days': policy.traded_symbol_days,
+        'data_points': policy.data_points,
+        'violations': violations,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline check of the subscription upgrade / release path')
+    parser.add_argument('--symbols', type=int, default=300)
+    parser.add_argument('--years', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=SYNTHETIC_DEFAULTS['seed'])
+    parser.add_argument('--out', help='write the results JSON to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_check({'symbols': args.symbols, 'years': args.years, 'seed': args.seed})
+    text = json.dumps(results, indent=2, default=str)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    return 1 if len(results['violations']) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
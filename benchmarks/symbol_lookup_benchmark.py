@@ -0,0 +1,123 @@
+# symbol_lookup_benchmark
+'''
+Per-symbol lookup throughput: dict keyed by Symbol against SymbolStore / SymbolTable access by id
+
+    python benchmarks/symbol_lookup_benchmark.py [--symbols 2000] [--rounds 100] [--repeats 5] [--out lookups.json]
+
+Offline the Symbol is the stand-in Python class, so the dict[Symbol] and Symbol.Value rows show the
+Python side cost only; under LEAN both cross the .NET interop boundary and the by-id rows are the
+ones SymbolStore callers use in hot loops.
+'''
+
+import argparse
+import json
+import os
+import statistics
+import sys
+from time import perf_counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'offline'))
+import run as offline_run
+offline_run.setup_paths()
+sys.path.append(BENCH_DIR)
+
+from QuantConnect import Symbol
+from SymbolTable import SymbolTable, SymbolStore
+
+
+def lookup_benchmark(symbols, rounds=100):
+    """
+    Compare per-symbol lookup throughput of a dict keyed by Symbol against SymbolStore access by id
+    :param symbols: list of Symbols
+    :param rounds: passes over the symbols per measurement
+    :return: dict of lookups per second by method
+    """
+    table = SymbolTable()
+    by_symbol = dict()
+    store = SymbolStore(table)
+    for i, symbol in enumerate(symbols):
+        by_symbol[symbol] = i
+        store[symbol] = i
+    ids = [table.id_of(symbol) for symbol in symbols]
+    lookups = rounds * len(symbols)
+
+    def rate(run):
+        start = perf_counter()
+        run()
+        elapsed = perf_counter() - start
+        return lookups / elapsed if elapsed > 0 else float('inf')
+
+    def dict_lookup():
+        for _ in range(rounds):
+            for symbol in symbols:
+                by_symbol[symbol]
+
+    def symbol_value():
+        for _ in range(rounds):
+            for symbol in symbols:
+                symbol.Value
+
+    def store_symbol():
+        for _ in range(rounds):
+            for symbol in symbols:
+                store[symbol]
+
+    def store_id():
+        values = store._values
+        for _ in range(rounds):
+            for sid in ids:
+                values[sid]
+
+    def table_ticker():
+        tickers = table.tickers
+        for _ in range(rounds):
+            for sid in ids:
+                tickers[sid]
+
+    return {
+        'dict[Symbol]': rate(dict_lookup),
+        'Symbol.Value': rate(symbol_value),
+        'SymbolStore[Symbol]': rate(store_symbol),
+        'SymbolStore by id': rate(store_id),
+        'SymbolTable ticker by id': rate(table_ticker),
+    }
+
+
+def run_suite(count, rounds, repeats):
+    """
+    :return: dict with the median lookups per second of every method over repeats
+    """
+    symbols = [Symbol.Create(f'L{i:05d}') for i in range(count)]
+    samples = [lookup_benchmark(symbols, rounds) for _ in range(repeats)]
+    return {
+        'benchmark': 'symbol_lookup',
+        'config': {'symbols': count, 'rounds': rounds, 'repeats': repeats},
+        'lookups_per_second': {method: statistics.median(sample[method] for sample in samples)
+                               for method in samples[0]},
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Per-symbol lookup throughput benchmark')
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=100, help='passes over the symbols per measurement')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--out', help='write the results JSON to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_suite(args.symbols, args.rounds, args.repeats)
+    for method, rate in results['lookups_per_second'].items():
+        print(f'{method:<26s} {rate / 1e6:>8.2f} M lookups/s')
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,17 @@ QCAlgorithmFrameworkBridge = QCAlgorithm
 # include algorithm dependent classes
 from CoarseSelection import CoarseSelection
 from FineSelection import FineSelection
+import WindowAnalytics
+from PriceService import PriceService
+from PerformanceLedger import PerformanceLedger
+from ReportWriter import ReportSink
+from ListProvider import CachedListProvider
+from Checkpoint import IndicatorCheckpoints
+from Interop import InteropCounter
+from Metrics import MetricsRegistry
+from Startup import StartupOrchestrator
+from SubscriptionPolicy import SubscriptionPolicy
+from SymbolTable import SymbolTable, SymbolStore
 #from OitaAlphaDaily import *
 # from OitaAlpha30min import *
 #from YokkaichiAlpha import *
@@ -44,6 +55,9 @@ from FineSelection import FineSelection
 #from UniverseHistogram import *
 from Utils import *
 from pytz import timezone
+import math
+import sys
+import numpy as np
 
 
 class Proust(QCAlgorithm):
@@ -57,6 +71,8 @@ class Proust(QCAlgorithm):
         self.SetEndDate(2021, 1, 1)
         self.SetCash(100000)  # Set Strategy Cash
         self.run_starttime = self.Time      # save for calculating history from the start
+        # independent startup I/O, run once on the algorithm thread before the first selection callback
+        self.startup = StartupOrchestrator(self)
 
 
         # Setup Rebalance and Reporting period
@@ -71,6 +87,9 @@ class Proust(QCAlgorithm):
         self.period_start = self.current_period
         self.period_end = None
 
+        # dense integer ids for the per-symbol stores
+        self.symbol_table = SymbolTable()
+
         ########################
         # logging control
         ########################
@@ -85,6 +104,21 @@ class Proust(QCAlgorithm):
         self.log_fine_selected = False        # log symbol values for fundamental filter selected
         self.log_allocation = False           # log allocation details
         self.log_performance_summary = True   # log period performance report
+        self.portfolio_history_logging = 'delta'  # 'delta' logs only new cells each selection, 'full' reprints all cohorts
+        self.log_meter = LogMeter(self)           # counts log bytes by component
+        self.log_obv_report = True            # also log the end of run report as '_obv' csv lines
+        self.metrics = MetricsRegistry(self, enabled=True)  # selection phase timing spans, summarized at the end
+        # count Python/.NET crossings (RollingWindow, EMA, Ichimoku, TradeBar, fundamental chains) per call site
+        # and rebalance, every proxied call is timed so this slows the backtest down
+        self.interop = InteropCounter(self, enabled=False)
+        self.interop.install([sys.modules[CoarseSelection.__module__], WindowAnalytics])
+        # persist per-symbol indicator state at the end of the run, later backtests restore it instead of
+        # warming up new symbols from a full year of history
+        self.checkpoints = IndicatorCheckpoints(self, enabled=False)
+
+        # end of run report tables are streamed to this ObjectStore key
+        self.report_key = 'proust/report'
+        self.report_format = 'csv'            # 'csv' or 'parquet' (needs pyarrow or fastparquet)
 
         # portfolio_metrics.metricsBySymbol[symbol]->MetricData->metricsByPeriod[month]->PeriodMetricData
         # self.portfolio_metrics = PortfolioMetrics(self)
@@ -92,7 +126,8 @@ class Proust(QCAlgorithm):
         # self.allocation_model = PortfolioAllocationModel(self, self.portfolio_metrics)
         self.coarseDataBySymbol = None  # set in CoarseSelection() to allow handle to indicator data
         # self.kawasakiDataBySymbol = None # for sharing data outside of Kawasaki
-        self.IndicatorDataBySymbol = dict()
+        self.IndicatorDataBySymbol = SymbolStore(self.symbol_table)
+        self.indicator_registry = IndicatorRegistry(self)  # shared instances behind addDataIndicator()
 
         # Universe filter parameters
         # TODO: make this a kwargs dictionary and pass into Coarse/Fine Selection
@@ -103,7 +138,9 @@ class Proust(QCAlgorithm):
         self.max_universe_size = 10     # max universe selected including keepers
         self.keep_percent = 0.5        # keep percent of existing but not selected stocks
         # Setup global Universe parameters
-        self.UniverseSettings.Resolution = Resolution.Minute
+        # selection and tracking only use daily closes, traded symbols are upgraded by the subscription policy
+        self.UniverseSettings.Resolution = Resolution.Daily
+        self.subscription_policy = SubscriptionPolicy(self, trading_resolution=Resolution.Minute)
         self.UniverseSettings.ExtendedMarketHours = False
         self.UniverseSettings.Leverage = 2
 
@@ -124,30 +161,47 @@ class Proust(QCAlgorithm):
         self.market_ticker = "SPY"
         self.spy = self.AddEquity(self.market_ticker, Resolution.Minute, 'USA', True, 1, False).Symbol
         self.market_symbol = None   # will be set in CoarseSelection to get the correct symbol value
+        self.subscription_policy.pin(self.spy)   # SPY is already subscribed at minute resolution
         self.SetBenchmark(self.market_ticker)
         
 
         self.selected_stocks = list(list())   #list of list of monthly selected stocks
-        self.monthly_data = list(list())      #list of list of monthly selected stocks performance over time
-        self.monthly_percent_data = list(list())    #2d array of monthly selected portfolio vs percent change in price from starting price
+        self.ledger = None                    #PerformanceLedger of monthly selected stocks performance over time, set below
         self.filter_criteria = list()
-        self.spy_percent = list()
-
-        self.chart = Chart("Monthly Data")    #Chart of monthly price of selected stocks
-        self.AddChart(self.chart)
-        self.chart.AddSeries(Series(SeriesType.Line, name="SPY"))
 
-        self.percent_chart = Chart("Monthly Percent Change")    #Chart of percent increase price from price bought at to current price
-        self.AddChart(self.percent_chart)
-        self.percent_chart.AddSeries(Series(SeriesType.Line, name="SPY"))
-
-        self.spy_intial_price = self.History(self.spy, 1, Resolution.Daily)['close'][0]
-        
-        cs = CoarseSelection(self, max_coarse_count,
-                             price_threshold=price_threshold,
-                             max_price_limit=max_price_limit,
-                             dollar_volume_threshold=dollar_volume_threshold)
-        fs = FineSelection(self)
+        # batched and cached latest close lookups for portfolio tracking
+        # the SPY history request is deferred to the startup join, the ledger is created once it is joined
+        self.price_service = PriceService(self)
+        self.spy_intial_price = None
+        self.startup.submit('spy_history', self.price_service.latest_close, self.spy)
+        self.startup.on_join.append(self.OnStartupJoined)
+
+        with self.startup.step('charts'):
+            self.chart = Chart("Monthly Data")    #Chart of monthly price of selected stocks
+            self.AddChart(self.chart)
+            self.chart.AddSeries(Series(SeriesType.Line, name="SPY"))
+
+            self.percent_chart = Chart("Monthly Percent Change")    #Chart of percent increase price from price bought at to current price
+            self.AddChart(self.percent_chart)
+            self.percent_chart.AddSeries(Series(SeriesType.Line, name="SPY"))
+
+        # handpicked / exclude spreadsheets, re-downloaded when the cached copy is older than the ttl
+        self.list_provider = CachedListProvider(self, ttl=timedelta(hours=12))
+
+        # streaming: daily consolidators keep subscribed coarse data current between rebalances
+        self.coarse_streaming = False
+        # return Universe.Unchanged from coarse when its membership is unchanged (skips fine selection)
+        self.coarse_unchanged_short_circuit = False
+        with self.startup.step('selection_setup'):
+            cs = CoarseSelection(self, max_coarse_count,
+                                 price_threshold=price_threshold,
+                                 max_price_limit=max_price_limit,
+                                 dollar_volume_threshold=dollar_volume_threshold,
+                                 streaming=self.coarse_streaming,
+                                 unchanged_short_circuit=self.coarse_unchanged_short_circuit)
+            fs = FineSelection(self)
+        self.coarse_selection = cs
+        self.fine_selection = fs    # fine_selection.selection_tracker holds the latest added/removed symbols
 
         # AddUniverse
         self.AddUniverse(cs.CoarseSelectionFunction, fs.FineSelectionFunction)
@@ -182,14 +236,14 @@ class Proust(QCAlgorithm):
         # set circuit_breaker[symbol] = True in RiskManagementModel
         # PortfolioManager ignore trades while circuit_breaker[symbol] = true
         # Reset circuit_breaker on new day
-        self.circuit_breaker = dict()  # [symbol] -> boolean
+        self.circuit_breaker = EpochFlags(self.symbol_table)  # [symbol] -> boolean, reset() advances the day epoch
         
         # Hard Stop feedback mechanism
         # used for Trailing Stops and SuperTrend
         # set hard_stop[symbol] = True in RiskManagementModel
         # PortfolioManager sends a down insight if hard_stop[symbol] = true
         # Reset hard_stop inside PortfolionManager
-        self.hard_stop = dict()  # [symbol] -> boolean
+        self.hard_stop = EpochFlags(self.symbol_table)  # [symbol] -> boolean, cleared per symbol with hard_stop[symbol] = False
 
         # Setup scheduled events
         # Only place trades when market is open but allow indicator data on extended hours
@@ -209,12 +263,22 @@ class Proust(QCAlgorithm):
         self.Schedule.On(self.DateRules.WeekStart(), self.TimeRules.At(0, 0), self.OnWeekStart)
         self.Schedule.On(self.DateRules.WeekEnd(), self.TimeRules.At(16, 0), self.OnWeekEnd)
 
+    def OnStartupJoined(self):
+        # runs on the algorithm thread once the startup tasks have finished
+        self.spy_intial_price = self.startup.result('spy_history')
+        if self.spy_intial_price is None:
+            # the ledger divides by it, nothing can be tracked without it
+            raise RuntimeError(f'no initial close for {self.spy.Value}, History returned no data')
+        self.ledger = PerformanceLedger(self.spy_intial_price)
+
     def OnMarketOpen(self):
         self.market_is_open = True
-        # clear circuit_breaker flag to allow trades
-        for s in self.Securities:
-            security = s.Value
-            self.circuit_breaker[security.Symbol] = False
+        # clear circuit_breaker flags to allow trades
+        self.circuit_breaker.reset()
+        self.subscription_policy.tally_day()
+
+    def OnData(self, data):
+        self.subscription_policy.on_data(data)
 
     def OnMarketClose(self):
         self.market_is_open = False
@@ -249,48 +313,61 @@ class Proust(QCAlgorithm):
             return
 
     def OnEndOfAlgorithm(self):
-
-        #csv logging
-        #logging price csv
-        self.Log("_obv Price of stocks by month,")
-        for (price_list, filt) in zip(self.monthly_data, self.filter_criteria):
-            message = "_obv " + filt + ","
-            for price in price_list:
-                message += str(price) + ","
-            self.Log(message)
-        self.Log("_obv Percent change of stock compared to purchase price,")
-        for (percent_list, filt) in zip(self.monthly_percent_data, self.filter_criteria):
-            message = "_obv " + filt + ","
-            for percent in percent_list:
-                message += str(percent) + ","
-            self.Log(message)
-
-        self.Log("_obv Percent change compared to SPY")
-        avg = list()
-        for (percent_list, spy_percent) in zip(self.monthly_percent_data, self.spy_percent):
-            message = "_obv " + filt + ","
-            average = 0
-            for percent in percent_list:
-                if percent is not None and spy_percent is not None:
-                    message += str(percent - spy_percent) + ","
-                    average += percent - spy_percent
-            average /= len(percent_list)
-            avg.append(average)
-            self.Log(message)
-        
-        message = "_obv Average Percent Change,"
-        for a in avg:
-            message += str(a) + ","
-        self.Log(message)
+        self.startup.join()     # no-op unless no selection ran
+
+        # result tables from the performance ledger
+        ledger = self.ledger
+        labels = self.filter_criteria[:ledger.cohort_count]
+        percent = ledger.percent
+        relative = ledger.relative_to_spy()
+        avg = ledger.cohort_averages()
+        price_rows = [ledger.row(ledger.prices, i) for i in range(len(labels))]
+        percent_rows = [ledger.row(percent, i) for i in range(len(labels))]
+        relative_rows = [ledger.row(relative, i) for i in range(len(labels))]
+        relative_rows = [row[~np.isnan(row)] for row in relative_rows]
+
+        # stream the tables to the ObjectStore instead of the log
+        with ReportSink(self.report_key, store=self.ObjectStore, fmt=self.report_format) as sink:
+            sink.write_table('price', labels, [row.tolist() for row in price_rows])
+            sink.write_table('percent', labels, [row.tolist() for row in percent_rows])
+            sink.write_table('vs_spy', labels, [row.tolist() for row in relative_rows])
+            sink.write_table('average', ['Average Percent Change'], [avg.tolist()])
+        self.log_meter.log('report', f'* report tables written to {", ".join(sink.paths)}')
         if len(avg) > 0:
-            avgavg = sum(avg) / len(avg)
-            self.Log("_obv Percent change in portfolio compared to spy," + str(avgavg))
+            avgavg = np.mean(avg)
+            self.log_meter.log('report', "Percent change in portfolio compared to spy: " + str(avgavg))
 
+        #csv logging
+        if self.log_obv_report:
+            #logging price csv
+            self.log_meter.log('report', "_obv Price of stocks by month,")
+            for filt, row in zip(labels, price_rows):
+                self.log_meter.log('report', "_obv " + filt + "," + _csv_cells(row))
+            self.log_meter.log('report', "_obv Percent change of stock compared to purchase price,")
+            for filt, row in zip(labels, percent_rows):
+                self.log_meter.log('report', "_obv " + filt + "," + _csv_cells(row))
+            self.log_meter.log('report', "_obv Percent change compared to SPY")
+            for filt, row in zip(labels, relative_rows):
+                self.log_meter.log('report', "_obv " + filt + "," + _csv_cells(row))
+            self.log_meter.log('report', "_obv Average Percent Change," + _csv_cells(avg))
+            if len(avg) > 0:
+                self.log_meter.log('report', "_obv Percent change in portfolio compared to spy," + str(avgavg))
+
+        self.checkpoints.save_all(self.coarse_selection.dataBySymbol, self.coarse_selection.betaDataBySymbol)
 
         self.Log(f'>> Algorithm End: {self.Time} <<')
+        self.log_meter.report()
+        self.metrics.report()
+        self.interop.report()
+        self.subscription_policy.report()
         # TODO: rework histogram to handle week periods
         # self.histogram.print_histogram(self.portfolio_metrics)
 
+    def OnSecuritiesChanged(self, changes):
+        self.subscription_policy.on_securities_changed(changes)
+        if self.coarse_selection.streamer is not None:
+            self.coarse_selection.streamer.on_securities_changed(changes)
+
     def OnOrderEvent(self, fill):
         # process order history recording and logging
         if fill.Status != OrderStatus.Filled:
@@ -309,5 +386,10 @@ class Proust(QCAlgorithm):
                 message = 'Order Filled @{}: BUY {} {:.0f}sh @${:0.2f} = {:.2f} -- Total Portfolio Value: ${:0.2f}' \
                     .format(self.Time, fill.Symbol.Value, fill.FillQuantity, fill.FillPrice,
                             fill.FillQuantity * fill.FillPrice, self.Portfolio.TotalPortfolioValue)
-            self.Log(message)
-            self.Log('----------------------------------------------')
+            self.log_meter.log('orders', message)
+            self.log_meter.log('orders', '----------------------------------------------')
+
+
+def _csv_cells(values):
+    # ledger cells as csv text, undefined (NaN) cells are written as None
+    return "".join(("None" if math.isnan(v) else str(v)) + "," for v in values.tolist())
@@ -0,0 +1,24 @@
+# AlgorithmImports -- offline stand-in
+'''
+Star import of the offline QuantConnect stand-in plus the python modules LEAN's AlgorithmImports exposes
+Put this directory first on sys.path (offline/run.py does) so the algorithm modules import it unmodified
+'''
+
+from datetime import date, datetime, timedelta
+import math
+import numpy as np
+import pandas as pd
+
+from QuantConnect import *
+from QuantConnect.Indicators import *
+from QuantConnect.Data import *
+from QuantConnect.Data.Market import *
+from QuantConnect.Data.Consolidators import *
+from QuantConnect.Data.UniverseSelection import *
+from QuantConnect.Securities import *
+from QuantConnect.Orders import *
+from QuantConnect.Algorithm import *
+from QuantConnect.Algorithm.Framework.Alphas import *
+from QuantConnect.Algorithm.Framework.Portfolio import *
+from QuantConnect.Algorithm.Framework.Risk import *
+from QuantConnect.Algorithm.Framework.Execution import *
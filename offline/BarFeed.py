@@ -0,0 +1,163 @@
+# BarFeed
+'''
+Daily bars (and optional Morningstar fields) for the offline Engine, loaded from local CSV/Parquet files
+
+Bar files: one '<TICKER>.csv' or '<TICKER>.parquet' per symbol with columns
+    time (or date), open, high, low, close, volume
+Fundamentals file (optional): a 'symbol' column with the ticker, an optional 'time' column for
+point-in-time values and one column per Morningstar property chain, e.g.
+    symbol, SecurityReference.IPODate, ValuationRatios.FCFYield, OperationRatios.RevenueGrowth.ThreeMonths
+'''
+
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from QuantConnect import Symbol
+from QuantConnect.Data.Market import TradeBar
+
+BAR_COLUMNS = ['close', 'high', 'low', 'open', 'volume']   # History() column order
+
+
+def _read_table(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+class BarFeed:
+    """
+    Like LEAN, a daily bar for trading date d is indexed by its end time (d + 1 day, midnight)
+    """
+
+    def __init__(self, bars, fundamentals=None):
+        '''
+        param: bars -- dict of ticker -> DataFrame with a time/date column (or DatetimeIndex) and BAR_COLUMNS
+        param: fundamentals -- optional DataFrame in the fundamentals file layout
+        '''
+        self.frames = dict()        # Symbol -> DataFrame indexed by bar end time
+        self.end_times = dict()     # Symbol -> datetime64[ns] array of bar end times
+        self.values = dict()        # Symbol -> (bars x BAR_COLUMNS) array
+        day_parts, symbol_parts, row_parts = [], [], []
+        for ticker, frame in bars.items():
+            symbol = Symbol.Create(ticker)
+            frame = frame.copy()
+            if 'time' in frame.columns or 'date' in frame.columns:
+                frame = frame.set_index('time' if 'time' in frame.columns else 'date')
+            times = pd.DatetimeIndex(pd.to_datetime(frame.index)).normalize()
+            frame.index = times + pd.Timedelta(days=1)
+            frame.index.name = 'time'
+            frame = frame[BAR_COLUMNS].astype(float).sort_index()
+            frame = frame[~frame.index.duplicated(keep='last')]
+            self.frames[symbol] = frame
+            self.end_times[symbol] = frame.index.values
+            self.values[symbol] = frame.values
+            day_parts.append((frame.index.values - np.timedelta64(1, 'D')).astype('datetime64[D]'))
+            symbol_parts.append(np.full(len(frame), len(symbol_parts), dtype=np.int32))
+            row_parts.append(np.arange(len(frame), dtype=np.int32))
+
+        # (symbol, row) of every bar grouped by trading date, as flat arrays so large universes stay compact
+        self._symbol_list = list(self.frames.keys())
+        days = np.concatenate(day_parts) if day_parts else np.array([], dtype='datetime64[D]')
+        order = np.argsort(days, kind='stable')
+        self._bar_symbols = np.concatenate(symbol_parts)[order] if day_parts else np.array([], dtype=np.int32)
+        self._bar_rows = np.concatenate(row_parts)[order] if day_parts else np.array([], dtype=np.int32)
+        self.days, self._day_starts = np.unique(days[order], return_index=True)
+        self._day_starts = np.append(self._day_starts, len(days))
+
+        self.fundamentals = dict()  # Symbol -> (times or None, [field dicts])
+        if fundamentals is not None:
+            self._load_fundamentals(fundamentals)
+        self.has_fundamentals = fundamentals is not None
+
+    @classmethod
+    def from_directory(cls, path, fundamentals_path=None):
+        bars = dict()
+        for name in sorted(os.listdir(path)):
+            ticker, ext = os.path.splitext(name)
+            if ext in ('.csv', '.parquet') and os.path.join(path, name) != fundamentals_path:
+                bars[ticker] = _read_table(os.path.join(path, name))
+        fundamentals = _read_table(fundamentals_path) if fundamentals_path else None
+        return cls(bars, fundamentals)
+
+    def _load_fundamentals(self, table):
+        point_in_time = 'time' in table.columns
+        if point_in_time:
+            table = table.assign(time=pd.to_datetime(table['time'])).sort_values('time')
+        fields = [column for column in table.columns if column not in ('symbol', 'time')]
+        dates = [column for column in fields if column.endswith('Date')]
+        for ticker, rows in table.groupby('symbol', sort=False):
+            records = []
+            for _, row in rows.iterrows():
+                record = {field: row[field] for field in fields if not pd.isna(row[field])}
+                for field in dates:
+                    if field in record:
+                        record[field] = pd.Timestamp(record[field]).to_pydatetime()
+                records.append(record)
+            times = rows['time'].values if point_in_time else None
+            self.fundamentals[Symbol.Create(ticker)] = (times, records)
+
+    @property
+    def symbols(self):
+        return list(self.frames.keys())
+
+    def trading_days(self, start, end):
+        return [day for day in self.days.astype(object) if start.date() <= day <= end.date()]
+
+    def bars_on(self, day):
+        """
+        :return: dict of Symbol -> TradeBar for trading date day
+        """
+        bars = dict()
+        i = np.searchsorted(self.days, np.datetime64(day, 'D'))
+        if i == len(self.days) or self.days[i] != np.datetime64(day, 'D'):
+            return bars
+        time = datetime.combine(day, datetime.min.time())
+        start, stop = self._day_starts[i], self._day_starts[i + 1]
+        for k, row in zip(self._bar_symbols[start:stop].tolist(), self._bar_rows[start:stop].tolist()):
+            symbol = self._symbol_list[k]
+            close, high, low, open, volume = self.values[symbol][row].tolist()
+            bars[symbol] = TradeBar(time, symbol, open, high, low, close, volume, timedelta(days=1))
+        return bars
+
+    def first_date(self, symbol):
+        frame = self.frames.get(symbol)
+        return None if frame is None or len(frame) == 0 else (frame.index[0] - pd.Timedelta(days=1)).to_pydatetime()
+
+    def fundamental_fields(self, symbol, time):
+        """
+        :return: dict of property chain -> value as of time, None when the symbol has no fundamentals
+        """
+        entry = self.fundamentals.get(symbol)
+        if entry is None:
+            return None
+        times, records = entry
+        if times is None:
+            return records[-1]
+        i = np.searchsorted(times, np.datetime64(time), side='right') - 1
+        return records[i] if i >= 0 else None
+
+    def history(self, symbols, now, count=None, start=None, end=None):
+        """
+        History() frame with a (symbol, time) MultiIndex, only bars that ended by now are visible
+        :param count: last count bars per symbol, or
+        :param start, end: bars ending in (start, end]
+        """
+        now = np.datetime64(now)
+        pieces = dict()
+        for symbol in symbols:
+            end_times = self.end_times.get(symbol)
+            if end_times is None:
+                continue
+            stop = np.searchsorted(end_times, now if end is None else min(now, np.datetime64(end)), side='right')
+            if count is not None:
+                first = max(stop - count, 0)
+            else:
+                first = np.searchsorted(end_times, np.datetime64(start), side='right')
+            if stop > first:
+                pieces[symbol] = self.frames[symbol].iloc[first:stop]
+        if len(pieces) == 0:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        return pd.concat(pieces, names=['symbol', 'time'])
@@ -0,0 +1,244 @@
+# Engine
+'''
+Offline stand-in for the LEAN engine loop, driving an unmodified QCAlgorithm from a BarFeed
+
+Per trading day:
+    00:00  universe selection -- coarse from the previous trading day's bars, then fine
+           for the coarse symbols that have fundamental data
+    ...    scheduled events in time order (DateRules/TimeRules)
+    +1d    the day's bars: security prices, consolidators, then OnData(slice)
+The feed is daily only, so minute subscriptions also receive daily bars.
+'''
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from time import perf_counter
+import tempfile
+import threading
+
+from QuantConnect import Symbol
+from QuantConnect.Data import Slice
+from QuantConnect.Data.UniverseSelection import Universe, CoarseFundamental, FineFundamental, SecurityChanges
+from QuantConnect.Securities import Security
+
+
+class Engine:
+    def __init__(self, algorithm_class, feed, object_store=None, downloads=None, start=None, end=None,
+                 echo=False, no_fundamentals=('SPY',)):
+        '''
+        param: algorithm_class -- QCAlgorithm subclass to run
+        param: feed -- BarFeed
+        param: object_store -- ObjectStore stand-in, defaults to a LocalObjectStore in a temporary directory
+        param: downloads -- dict of url -> local file served by Download(), other urls return ''
+        param: start, end -- datetimes overriding the algorithm's SetStartDate/SetEndDate
+        param: echo -- print log lines as they are written
+        param: no_fundamentals -- tickers without fundamental data (ETFs), they are not passed to fine
+        '''
+        if object_store is None:
+            from ReportWriter import LocalObjectStore
+            object_store = LocalObjectStore(tempfile.mkdtemp(prefix='offline_store_'))
+        self.feed = feed
+        self.object_store = object_store
+        self.downloads = dict(downloads or {})
+        self.forced_start = start
+        self.forced_end = end
+        self.start = start
+        self.end = end
+        self.echo = echo
+        self.no_fundamentals = {Symbol.Create(ticker) for ticker in no_fundamentals}
+
+        self.subscribed = set()     # symbols added with AddEquity/AddSecurity
+        self.members = dict()       # universe index -> selected symbols
+        self.logs = []              # log lines
+        self.plots = []             # (time, chart, series, value)
+        self.history_calls = 0
+        self.history_symbols = 0
+        self.download_calls = 0
+        self.days = 0
+        self.timings = dict()       # phase -> seconds
+        self._lock = threading.Lock()
+
+        self.algorithm = algorithm_class()
+        self.algorithm._set_engine(self)
+
+    # algorithm callbacks
+    def start_date(self, value):
+        self.start = self.forced_start or value
+        return self.start
+
+    def end_date(self, value):
+        self.end = self.forced_end or value
+        return self.end
+
+    def log(self, time, message):
+        line = f'{time:%Y-%m-%d %H:%M:%S} {message}'
+        with self._lock:
+            self.logs.append(line)
+        if self.echo:
+            print(line)
+
+    def plot(self, time, chart, series, value):
+        self.plots.append((time, chart, series, value))
+
+    def download(self, address):
+        with self._lock:
+            self.download_calls += 1
+        path = self.downloads.get(address)
+        if path is None:
+            return ''   # LEAN returns an empty string when a download fails
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def history(self, symbols, *args):
+        # History(symbols, bar_count, resolution), (symbols, timedelta, resolution) or (symbols, start, end, resolution)
+        if isinstance(symbols, (Symbol, str)):
+            symbols = [symbols]
+        symbols = [Symbol.Create(s) if isinstance(s, str) else s for s in symbols]
+        now = self.algorithm.Time
+        with self._lock:
+            self.history_calls += 1
+            self.history_symbols += len(symbols)
+        if isinstance(args[0], int):
+            return self.feed.history(symbols, now, count=args[0])
+        if isinstance(args[0], timedelta):
+            return self.feed.history(symbols, now, start=now - args[0], end=now)
+        return self.feed.history(symbols, now, start=args[0], end=args[1])
+
+    @contextmanager
+    def phase(self, name):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + perf_counter() - started
+
+    # engine loop
+    def run(self):
+        algorithm = self.algorithm
+        with self.phase('initialize'):
+            algorithm.Initialize()
+        all_days = self.feed.trading_days(datetime.min, datetime.max)
+        start = self.start or datetime.combine(all_days[0], datetime.min.time())
+        end = self.end or datetime.combine(all_days[-1], datetime.min.time())
+        days = [day for day in all_days if start.date() <= day <= end.date()]
+        previous = [day for day in all_days if day < start.date()]
+        previous_day = previous[-1] if previous else None
+        calendar = _calendar(days)
+
+        for day in days:
+            midnight = datetime.combine(day, datetime.min.time())
+            algorithm.Time = midnight
+            if previous_day is not None:
+                self._select(midnight, previous_day)
+
+            events = [(time_rule.offset, i, callback)
+                      for i, (date_rule, time_rule, callback) in enumerate(algorithm.Schedule.events)
+                      if day in calendar[date_rule.kind]]
+            with self.phase('scheduled'):
+                for offset, _, callback in sorted(events, key=lambda event: (event[0], event[1])):
+                    algorithm.Time = midnight + offset
+                    callback()
+
+            with self.phase('data'):
+                self._deliver(midnight + timedelta(days=1), self.feed.bars_on(day))
+            previous_day = day
+            self.days += 1
+
+        with self.phase('end'):
+            algorithm.OnEndOfAlgorithm()
+        return self
+
+    def _has_fundamentals(self, symbol):
+        if symbol in self.no_fundamentals:
+            return False
+        return symbol in self.feed.fundamentals if self.feed.has_fundamentals else True
+
+    def _fine(self, symbol, time):
+        fields = dict(self.feed.fundamental_fields(symbol, time) or {})
+        if 'SecurityReference.IPODate' not in fields:
+            # listed since its first bar
+            fields['SecurityReference.IPODate'] = self.feed.first_date(symbol)
+        return FineFundamental(symbol, fields)
+
+    def _select(self, midnight, previous_day):
+        for index, (coarse_selection, fine_selection) in enumerate(self.algorithm.universes):
+            coarse = [CoarseFundamental(symbol, bar.EndTime, bar.Close, bar.Volume, self._has_fundamentals(symbol))
+                      for symbol, bar in self.feed.bars_on(previous_day).items()]
+            with self.phase('coarse'):
+                selected = coarse_selection(coarse)
+            if selected is Universe.Unchanged:
+                continue
+            selected = list(selected)
+            if fine_selection is not None:
+                fine = [self._fine(symbol, midnight) for symbol in selected if self._has_fundamentals(symbol)]
+                with self.phase('fine'):
+                    selected = fine_selection(fine)
+                if selected is Universe.Unchanged:
+                    continue
+            self._set_members(index, set(selected))
+
+    def _set_members(self, index, selected):
+        algorithm = self.algorithm
+        previous = self.members.get(index, set())
+        self.members[index] = selected
+        active = set(self.subscribed).union(*self.members.values())
+        added = []
+        for symbol in sorted(selected - previous):
+            security = algorithm.Securities.get(symbol)
+            if security is None:
+                security = Security(symbol, algorithm.UniverseSettings.Resolution, algorithm.UniverseSettings.Leverage)
+                algorithm.Securities[symbol] = security
+            if symbol not in algorithm.ActiveSecurities:
+                algorithm.ActiveSecurities[symbol] = security
+                added.append(security)
+        removed = []
+        for symbol in sorted(previous - active):
+            removed.append(algorithm.ActiveSecurities.pop(symbol))
+        if len(added) > 0 or len(removed) > 0:
+            algorithm.OnSecuritiesChanged(SecurityChanges(added, removed))
+
+    def _deliver(self, time, bars):
+        algorithm = self.algorithm
+        algorithm.Time = time
+        consolidators = algorithm.SubscriptionManager.consolidators
+        slice_bars = dict()
+        for symbol, security in list(algorithm.ActiveSecurities.items()):
+            bar = bars.get(symbol)
+            if bar is None:
+                continue
+            security.Price = bar.Close
+            security.HasData = True
+            slice_bars[symbol] = bar
+            for consolidator in list(consolidators.get(symbol, [])):
+                consolidator.Update(bar)
+        if len(slice_bars) > 0:
+            algorithm.OnData(Slice(time, slice_bars))
+
+    def summary(self):
+        return {
+            'days': self.days,
+            'history_calls': self.history_calls,
+            'history_symbols': self.history_symbols,
+            'download_calls': self.download_calls,
+            'log_lines': len(self.logs),
+            'plots': len(self.plots),
+            'timings': dict(self.timings),
+        }
+
+
+def _calendar(days):
+    # trading days matching each DateRule kind
+    calendar = {'every_day': set(days), 'week_start': set(), 'week_end': set(),
+                'month_start': set(), 'month_end': set()}
+    for i, day in enumerate(days):
+        week = day.isocalendar()[:2]
+        month = (day.year, day.month)
+        if i == 0 or days[i - 1].isocalendar()[:2] != week:
+            calendar['week_start'].add(day)
+        if i == len(days) - 1 or days[i + 1].isocalendar()[:2] != week:
+            calendar['week_end'].add(day)
+        if i == 0 or (days[i - 1].year, days[i - 1].month) != month:
+            calendar['month_start'].add(day)
+        if i == len(days) - 1 or (days[i + 1].year, days[i + 1].month) != month:
+            calendar['month_end'].add(day)
+    return calendar
@@ -0,0 +1,37 @@
+# QuantConnect.Algorithm.Framework.Alphas -- offline stand-in
+
+
+class InsightDirection:
+    Down = -1
+    Flat = 0
+    Up = 1
+
+
+class InsightType:
+    Price = 0
+    Volatility = 1
+
+
+class Insight:
+    def __init__(self, symbol, period, type, direction, magnitude=None, confidence=None, sourceModel=None,
+                 weight=None):
+        self.Symbol = symbol
+        self.Period = period
+        self.Type = type
+        self.Direction = direction
+        self.Magnitude = magnitude
+        self.Confidence = confidence
+        self.SourceModel = sourceModel
+        self.Weight = weight
+
+    @staticmethod
+    def Price(symbol, period, direction, magnitude=None, confidence=None, sourceModel=None, weight=None):
+        return Insight(symbol, period, InsightType.Price, direction, magnitude, confidence, sourceModel, weight)
+
+
+class AlphaModel:
+    def Update(self, algorithm, data):
+        return []
+
+    def OnSecuritiesChanged(self, algorithm, changes):
+        pass
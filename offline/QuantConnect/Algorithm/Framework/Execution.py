@@ -0,0 +1,10 @@
+# QuantConnect.Algorithm.Framework.Execution -- offline stand-in
+
+
+class ExecutionModel:
+    def Execute(self, algorithm, targets):
+        pass
+
+
+class ImmediateExecutionModel(ExecutionModel):
+    pass
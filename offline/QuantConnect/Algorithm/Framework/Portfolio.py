@@ -0,0 +1,10 @@
+# QuantConnect.Algorithm.Framework.Portfolio -- offline stand-in
+
+
+class PortfolioConstructionModel:
+    def CreateTargets(self, algorithm, insights):
+        return []
+
+
+class NullPortfolioConstructionModel(PortfolioConstructionModel):
+    pass
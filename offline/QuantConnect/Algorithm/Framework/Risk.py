@@ -0,0 +1,6 @@
+# QuantConnect.Algorithm.Framework.Risk -- offline stand-in
+
+
+class RiskManagementModel:
+    def ManageRisk(self, algorithm, targets):
+        return []
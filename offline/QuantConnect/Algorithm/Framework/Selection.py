@@ -0,0 +1 @@
+# QuantConnect.Algorithm.Framework.Selection -- offline stand-in
@@ -0,0 +1 @@
+# QuantConnect.Algorithm.Framework -- offline stand-in
@@ -0,0 +1,210 @@
+# QuantConnect.Algorithm -- offline stand-in
+'''
+QCAlgorithm with the API used by this algorithm; data, history, downloads and the clock come from
+the offline Engine attached with _set_engine()
+'''
+
+from datetime import datetime, timedelta
+
+from QuantConnect import Resolution, Symbol
+from QuantConnect.Securities import Security, SecurityManager, SecurityPortfolioManager
+
+
+class DateRule:
+    """
+    kind -- 'every_day', 'week_start', 'week_end', 'month_start' or 'month_end', evaluated on trading days
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+
+
+class DateRules:
+    def EveryDay(self, symbol=None):
+        return DateRule('every_day')
+
+    def WeekStart(self, symbol=None, daysOffset=0):
+        return DateRule('week_start')
+
+    def WeekEnd(self, symbol=None, daysOffset=0):
+        return DateRule('week_end')
+
+    def MonthStart(self, symbol=None, daysOffset=0):
+        return DateRule('month_start')
+
+    def MonthEnd(self, symbol=None, daysOffset=0):
+        return DateRule('month_end')
+
+
+class TimeRule:
+    # offset from midnight of the trading day
+    def __init__(self, offset):
+        self.offset = offset
+
+
+class TimeRules:
+    market_open = timedelta(hours=9, minutes=30)
+    market_close = timedelta(hours=16)
+
+    def AfterMarketOpen(self, symbol=None, minutesAfterOpen=0, extendedMarketOpen=False):
+        return TimeRule(self.market_open + timedelta(minutes=minutesAfterOpen))
+
+    def BeforeMarketClose(self, symbol=None, minutesBeforeClose=0, extendedMarketClose=False):
+        return TimeRule(self.market_close - timedelta(minutes=minutesBeforeClose))
+
+    def At(self, hour, minute=0, second=0):
+        return TimeRule(timedelta(hours=hour, minutes=minute, seconds=second))
+
+    @property
+    def Midnight(self):
+        return TimeRule(timedelta(0))
+
+
+class ScheduleManager:
+    def __init__(self):
+        self.events = []    # (DateRule, TimeRule, callback)
+
+    def On(self, date_rule, time_rule, callback):
+        self.events.append((date_rule, time_rule, callback))
+
+
+class UniverseSettings:
+    def __init__(self):
+        self.Resolution = Resolution.Minute
+        self.Leverage = 1.0
+        self.ExtendedMarketHours = False
+        self.FillForward = True
+
+
+class SubscriptionManager:
+    def __init__(self):
+        self.consolidators = dict()     # symbol -> [consolidator]
+
+    def AddConsolidator(self, symbol, consolidator):
+        self.consolidators.setdefault(symbol, []).append(consolidator)
+
+    def RemoveConsolidator(self, symbol, consolidator):
+        consolidators = self.consolidators.get(symbol, [])
+        if consolidator in consolidators:
+            consolidators.remove(consolidator)
+        if len(consolidators) == 0:
+            self.consolidators.pop(symbol, None)
+
+
+class QCAlgorithm:
+    def __init__(self):
+        self._engine = None
+        self.Time = datetime(1998, 1, 1)
+        self.StartDate = None
+        self.EndDate = None
+        self.Securities = SecurityManager()
+        self.ActiveSecurities = SecurityManager()
+        self.Portfolio = SecurityPortfolioManager()
+        self.UniverseSettings = UniverseSettings()
+        self.SubscriptionManager = SubscriptionManager()
+        self.Schedule = ScheduleManager()
+        self.DateRules = DateRules()
+        self.TimeRules = TimeRules()
+        self.ObjectStore = None
+        self.Benchmark = None
+        self.universes = []         # (coarse, fine) selection functions
+        self.charts = dict()
+
+    def _set_engine(self, engine):
+        self._engine = engine
+        self.ObjectStore = engine.object_store
+
+    # setup
+    def SetTimeZone(self, time_zone):
+        self.TimeZone = time_zone
+
+    def SetStartDate(self, *args):
+        self.StartDate = self._engine.start_date(_to_datetime(*args))
+        self.Time = self.StartDate
+
+    def SetEndDate(self, *args):
+        self.EndDate = self._engine.end_date(_to_datetime(*args))
+
+    def SetCash(self, cash):
+        self.Portfolio.Cash = float(cash)
+
+    def SetBenchmark(self, benchmark):
+        self.Benchmark = benchmark
+
+    def SetWarmUp(self, period, resolution=None):
+        pass
+
+    def AddChart(self, chart):
+        self.charts[chart.Name] = chart
+
+    def AddUniverse(self, coarse, fine=None):
+        self.universes.append((coarse, fine))
+
+    def AddAlpha(self, model):
+        pass
+
+    def SetPortfolioConstruction(self, model):
+        pass
+
+    def SetExecution(self, model):
+        pass
+
+    def SetRiskManagement(self, model):
+        pass
+
+    # subscriptions
+    def AddEquity(self, ticker, resolution=Resolution.Minute, market='usa', fillDataForward=True, leverage=1.0,
+                  extendedMarketHours=False):
+        return self.AddSecurity(Symbol.Create(ticker), resolution, leverage)
+
+    def AddSecurity(self, symbol, resolution=Resolution.Minute, leverage=1.0):
+        security = self.Securities.get(symbol)
+        if security is None:
+            security = Security(symbol, resolution, leverage)
+            self.Securities[symbol] = security
+        else:
+            security.Resolution = min(security.Resolution, resolution)
+        self.ActiveSecurities[symbol] = security
+        self._engine.subscribed.add(symbol)
+        return security
+
+    def RemoveSecurity(self, symbol):
+        self._engine.subscribed.discard(symbol)
+        self.ActiveSecurities.pop(symbol, None)
+
+    # data
+    def History(self, symbols, *args):
+        return self._engine.history(symbols, *args)
+
+    def Download(self, address, headers=None, userName=None, password=None):
+        return self._engine.download(address)
+
+    # output
+    def Log(self, message):
+        self._engine.log(self.Time, message)
+
+    def Debug(self, message):
+        self._engine.log(self.Time, message)
+
+    def Error(self, message):
+        self._engine.log(self.Time, f'ERROR: {message}')
+
+    def Plot(self, chart, series, value):
+        self._engine.plot(self.Time, chart, series, value)
+
+    # event handlers
+    def OnData(self, data):
+        pass
+
+    def OnSecuritiesChanged(self, changes):
+        pass
+
+    def OnEndOfAlgorithm(self):
+        pass
+
+
+def _to_datetime(*args):
+    if len(args) == 1:
+        value = args[0]
+        return value if isinstance(value, datetime) else datetime.combine(value, datetime.min.time())
+    return datetime(*args)
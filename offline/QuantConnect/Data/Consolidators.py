@@ -0,0 +1,39 @@
+# QuantConnect.Data.Consolidators -- offline stand-in
+
+from datetime import timedelta
+
+from QuantConnect import Event
+from QuantConnect.Data.Market import TradeBar
+
+
+class TradeBarConsolidator:
+    """
+    Aggregates trade bars into bars of period; bars at least as long as period pass straight through
+    """
+
+    def __init__(self, period=timedelta(days=1)):
+        self.Period = period
+        self.DataConsolidated = Event()
+        self.Consolidated = None
+        self._working = None
+
+    def Update(self, bar):
+        if bar.Period >= self.Period:
+            self._emit(bar)
+            return
+        if self._working is None:
+            self._working = TradeBar(bar.Time, bar.Symbol, bar.Open, bar.High, bar.Low, bar.Close, bar.Volume,
+                                     self.Period)
+        else:
+            working = self._working
+            working.High = max(working.High, bar.High)
+            working.Low = min(working.Low, bar.Low)
+            working.Close = bar.Close
+            working.Volume += bar.Volume
+        if bar.EndTime >= self._working.EndTime:
+            working, self._working = self._working, None
+            self._emit(working)
+
+    def _emit(self, bar):
+        self.Consolidated = bar
+        self.DataConsolidated(self, bar)
@@ -0,0 +1,37 @@
+# QuantConnect.Data.Market -- offline stand-in
+
+from datetime import timedelta
+
+
+class TradeBar:
+    def __init__(self, time=None, symbol=None, open=0.0, high=0.0, low=0.0, close=0.0, volume=0.0,
+                 period=timedelta(days=1)):
+        self.Time = time
+        self.Symbol = symbol
+        self.Open = open
+        self.High = high
+        self.Low = low
+        self.Close = close
+        self.Volume = volume
+        self.Period = period
+
+    @property
+    def EndTime(self):
+        return self.Time + self.Period
+
+    @property
+    def Value(self):
+        return self.Close
+
+    @property
+    def Price(self):
+        return self.Close
+
+
+class TradeBars(dict):
+    @property
+    def Count(self):
+        return len(self)
+
+    def ContainsKey(self, symbol):
+        return symbol in self
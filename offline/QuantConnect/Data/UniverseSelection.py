@@ -0,0 +1,51 @@
+# QuantConnect.Data.UniverseSelection -- offline stand-in
+
+from types import SimpleNamespace
+
+
+class Universe:
+    # returned by a selection function to keep the current membership
+    Unchanged = object()
+
+
+class CoarseFundamental:
+    def __init__(self, symbol, end_time, price, volume, has_fundamental_data=True):
+        self.Symbol = symbol
+        self.EndTime = end_time
+        self.Price = price
+        self.AdjustedPrice = price
+        self.Value = price
+        self.Volume = volume
+        self.DollarVolume = price * volume
+        self.HasFundamentalData = has_fundamental_data
+        self.Market = 'usa'
+
+
+class FineFundamental:
+    """
+    Morningstar fields from dotted property chains, e.g. {'ValuationRatios.FCFYield': 0.03}
+    Fields that were not provided raise AttributeError like a missing property
+    """
+
+    def __init__(self, symbol, fields):
+        self.Symbol = symbol
+        for chain, value in fields.items():
+            node = self
+            names = chain.split('.')
+            for name in names[:-1]:
+                child = getattr(node, name, None)
+                if child is None:
+                    child = SimpleNamespace()
+                    setattr(node, name, child)
+                node = child
+            setattr(node, names[-1], value)
+
+
+class SecurityChanges:
+    def __init__(self, added, removed):
+        self.AddedSecurities = list(added)
+        self.RemovedSecurities = list(removed)
+
+    @property
+    def Count(self):
+        return len(self.AddedSecurities) + len(self.RemovedSecurities)
@@ -0,0 +1,28 @@
+# QuantConnect.Data -- offline stand-in
+
+from QuantConnect.Data.Market import TradeBars
+
+
+class Slice:
+    """
+    Data for one time step, only trade bars are fed offline
+    """
+
+    def __init__(self, time, bars):
+        self.Time = time
+        self.Bars = TradeBars(bars)
+
+    def ContainsKey(self, symbol):
+        return symbol in self.Bars
+
+    def __contains__(self, symbol):
+        return symbol in self.Bars
+
+    def __getitem__(self, symbol):
+        return self.Bars[symbol]
+
+    def get(self, symbol, default=None):
+        return self.Bars.get(symbol, default)
+
+    def Keys(self):
+        return list(self.Bars.keys())
@@ -0,0 +1,257 @@
+# QuantConnect.Indicators -- offline stand-in
+'''
+RollingWindow and the indicators used by the selection pipeline, following the LEAN definitions
+Update(time, value) / Update(bar) return IsReady like LEAN
+'''
+
+from collections import deque
+
+
+class RollingWindow:
+    """
+    Fixed size window, index 0 is the most recent value; RollingWindow[float](size) like LEAN
+    """
+
+    def __class_getitem__(cls, item):
+        return cls
+
+    def __init__(self, size):
+        self.Size = size
+        self._data = [None] * size
+        self._head = 0              # next write position
+        self.Count = 0
+        self.Samples = 0
+        self.MostRecentlyRemoved = None
+
+    @property
+    def IsReady(self):
+        return self.Count >= self.Size
+
+    def Add(self, value):
+        if self.Count == self.Size:
+            self.MostRecentlyRemoved = self._data[self._head]
+        else:
+            self.Count += 1
+        self._data[self._head] = value
+        self._head = (self._head + 1) % self.Size
+        self.Samples += 1
+
+    def __getitem__(self, i):
+        if i < 0 or i >= self.Count:
+            raise IndexError(f'RollingWindow index {i} out of range (Count={self.Count})')
+        return self._data[(self._head - 1 - i) % self.Size]
+
+    def __setitem__(self, i, value):
+        if i < 0 or i >= self.Count:
+            raise IndexError(f'RollingWindow index {i} out of range (Count={self.Count})')
+        self._data[(self._head - 1 - i) % self.Size] = value
+
+    def __len__(self):
+        return self.Count
+
+    def __iter__(self):
+        for i in range(self.Count):
+            yield self._data[(self._head - 1 - i) % self.Size]
+
+    def Reset(self):
+        self._data = [None] * self.Size
+        self._head = 0
+        self.Count = 0
+        self.Samples = 0
+        self.MostRecentlyRemoved = None
+
+
+class IndicatorDataPoint:
+    def __init__(self, time=None, value=0.0):
+        self.Time = time
+        self.EndTime = time
+        self.Value = value
+
+
+class IndicatorBase:
+    def __init__(self, name=''):
+        self.Name = name
+        self.Current = IndicatorDataPoint()
+        self.Samples = 0
+
+    @property
+    def IsReady(self):
+        raise NotImplementedError
+
+    def Update(self, *args):
+        # Update(time, value), Update(IndicatorDataPoint) or Update(bar)
+        if len(args) == 2:
+            time, value = args
+        else:
+            point = args[0]
+            time, value = point.EndTime, getattr(point, 'Close', point.Value)
+        self.Samples += 1
+        self.Current = IndicatorDataPoint(time, self._compute(time, value))
+        return self.IsReady
+
+    def _compute(self, time, value):
+        raise NotImplementedError
+
+    def Reset(self):
+        self.Current = IndicatorDataPoint()
+        self.Samples = 0
+
+
+class SimpleMovingAverage(IndicatorBase):
+    def __init__(self, period):
+        super().__init__(f'SMA({period})')
+        self.Period = period
+        self._window = deque(maxlen=period)
+        self._sum = 0.0
+
+    @property
+    def IsReady(self):
+        return self.Samples >= self.Period
+
+    def _compute(self, time, value):
+        if len(self._window) == self.Period:
+            self._sum -= self._window[0]
+        self._window.append(value)
+        self._sum += value
+        return self._sum / len(self._window)
+
+    def Reset(self):
+        super().Reset()
+        self._window.clear()
+        self._sum = 0.0
+
+
+class ExponentialMovingAverage(IndicatorBase):
+    def __init__(self, period, smoothing_factor=None):
+        super().__init__(f'EMA({period})')
+        self.Period = period
+        self._k = smoothing_factor if smoothing_factor is not None else 2.0 / (period + 1)
+
+    @property
+    def IsReady(self):
+        return self.Samples >= self.Period
+
+    def _compute(self, time, value):
+        # the first data point is the identity
+        if self.Samples == 1:
+            return value
+        return value * self._k + self.Current.Value * (1 - self._k)
+
+
+class Maximum(IndicatorBase):
+    def __init__(self, period):
+        super().__init__(f'MAX({period})')
+        self.Period = period
+        self._window = deque(maxlen=period)
+
+    @property
+    def IsReady(self):
+        return self.Samples >= self.Period
+
+    def _compute(self, time, value):
+        self._window.append(value)
+        return max(self._window)
+
+    def Reset(self):
+        super().Reset()
+        self._window.clear()
+
+
+class Minimum(Maximum):
+    def __init__(self, period):
+        super().__init__(period)
+        self.Name = f'MIN({period})'
+
+    def _compute(self, time, value):
+        self._window.append(value)
+        return min(self._window)
+
+
+class Delay(IndicatorBase):
+    # value from period samples ago
+    def __init__(self, period):
+        super().__init__(f'DELAY({period})')
+        self.Period = period
+        self._window = deque(maxlen=period + 1)
+
+    @property
+    def IsReady(self):
+        return self.Samples > self.Period
+
+    def _compute(self, time, value):
+        self._window.append(value)
+        return self._window[0]
+
+    def Reset(self):
+        super().Reset()
+        self._window.clear()
+
+
+class _Composite:
+    # (a + b) / 2 of two indicators, as used for the Ichimoku lines
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+
+    @property
+    def IsReady(self):
+        return self.a.IsReady and self.b.IsReady
+
+    @property
+    def Current(self):
+        return IndicatorDataPoint(self.a.Current.Time, (self.a.Current.Value + self.b.Current.Value) / 2.0)
+
+
+class IchimokuKinkoHyo:
+    """
+    Tenkan/Kijun are midpoints of the high/low ranges, SenkouA the delayed (Tenkan + Kijun) / 2 and
+    SenkouB the delayed midpoint of the SenkouB period range. The delayed lines only sample once
+    their source is ready, as in LEAN.
+    """
+
+    def __init__(self, name, tenkanPeriod=9, kijunPeriod=26, senkouAPeriod=26, senkouBPeriod=52,
+                 senkouADelayPeriod=26, senkouBDelayPeriod=26):
+        self.Name = str(name)
+        self.Samples = 0
+        self.TenkanMaximum = Maximum(tenkanPeriod)
+        self.TenkanMinimum = Minimum(tenkanPeriod)
+        self.KijunMaximum = Maximum(kijunPeriod)
+        self.KijunMinimum = Minimum(kijunPeriod)
+        self.SenkouBMaximum = Maximum(senkouBPeriod)
+        self.SenkouBMinimum = Minimum(senkouBPeriod)
+        self.DelayedTenkanSenkouA = Delay(senkouADelayPeriod)
+        self.DelayedKijunSenkouA = Delay(senkouADelayPeriod)
+        self.DelayedMaximumSenkouB = Delay(senkouBDelayPeriod)
+        self.DelayedMinimumSenkouB = Delay(senkouBDelayPeriod)
+
+        self.Tenkan = _Composite(self.TenkanMaximum, self.TenkanMinimum)
+        self.Kijun = _Composite(self.KijunMaximum, self.KijunMinimum)
+        self.SenkouA = _Composite(self.DelayedTenkanSenkouA, self.DelayedKijunSenkouA)
+        self.SenkouB = _Composite(self.DelayedMaximumSenkouB, self.DelayedMinimumSenkouB)
+
+    @property
+    def IsReady(self):
+        return self.Tenkan.IsReady and self.Kijun.IsReady and self.SenkouA.IsReady and self.SenkouB.IsReady
+
+    @property
+    def Current(self):
+        return self.Tenkan.Current
+
+    def Update(self, bar):
+        time = bar.EndTime
+        self.Samples += 1
+        self.TenkanMaximum.Update(time, bar.High)
+        self.TenkanMinimum.Update(time, bar.Low)
+        self.KijunMaximum.Update(time, bar.High)
+        self.KijunMinimum.Update(time, bar.Low)
+        self.SenkouBMaximum.Update(time, bar.High)
+        self.SenkouBMinimum.Update(time, bar.Low)
+        if self.Tenkan.IsReady:
+            self.DelayedTenkanSenkouA.Update(time, self.Tenkan.Current.Value)
+        if self.Kijun.IsReady:
+            self.DelayedKijunSenkouA.Update(time, self.Kijun.Current.Value)
+        if self.SenkouBMaximum.IsReady:
+            self.DelayedMaximumSenkouB.Update(time, self.SenkouBMaximum.Current.Value)
+        if self.SenkouBMinimum.IsReady:
+            self.DelayedMinimumSenkouB.Update(time, self.SenkouBMinimum.Current.Value)
+        return self.IsReady
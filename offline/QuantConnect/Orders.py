@@ -0,0 +1,10 @@
+# QuantConnect.Orders -- offline stand-in (no orders are placed offline)
+
+
+class OrderStatus:
+    New = 0
+    Submitted = 1
+    PartiallyFilled = 2
+    Filled = 3
+    Canceled = 5
+    Invalid = 7
@@ -0,0 +1 @@
+# QuantConnect.Python -- offline stand-in (nothing used offline)
@@ -0,0 +1,56 @@
+# QuantConnect.Securities -- offline stand-in
+
+
+class Security:
+    def __init__(self, symbol, resolution, leverage=1.0):
+        self.Symbol = symbol
+        self.Resolution = resolution
+        self.Leverage = leverage
+        self.Price = 0.0
+        self.Invested = False
+        self.HasData = False
+
+
+class SecurityManager(dict):
+    """
+    Symbol -> Security; iterating yields key/value pairs like the LEAN dictionary (s.Key, s.Value)
+    """
+
+    @property
+    def Count(self):
+        return len(self)
+
+    def ContainsKey(self, symbol):
+        return symbol in self
+
+    def __iter__(self):
+        return (_KeyValuePair(key, value) for key, value in self.items())
+
+    @property
+    def Keys(self):
+        return list(self.keys())
+
+    @property
+    def Values(self):
+        return list(self.values())
+
+
+class _KeyValuePair:
+    __slots__ = ('Key', 'Value')
+
+    def __init__(self, key, value):
+        self.Key = key
+        self.Value = value
+
+
+class SecurityPortfolioManager:
+    def __init__(self):
+        self.Cash = 0.0
+
+    @property
+    def TotalPortfolioValue(self):
+        return self.Cash
+
+    @property
+    def Invested(self):
+        return False
@@ -0,0 +1,2 @@
+# QuantConnect.Storage -- offline stand-in
+# the engine provides algorithm.ObjectStore (ReportWriter.LocalObjectStore by default)
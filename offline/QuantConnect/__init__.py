@@ -0,0 +1,96 @@
+# QuantConnect -- offline stand-in
+'''
+Pure python stand-in for the parts of the LEAN QuantConnect namespace used by this algorithm
+Only the names and behaviour the selection pipeline relies on are provided, see offline/Engine.py
+'''
+
+
+class Resolution:
+    Tick = 0
+    Second = 1
+    Minute = 2
+    Hour = 3
+    Daily = 4
+
+
+class SecurityType:
+    Base = 0
+    Equity = 1
+
+
+class Market:
+    USA = 'usa'
+
+
+class Symbol:
+    """
+    Interned by ticker, so equal tickers are the same object (hashable and sortable by ticker)
+    """
+    _cache = dict()
+
+    def __init__(self, value, security_type=SecurityType.Equity, market=Market.USA):
+        self.Value = value
+        self.SecurityType = security_type
+        self.ID = f'{value} {market}'
+
+    @classmethod
+    def Create(cls, ticker, security_type=SecurityType.Equity, market=Market.USA):
+        symbol = cls._cache.get(ticker)
+        if symbol is None:
+            symbol = cls(ticker, security_type, market)
+            cls._cache[ticker] = symbol
+        return symbol
+
+    def __str__(self):
+        return self.Value
+
+    def __repr__(self):
+        return f'Symbol({self.Value})'
+
+    def __lt__(self, other):
+        return self.Value < other.Value
+
+
+class SeriesType:
+    Line = 0
+    Scatter = 1
+    Candle = 2
+    Bar = 3
+
+
+class Series:
+    def __init__(self, *args, **kwargs):
+        names = [arg for arg in args if isinstance(arg, str)]
+        self.Name = kwargs.get('name', names[0] if names else '')
+        self.SeriesType = kwargs.get('type', next((arg for arg in args if isinstance(arg, int)), SeriesType.Line))
+
+
+class Chart:
+    def __init__(self, name):
+        self.Name = name
+        self.Series = dict()
+
+    def AddSeries(self, series):
+        self.Series[series.Name] = series
+
+
+class Event:
+    """
+    .NET style event: handlers are attached with += and detached with -=
+    """
+
+    def __init__(self):
+        self._handlers = []
+
+    def __iadd__(self, handler):
+        self._handlers.append(handler)
+        return self
+
+    def __isub__(self, handler):
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+        return self
+
+    def __call__(self, *args):
+        for handler in list(self._handlers):
+            handler(*args)
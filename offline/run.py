@@ -0,0 +1,76 @@
+# run
+'''
+Run the algorithm offline from local bar files
+
+    python offline/run.py --data bars/ [--fundamentals fundamentals.csv] [--start 2020-01-01] [--end 2021-01-01]
+                          [--store store/] [--download URL=FILE ...] [--algorithm main:Proust] [--echo]
+
+The offline stand-in (this directory) is put first on sys.path, then the repository root, so the
+algorithm modules import AlgorithmImports / QuantConnect from the stand-in unmodified.
+'''
+
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import sys
+from datetime import datetime
+
+OFFLINE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(OFFLINE_DIR)
+
+# import name -> file name, for modules saved under a different name than the one they are imported by
+# (main.py imports CoarseSelection, the file in this repository is CourseSelection.py)
+MODULE_ALIASES = {'CoarseSelection': 'CourseSelection'}
+
+
+def setup_paths():
+    for path in (ROOT_DIR, OFFLINE_DIR):
+        if path in sys.path:
+            sys.path.remove(path)
+        sys.path.insert(0, path)
+    for name, file_name in MODULE_ALIASES.items():
+        if name not in sys.modules and importlib.util.find_spec(name) is None:
+            sys.modules[name] = importlib.import_module(file_name)
+
+
+def load_algorithm(spec):
+    # 'module:Class'
+    module_name, class_name = spec.split(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the algorithm against local bar files')
+    parser.add_argument('--data', required=True, help='directory of <TICKER>.csv / .parquet daily bars')
+    parser.add_argument('--fundamentals', help='CSV / Parquet of Morningstar fields by symbol')
+    parser.add_argument('--start', type=datetime.fromisoformat, help='override SetStartDate (YYYY-MM-DD)')
+    parser.add_argument('--end', type=datetime.fromisoformat, help='override SetEndDate (YYYY-MM-DD)')
+    parser.add_argument('--store', help='ObjectStore directory, defaults to a temporary directory')
+    parser.add_argument('--download', action='append', default=[], metavar='URL=FILE',
+                        help='serve FILE for Download(URL), may be repeated')
+    parser.add_argument('--algorithm', default='main:Proust', help='module:Class to run')
+    parser.add_argument('--echo', action='store_true', help='print log lines as they are written')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_paths()
+    from BarFeed import BarFeed
+    from Engine import Engine
+    from ReportWriter import LocalObjectStore
+
+    feed = BarFeed.from_directory(args.data, args.fundamentals)
+    downloads = dict(item.rsplit('=', 1) for item in args.download)
+    store = LocalObjectStore(args.store) if args.store else None
+    engine = Engine(load_algorithm(args.algorithm), feed, object_store=store, downloads=downloads,
+                    start=args.start, end=args.end, echo=args.echo)
+    engine.run()
+    print(json.dumps(engine.summary(), indent=2))
+    return engine
+
+
+if __name__ == '__main__':
+    main()